@@ -1,54 +1,74 @@
 import logging
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score
-from utils import extract_close_column, extract_feature_columns
+from config import WALK_FORWARD_TRAIN_WINDOW, WALK_FORWARD_TEST_WINDOW, WALK_FORWARD_N_JOBS
+from features import FeatureBuilder
+from utils import extract_column_values
 
 class AIModel:
-    def __init__(self, strategy):
-        """Initialize the AI model with logging, classifier, and scaler."""
+    def __init__(self, strategy, feature_builder=None):
+        """
+        Initialize the AI model with logging, classifier, and scaler.
+
+        :param feature_builder: FeatureBuilder of the model inputs, the configured lags and
+                                windows by default. Pass the same one to the Backtester.
+        """
         self.logger = logging.getLogger(__name__)  # Logger for tracking model activities
         self.model = RandomForestClassifier(n_estimators=100, random_state=42)  # Random forest classifier with fixed randomness
         self.scaler = StandardScaler()  # StandardScaler for normalizing data
         self.trained = False  # Flag to track if the model has been trained
         self.strategy = strategy  # Strategy instance (e.g., SMAStrategy or RSIStrategy)
+        self.feature_builder = feature_builder or FeatureBuilder()  # Lagged and rolling feature matrix
+        self.predict_calls = 0  # model.predict invocations, reported by --profile
+
+    def train(self, data: pd.DataFrame, store=None, symbol=None):
+        """
+        Train the model using stock market data to predict market movements.
 
-    def train(self, data: pd.DataFrame):
-        """Train the model using stock market data to predict market movements."""
+        :param data: DataFrame with the strategy feature columns and Close
+        :param store: Optional ModelStore, a model already trained on the same data, strategy and
+                      hyperparameters is loaded from it instead of being fitted again
+        :param symbol: Stock symbol, part of the store key
+        """
         self.logger.info("Training AI model...")
 
         if self.trained:
             self.logger.info("Model is already trained. Skipping training.")
             return self.model, self.scaler  # Return existing trained model and scaler
 
-        # Dynamically find exact column names based on strategy feature keys
-        # e.g. ['RSI'], ['SMA_short', 'SMA_long'], ['MACD', 'MACD_signal']
-        feature_column_names = self.strategy.get_feature_column_names()
-        actual_feature_columns = extract_feature_columns(data, feature_column_names)
+        # Features (X): the strategy features (e.g. ['RSI'], ['SMA_short', 'SMA_long']) with their
+        # lags and the rolling return statistics, one float32 row per bar. The backtester predicts
+        # from the very same matrix, which is cached, so it is only built once per run.
+        features, _ = self.feature_builder.build(data, self.strategy.get_feature_column_names())
+        close = extract_column_values(data, "Close")
 
-        # Find the Close column dynamically
-        close_col = extract_close_column(data)
+        # Target labels (y): The model should predict whether the stock price will go up (1) or down (0).
+        # If tomorrow's closing price is higher than today's, assign 1; otherwise, assign 0.
+        # e.g. We use the next days closing price
+        labels = np.zeros(len(close), dtype=np.int64)
+        labels[:-1] = close[1:] > close[:-1]
 
-        # Remove holes from the data, wipe the row if it has NaN
-        data = data.dropna(subset=actual_feature_columns + [close_col])
-        if data.empty:
+        # Remove holes from the data, wipe the row if it has NaN (the warmup of the indicators and lags)
+        keep = ~np.isnan(features).any(axis=1) & ~np.isnan(close)
+        if not keep.any():
             self.logger.error("Data is empty after dropping NaN values.")
             return None, None
+        X, y = features[keep], labels[keep]
 
-        # Extract input features (X) and target labels (y)
-
-        # Features (X): These are the strategy features that help predict stock movement.
-        X = data[actual_feature_columns]
-
-        # Target labels (y): The model should predict whether the stock price will go up (1) or down (0).
-        # If tomorrow's closing price is higher than today's, assign 1; otherwise, assign 0.
-        # e.g. We use the next days closing price
-        y = data[close_col].shift(-1) > data[close_col]  # Creates a Boolean series (True/False)
-        y = y.astype(int)  # Converts Boolean values to integers (1 for up, 0 for down)
-        y = y.values.reshape(-1,)  # Ensures y is formatted as a 1D NumPy array for sklearn
+        # Reuse a model trained on exactly this data, strategy and hyperparameters
+        if store is not None:
+            store_key = store.make_key(X, y, self.strategy, self.model, symbol)
+            cached = store.load(store_key)
+            if cached is not None:
+                self.model, self.scaler = cached
+                self.trained = True
+                return self.model, self.scaler
 
         # Split the dataset into training and testing sets
         # 80% of the data is used for training, and 20% is reserved for testing
@@ -67,8 +87,62 @@ class AIModel:
 
         # Evaluate the trained model using the test set
         predictions = self.model.predict(X_test_scaled)  # Predict stock movement
+        self.predict_calls += 1
         accuracy = accuracy_score(y_test, predictions)  # Calculate accuracy of the predictions
         self.logger.info(f"Model trained with accuracy: {accuracy * 100:.2f}%")
 
         self.trained = True  # Set flag to indicate that the model has been trained
+        if store is not None:
+            store.save(store_key, self.model, self.scaler)
         return self.model, self.scaler  # Return trained model and scaler
+
+    def walk_forward(self, data: pd.DataFrame, train_window=WALK_FORWARD_TRAIN_WINDOW,
+                     test_window=WALK_FORWARD_TEST_WINDOW, n_jobs=WALK_FORWARD_N_JOBS):
+        """
+        Walk-forward predictions: one model per rolling window of train_window bars, each
+        predicting only the following test_window bars it has never seen. Folds are fitted
+        concurrently with joblib.
+
+        :param data: DataFrame with the strategy feature columns and Close
+        :param train_window: Bars in each training window
+        :param test_window: Bars predicted by each fold
+        :param n_jobs: joblib worker count, -1 uses every CPU
+        :return: NumPy int array with one out-of-sample signal per bar, 0 (hold) where no fold
+                 has made a prediction yet
+        """
+        self.logger.info("Running walk-forward AI training...")
+
+        features, _ = self.feature_builder.build(data, self.strategy.get_feature_column_names())
+        close = extract_column_values(data, "Close")
+
+        # Same target as train: 1 if the next close is higher, 0 otherwise
+        labels = np.zeros(len(close), dtype=np.int64)
+        labels[:-1] = close[1:] > close[:-1]
+
+        folds = []
+        for test_start in range(train_window, len(close), test_window):
+            # The last training label looks at the close of test_start - 1, so nothing from the
+            # predicted window leaks into the fit
+            train = slice(test_start - train_window, test_start - 1)
+            test = slice(test_start, min(test_start + test_window, len(close)))
+            keep = ~np.isnan(features[train]).any(axis=1)
+            if keep.any():
+                folds.append((test, features[train][keep], labels[train][keep], features[test]))
+
+        self.logger.info(f"Fitting {len(folds)} walk-forward folds...")
+        predictions = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_predict_fold)(self.model, self.scaler, X_train, y_train, X_test)
+            for _, X_train, y_train, X_test in folds
+        )
+
+        self.predict_calls += len(folds)
+        signals = np.zeros(len(close), dtype=np.int64)
+        for (test, _, _, _), prediction in zip(folds, predictions):
+            signals[test] = prediction
+        return signals
+
+def _fit_predict_fold(model, scaler, X_train, y_train, X_test):
+    """Fit fresh copies of the model and scaler on one training window and predict its test window."""
+    model, scaler = clone(model), clone(scaler)
+    model.fit(scaler.fit_transform(X_train), y_train)
+    return model.predict(scaler.transform(X_test))
@@ -1,21 +1,41 @@
 import logging
 import numpy as np
 import pandas as pd
-from config import MIN_PROFIT_THRESHOLD, STOP_LOSS_THRESHOLD, STOCK_SYMBOL
+from config import MIN_PROFIT_THRESHOLD, STOP_LOSS_THRESHOLD, STOCK_SYMBOL, AI_PREDICT_CHUNK_SIZE
+from utils import extract_column_values
+from features import FeatureBuilder
+from ledger import BUY, SELL, TradeLedger, equity_curve_values, equity_statistics, trade_statistics
+
+ENGINES = ("loop", "vectorized")
 
 class Backtester:
-    def __init__(self, data, initial_capital, use_ai, strategy, model=None, scaler=None):
+    def __init__(self, data, initial_capital, use_ai, strategy, model=None, scaler=None, engine="loop", signals=None,
+                 feature_builder=None):
         """
         Initializes the Backtester with trading parameters.
+
+        :param engine: "loop" walks the frame bar by bar, "vectorized" jumps from trade to trade
+                       over NumPy arrays and produces the same trades and statistics.
+        :param signals: Precomputed signal per bar (e.g. walk-forward AI predictions), used instead
+                        of the model or the Signal column.
+        :param feature_builder: FeatureBuilder the model was trained with, the configured one by default
         """
         self.logger = logging.getLogger(__name__)
 
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown backtest engine '{engine}'. Valid options: {list(ENGINES)}")
+        self.engine = engine
+
         self.data = data
         self.initial_capital = initial_capital
         self.use_ai = use_ai
         self.strategy = strategy
         self.model = model
         self.scaler = scaler
+        self.signals = signals
+        self.predict_calls = 0  # model.predict invocations, reported by --profile
+        self.feature_builder = feature_builder or FeatureBuilder()
+        self._features = None  # AI feature matrix, built on the first determine_trade_signal
 
         self.capital = initial_capital
         self.position = 0
@@ -23,71 +43,219 @@ class Backtester:
         self.buy_date = None
         self.trade_start_date = None
         self.trade_end_date = None
-        self.buy_signals = []
-        self.sell_signals = []
-        self.trades = []
+        self.ledger = TradeLedger()
+
+    @property
+    def trades(self):
+        """Executed orders as [date, action, price, shares, profit %, days held] lists."""
+        return self.ledger.trades()
+
+    @property
+    def buy_signals(self):
+        return self.ledger.buy_signals()
+
+    @property
+    def sell_signals(self):
+        return self.ledger.sell_signals()
 
     def get_buy_signals(self): return self.buy_signals
 
     def get_sell_signals(self): return self.sell_signals
 
+    def equity_curve(self):
+        """
+        Mark-to-market portfolio value at every bar of the data, built from the ledger and the
+        Close column in one vectorized step.
+
+        :return: DataFrame indexed like the data with Cash, Shares and Equity columns, or None if
+                 the ledger has orders that weren't placed on a bar of the data
+        """
+        rows = self.ledger.rows
+        if (rows["bar"] < 0).any():
+            return None
+        close = extract_column_values(self.data, "Close") if len(self.data) else np.empty(0)
+        cash, shares, equity = equity_curve_values(rows, close, self.initial_capital)
+        return pd.DataFrame({"Cash": cash, "Shares": shares, "Equity": equity}, index=self.data.index)
+
     def run(self):
         """
         Executes the backtest on the provided data.
         """
-        self.logger.info("Starting backtest...")
+        self.logger.info(f"Starting backtest ({self.engine} engine)...")
+
+        if self.engine == "vectorized":
+            self._run_vectorized()
+        else:
+            self._run_loop()
+
+        self.logger.info("Backtest complete.")
+        return self.calculate_trade_statistics()
+
+    def _run_loop(self):
+        """Walks the frame one bar at a time."""
+        if len(self.data) <= 1:
+            return
+
+        # Signals (and AI predictions) are resolved for the whole frame up front and Close is
+        # read as one array, nothing is looked up by name inside the loop
+        signals = self.signal_array()
+        close = extract_column_values(self.data, "Close").tolist()
+        dates = self.data.index
 
         for i in range(len(self.data) - 1):
-            row = self.data.iloc[i]
-            current_price = row['Close'].item()
-            current_date = self.data.index[i]
+            current_price = close[i]
+            current_date = dates[i]
 
             if self.trade_start_date is None:
                 self.trade_start_date = current_date
 
             # Determine trade signal
-            trade_signal = self.determine_trade_signal(row)
+            trade_signal = int(signals[i])
 
             # Execute Buy or Sell Order
-            self.execute_trade(trade_signal, current_price, current_date)
+            self.execute_trade(trade_signal, current_price, current_date, bar=i)
             self.trade_end_date = current_date
 
-        self.logger.info("Backtest complete.")
-        return self.calculate_trade_statistics()
+    def _run_vectorized(self):
+        """
+        Runs the same buy/sell/threshold rules as the loop, but only visits the bars where
+        something happens. Entries come from a searchsorted over the buy signal positions and
+        exits from a scan of the Close array against the profit/stop-loss thresholds, so the
+        Python work is per trade instead of per bar.
+        """
+        # The loop never trades on the final bar, mirror that here
+        n = len(self.data) - 1
+        if n <= 0:
+            return
+
+        close = extract_column_values(self.data, "Close")[:n]
+        self.run_arrays(self.data.index[:n], close, self.signal_array()[:n])
+
+    def run_arrays(self, dates, close, signals, bar_offset=0):
+        """
+        Trades a block of consecutive bars with the vectorized engine. Cash, position and the
+        ledger carry over between calls, so a long history can be backtested one block at a
+        time (see chunked.py) with the same trades as a single pass.
+
+        :param dates: DatetimeIndex of the bars, every one of them tradable
+        :param close: Close price per bar
+        :param signals: Trade signal per bar
+        :param bar_offset: Bar index of the first bar in the whole history, recorded in the ledger
+        """
+        n = len(close)
+        if n == 0:
+            return
+
+        if self.trade_start_date is None:
+            self.trade_start_date = dates[0]
+        self.trade_end_date = dates[n - 1]
+
+        signals = np.asarray(signals)
+        buy_bars = np.flatnonzero(signals == 1)
+        sell_bars = np.flatnonzero(signals == -1)
+
+        i = 0
+        while i < n:
+            if self.position > 0:
+                exit_bar = self._find_exit(close, sell_bars, i)
+                if exit_bar is None:
+                    break
+                # Forcing a -1 here is fine, execute_trade books the sell the same way for
+                # signal and threshold exits
+                self.execute_trade(-1, float(close[exit_bar]), dates[exit_bar], bar=bar_offset + exit_bar)
+                i = exit_bar + 1
+            else:
+                if self.capital <= 0:
+                    break
+                k = np.searchsorted(buy_bars, i)
+                if k == len(buy_bars):
+                    break
+                entry_bar = int(buy_bars[k])
+                self.execute_trade(1, float(close[entry_bar]), dates[entry_bar], bar=bar_offset + entry_bar)
+                i = entry_bar + 1
+
+    def _find_exit(self, close, sell_bars, start):
+        """Returns the first bar at or after start that closes the open position, or None."""
+        k = np.searchsorted(sell_bars, start)
+        signal_exit = int(sell_bars[k]) if k < len(sell_bars) else len(close)
+
+        # Scan for a threshold hit before the sell signal in growing windows so short trades
+        # don't pay for a pass over the rest of the history
+        buy_price = self.last_buy_price
+        lo, step = start, 64
+        while lo < signal_exit:
+            hi = min(signal_exit, lo + step)
+            price_change = (close[lo:hi] - buy_price) / buy_price
+            hits = np.flatnonzero((price_change >= MIN_PROFIT_THRESHOLD) | (price_change <= STOP_LOSS_THRESHOLD))
+            if hits.size:
+                return lo + int(hits[0])
+            lo, step = hi, step * 2
+
+        return signal_exit if signal_exit < len(close) else None
+
+    def signal_array(self):
+        """Returns the trade signal for every bar as a NumPy array."""
+        if self.signals is not None:
+            return np.asarray(self.signals, dtype=np.int64)
+        if self.use_ai and self.model and self.scaler:
+            return self.predict_ai_signals()
+        return extract_column_values(self.data, "Signal").astype(np.int64)
+
+    def predict_ai_signals(self):
+        """
+        Predicts the AI signal for every bar at once. The feature matrix is the one AIModel
+        trained on (the builder caches it), it is scaled a single time and the model is called
+        once per chunk of AI_PREDICT_CHUNK_SIZE bars, instead of once per bar like
+        determine_trade_signal.
+        """
+        try:
+            features, _ = self.feature_builder.build(self.data, self.strategy.get_feature_column_names())
+        except ValueError as e:
+            self.logger.error(f"Could not find feature columns in data: {e}")
+            return np.zeros(len(self.data), dtype=np.int64)  # Default to hold signal if features missing
+
+        features_scaled = self.scaler.transform(features)
+        signals = np.empty(len(features_scaled), dtype=np.int64)
+        for start in range(0, len(features_scaled), AI_PREDICT_CHUNK_SIZE):
+            stop = start + AI_PREDICT_CHUNK_SIZE
+            signals[start:stop] = self.model.predict(features_scaled[start:stop])
+            self.predict_calls += 1
+        return signals
 
     def determine_trade_signal(self, row):
-        """Determines whether to buy, sell, or hold based on AI model or traditional signal."""
+        """
+        Determines whether to buy, sell, or hold for a single row based on AI model or traditional
+        signal. Backtests use signal_array, which batches the AI predictions for the whole frame.
+        """
         if self.use_ai and self.model and self.scaler:
-            feature_columns_names = self.strategy.get_feature_column_names()
-
-            # Dynamically extract the correct feature columns from the row
-            actual_features = []
-            for feature in feature_columns_names:
-                matched_cols = [col for col in row.index if feature in col]
-                if not matched_cols:
-                    self.logger.error(f"Could not find feature column '{feature}' in row.")
+            # The lagged and rolling features need the bars before the row, so the row is looked
+            # up in the feature matrix of the whole frame, built once
+            if self._features is None:
+                try:
+                    self._features, _ = self.feature_builder.build(self.data, self.strategy.get_feature_column_names())
+                except ValueError as e:
+                    self.logger.error(f"Could not find feature columns in data: {e}")
                     return 0  # Default to hold signal if features missing
-                actual_features.append(row[matched_cols[0]])
-
-            # TODO: check if we can grab the predictions from the ai model itself instead
-            # of regenerating them here, is there a reason this is duplicated, is it even duplicated
-            #
-            # Reshape correctly for scaler and model (1 sample, N features)
-            features = np.array([actual_features], dtype=np.float64)
-            # features = np.array([[row['SMA_short'], row['SMA_long']]], dtype=np.float64)
-            features_scaled = self.scaler.transform(features.reshape(1, -1))
+
+            # One sample of N features, shaped for the scaler and model
+            bar = self.data.index.get_loc(row.name)
+            features_scaled = self.scaler.transform(self._features[bar:bar + 1])
+            self.predict_calls += 1
             return int(self.model.predict(features_scaled)[0])
         return int(row['Signal'].item())
 
-    def execute_trade(self, trade_signal, current_price, current_date):
-        """Handles buy and sell trade execution."""
+    def execute_trade(self, trade_signal, current_price, current_date, bar=-1):
+        """
+        Handles buy and sell trade execution.
+
+        :param bar: Position of current_date in the data, recorded in the ledger
+        """
         # Execute Buy Order
         if trade_signal == 1 and self.capital > 0:
             self.position = self.capital / current_price
             self.last_buy_price = current_price
             self.buy_date = current_date
-            self.buy_signals.append((current_date, current_price, self.position))
-            self.trades.append([current_date, "BUY", current_price, self.position, None, None])
+            self.ledger.append(BUY, current_date, current_price, self.position, bar=bar)
             self.capital = 0
 
         # Execute Sell Order
@@ -97,88 +265,45 @@ class Backtester:
 
             if trade_signal == -1 or price_change >= MIN_PROFIT_THRESHOLD or price_change <= STOP_LOSS_THRESHOLD:
                 self.capital = self.position * current_price
-                self.sell_signals.append((current_date, current_price, self.position, price_change * 100))
-                self.trades.append([current_date, "SELL", current_price, self.position, price_change * 100, days_held])
+                self.ledger.append(SELL, current_date, current_price, self.position, price_change * 100, days_held, bar=bar)
                 self.position = 0
 
-    def calculate_trade_statistics(self):
+    def calculate_trade_statistics(self, equity_metrics=None):
         """
         Compute key performance metrics from backtest results.
-        """
-        trades_df = pd.DataFrame(self.trades, columns=["Date", "Action", "Price", "Shares", "Profit %", "Days Held"])
 
-        if trades_df.empty:
+        :param equity_metrics: equity_statistics of the run, for callers that built the equity
+                               curve themselves instead of keeping the data (chunked backtests)
+        """
+        if len(self.ledger) == 0:
             self.logger.warning("No trades executed. Skipping performance calculations.")
             return {}
 
         trading_days = (self.trade_end_date - self.trade_start_date).days if self.trade_start_date and self.trade_end_date else 0
+        metrics = trade_statistics(
+            self.ledger.column("profit_pct"), self.ledger.column("days_held"), trading_days,
+            self.initial_capital, self.capital
+        )
 
-        wins = trades_df[trades_df["Profit %"] > 0]
-        losses = trades_df[trades_df["Profit %"] <= 0]
-
-        # Ensure Avg Trade Duration is calculated correctly
-        if "Days Held" not in trades_df.columns or trades_df["Days Held"].isnull().all():
-            avg_trade_duration = trading_days / max(1, len(trades_df))  # Fallback method
-        else:
-            avg_trade_duration = trades_df["Days Held"].mean()
-
-        # Correct Max Drawdown Calculation using Portfolio Equity
-        portfolio_values = self.initial_capital + (trades_df["Profit %"].cumsum() / 100 * self.initial_capital)
-        rolling_max = portfolio_values.cummax()
-        drawdown = (portfolio_values - rolling_max) / rolling_max
-        max_drawdown = float(drawdown.min())  # Ensure correct drawdown value as scalar
-
-        # Basic Metrics
-        total_trades = len(trades_df)
-        win_rate = (len(wins) / total_trades * 100) if total_trades > 0 else 0
-        sharpe_ratio = trades_df["Profit %"].mean() / trades_df["Profit %"].std() if trades_df["Profit %"].std() > 0 else 0
-        total_profit = wins["Profit %"].sum()
-        total_loss = abs(losses["Profit %"].sum())
-        profit_factor = total_profit / total_loss if total_loss > 0 else float("inf")
-        cagr = ((self.capital / self.initial_capital) ** (365 / trading_days) - 1) * 100 if trading_days > 0 else 0
-
-        avg_profit_per_trade = trades_df["Profit %"].mean() if not trades_df.empty else 0
-        max_trade_gain = trades_df["Profit %"].max() if not trades_df.empty else 0
-        max_trade_loss = trades_df["Profit %"].min() if not trades_df.empty else 0
-        risk_reward_ratio = abs(max_trade_gain / max_trade_loss) if max_trade_loss != 0 else float("inf")
-        volatility = trades_df["Profit %"].std() if not trades_df.empty else 0
-
-        # Fix Streak Calculation
-        trades_df["Win"] = trades_df["Profit %"] > 0
-        trades_df["Streak"] = trades_df["Win"].groupby((trades_df["Win"] != trades_df["Win"].shift()).cumsum()).cumcount() + 1
-
-        longest_win_streak = trades_df[trades_df["Win"] == True]["Streak"].max() if not trades_df.empty else 0
-        longest_loss_streak = trades_df[trades_df["Win"] == False]["Streak"].max() if not trades_df.empty else 0
-
-        # Debug Prints for Validation
-        print(f"Buy Signals: {len(self.buy_signals)}, Sell Signals: {len(self.sell_signals)}, Total Trades: {total_trades}")
-        print(f"Avg Trade Duration: {avg_trade_duration}, Computed from {'trading_days' if 'Days Held' not in trades_df.columns else 'Days Held'}")
-        print(f"Max Drawdown: {max_drawdown}")
+        # Drawdown, Sharpe, volatility and CAGR come from the per-bar equity curve when there is
+        # one, the per-trade estimates above only remain for orders placed outside of run()
+        equity_curve = self.equity_curve() if equity_metrics is None and len(self.data) > 1 else None
+        if equity_metrics is not None:
+            metrics.update(equity_metrics)
+        elif equity_curve is not None:
+            years = (equity_curve.index[-1] - equity_curve.index[0]).total_seconds() / (365 * 24 * 3600)
+            metrics.update(equity_statistics(equity_curve["Equity"].to_numpy(), years))
 
         # Color coding for profit/loss
         profit_color = "green" if self.capital > self.initial_capital else "red" if self.capital < self.initial_capital else "white"
 
         stats = {
             "Strategy": self.strategy.get_name(),
-            "Total Trades": total_trades,
-            "Win Rate (%)": win_rate,
-            "Max Drawdown": max_drawdown,
-            "Sharpe Ratio": sharpe_ratio,
-            "Profit Factor": profit_factor,
-            "CAGR (%)": cagr,
-            "Avg Profit per Trade (%)": avg_profit_per_trade,
-            "Avg Trade Duration (days)": avg_trade_duration,
-            "Max Trade Gain (%)": max_trade_gain,
-            "Max Trade Loss (%)": max_trade_loss,
-            "Risk-Reward Ratio": risk_reward_ratio,
-            "Volatility (Std Dev)": volatility,
-            "Longest Win Streak": longest_win_streak,
-            "Longest Loss Streak": longest_loss_streak,
-            "Trading Days": trading_days,
+            **metrics,
             "Initial Portfolio Value": f"${self.initial_capital}",
             "Current Portfolio Value": f"[{profit_color}]${self.capital:.2f}[/{profit_color}]",
             "Percent Return": f"[{profit_color}]{((self.capital - self.initial_capital) / self.initial_capital) * 100:.2f}%[/{profit_color}]"
         }
 
-        self.logger.info(f"Updated Statistics: {stats}")
+        self.logger.debug("Updated Statistics: %s", stats)  # Lazy, sweeps call this millions of times
         return stats
@@ -0,0 +1,79 @@
+import argparse  # benchmarks/memory.py
+import gc
+import json
+import logging
+import sys
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import gbm_prices
+from strategies.registry import STRATEGIES
+from utils import compact_frame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BARS = [100_000, 1_000_000]
+
+def retained_bytes(data, strategy, signals):
+    """Bytes held once the signals are generated: the frame, side indicators and the signals."""
+    total = int(data.memory_usage(deep=True).sum())
+    total += sum(values.nbytes for values in strategy.indicators.values())
+    if strategy.compact:
+        total += signals.nbytes  # In the standard mode the signals are a column of the frame
+    return total
+
+def measure(strategy_name, n_bars, compact, seed=0):
+    """Retained and peak traced memory of preparing one symbol's data and signals."""
+    raw = gbm_prices(n_bars, bars_per_year=n_bars, seed=seed)  # One year of bars keeps prices in float32 range
+    gc.collect()
+    tracemalloc.start()
+    try:
+        data = compact_frame(raw) if compact else raw.copy()
+        strategy = STRATEGIES[strategy_name](data, compact=compact)
+        signals = strategy.generate_signals()
+        if not compact:
+            data["Signal"] = signals  # What main.prepare_data does in the standard mode
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"retained_bytes": retained_bytes(data, strategy, np.asarray(signals)), "peak_bytes": peak}
+
+def run_memory_benchmarks(bar_counts=DEFAULT_BARS, strategies=None, seed=0):
+    """
+    Compare the standard and compact frame layouts for each strategy and history size.
+
+    :return: Report dict with one result per (strategy, bars)
+    """
+    results = []
+    for n_bars in bar_counts:
+        for name in strategies or STRATEGIES:
+            standard = measure(name, n_bars, False, seed)
+            compact = measure(name, n_bars, True, seed)
+            result = {
+                "strategy": name, "bars": n_bars,
+                "standard_retained_mb": standard["retained_bytes"] / 1e6, "compact_retained_mb": compact["retained_bytes"] / 1e6,
+                "standard_peak_mb": standard["peak_bytes"] / 1e6, "compact_peak_mb": compact["peak_bytes"] / 1e6,
+                "retained_reduction": 1 - compact["retained_bytes"] / standard["retained_bytes"],
+            }
+            logger.info(f"{name:5s} {n_bars:>10,d} bars  retained {result['standard_retained_mb']:8.1f} MB -> "
+                        f"{result['compact_retained_mb']:8.1f} MB ({result['retained_reduction']:.0%} less)  "
+                        f"peak {result['standard_peak_mb']:8.1f} MB -> {result['compact_peak_mb']:8.1f} MB")
+            results.append(result)
+    return {"meta": {"python": sys.version.split()[0], "numpy": np.__version__, "seed": seed}, "results": results}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    for name in ("strategies.sma", "strategies.rsi", "strategies.macd"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description="Memory of the standard vs compact (--compact) price frames.")
+    parser.add_argument('--bars', type=int, nargs='+', default=DEFAULT_BARS, help="History sizes to measure.")
+    parser.add_argument('--strategies', nargs='+', choices=list(STRATEGIES), help="Only measure these strategies.")
+    parser.add_argument('--output', type=str, default="memory_results.json", help="Where to write the JSON report.")
+    args = parser.parse_args()
+
+    report = run_memory_benchmarks(args.bars, args.strategies)
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    logger.info(f"Memory results saved to {args.output}")
@@ -0,0 +1,181 @@
+import argparse  # benchmarks/run_benchmarks.py
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from ai_model import AIModel
+from backtester import Backtester
+from benchmarks.synthetic import gbm_prices
+from config import INITIAL_CAPITAL
+from features import clear_feature_cache
+from strategies.registry import STRATEGIES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BARS = [1_000, 10_000, 100_000, 1_000_000]
+
+# Largest history each stage is run on, the per-bar loop and model fitting get too slow past these
+STAGE_MAX_BARS = {
+    "backtest_loop": 1_000_000,
+    "ai_train": 100_000,
+    "backtest_loop_ai": 100_000,
+    "backtest_vectorized_ai": 100_000,
+}
+
+def _signal_frame(n_bars, seed):
+    """Synthetic history with SMA signals and features, shared by the backtest stages."""
+    data = gbm_prices(n_bars, seed=seed)
+    strategy = STRATEGIES["SMA"](data)
+    data["Signal"] = strategy.generate_signals()
+    return data, strategy
+
+def _trained_model(data, strategy):
+    ai_model = AIModel(strategy)
+    return ai_model.train(data)
+
+def make_stages(n_bars, seed):
+    """
+    Build the benchmark stages for one history size.
+
+    The AI stages clear the process-wide feature cache in their setup, otherwise every repeat
+    after the first would reuse the matrix of the one before and skip building the features.
+
+    :return: Dict of stage name to (setup, run) callables. setup() is untimed and returns the
+             argument passed to run().
+    """
+    def strategy_stage(name):
+        def setup():
+            data = gbm_prices(n_bars, seed=seed)
+            return STRATEGIES[name](data)
+        return setup, lambda strategy: strategy.generate_signals()
+
+    def backtest_stage(engine, use_ai):
+        def setup():
+            data, strategy = _signal_frame(n_bars, seed)
+            model, scaler = _trained_model(data, strategy) if use_ai else (None, None)
+            clear_feature_cache()  # Training built the matrix the backtest would otherwise reuse
+            return lambda: Backtester(data, INITIAL_CAPITAL, use_ai, strategy, model, scaler, engine=engine)
+        return setup, lambda make_backtester: make_backtester().run()
+
+    def ai_train_setup():
+        data, strategy = _signal_frame(n_bars, seed)
+        clear_feature_cache()
+        return lambda: AIModel(strategy).train(data)
+
+    def statistics_setup():
+        data, strategy = _signal_frame(n_bars, seed)
+        backtester = Backtester(data, INITIAL_CAPITAL, False, strategy, engine="vectorized")
+        backtester.run()
+        return backtester
+
+    return {
+        "sma_signals": strategy_stage("SMA"),
+        "rsi_signals": strategy_stage("RSI"),
+        "macd_signals": strategy_stage("MACD"),
+        "ai_train": (ai_train_setup, lambda train: train()),
+        "backtest_loop": backtest_stage("loop", False),
+        "backtest_vectorized": backtest_stage("vectorized", False),
+        "backtest_loop_ai": backtest_stage("loop", True),
+        "backtest_vectorized_ai": backtest_stage("vectorized", True),
+        "trade_statistics": (statistics_setup, lambda backtester: backtester.calculate_trade_statistics()),
+    }
+
+def time_stage(setup, run, repeats):
+    """Time run(setup()) repeats times with a fresh setup each time, returns the timings in seconds."""
+    timings = []
+    for _ in range(repeats):
+        argument = setup()
+        start = time.perf_counter()
+        run(argument)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def run_benchmarks(bar_counts=DEFAULT_BARS, stages=None, repeats=3, seed=0):
+    """
+    Run every stage on synthetic histories of each size.
+
+    :return: Report dict with environment metadata and one result per (stage, bars)
+    """
+    results = []
+    for n_bars in bar_counts:
+        for name, (setup, run) in make_stages(n_bars, seed).items():
+            if stages and name not in stages:
+                continue
+            if n_bars > STAGE_MAX_BARS.get(name, float("inf")):
+                logger.info(f"Skipping {name} at {n_bars} bars (limit {STAGE_MAX_BARS[name]})")
+                continue
+            timings = time_stage(setup, run, repeats)
+            result = {"stage": name, "bars": n_bars, "best_s": min(timings), "median_s": statistics.median(timings),
+                      "repeats": repeats, "bars_per_s": n_bars / min(timings)}
+            logger.info(f"{name:24s} {n_bars:>10,d} bars  best {result['best_s']:.4f}s")
+            results.append(result)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+def compare(report, baseline, threshold):
+    """
+    Compare a report against a baseline report.
+
+    :param threshold: Allowed slowdown as a fraction, 0.2 flags anything more than 20% slower
+    :return: List of comparison rows (stage, bars, baseline_s, current_s, ratio, regression)
+    """
+    baseline_results = {(r["stage"], r["bars"]): r for r in baseline["results"]}
+    rows = []
+    for result in report["results"]:
+        previous = baseline_results.get((result["stage"], result["bars"]))
+        if previous is None:
+            continue
+        ratio = result["best_s"] / previous["best_s"] if previous["best_s"] > 0 else float("inf")
+        rows.append({"stage": result["stage"], "bars": result["bars"], "baseline_s": previous["best_s"],
+                     "current_s": result["best_s"], "ratio": ratio, "regression": ratio > 1 + threshold})
+    return rows
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    # The pipeline logs every signal count and trade summary, keep the benchmark output readable
+    for name in ("backtester", "ai_model", "strategies.sma", "strategies.rsi", "strategies.macd"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description="Quantanamo Bae pipeline benchmarks on synthetic GBM histories.")
+    parser.add_argument('--bars', type=int, nargs='+', default=DEFAULT_BARS, help="History sizes to benchmark.")
+    parser.add_argument('--stages', nargs='+', help="Only run these stages.")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed runs per stage, the best one is reported.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic price generator.")
+    parser.add_argument('--output', type=str, default="benchmark_results.json", help="Where to write the JSON report.")
+    parser.add_argument('--baseline', type=str, help="Baseline JSON report to compare against.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown vs the baseline (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.bars, args.stages, args.repeats, args.seed)
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    logger.info(f"Benchmark results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            rows = compare(report, json.load(fh), args.threshold)
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else "ok"
+            print(f"{row['stage']:24s} {row['bars']:>10,d}  {row['baseline_s']:.4f}s -> {row['current_s']:.4f}s  "
+                  f"x{row['ratio']:.2f}  {flag}")
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
@@ -0,0 +1,108 @@
+import argparse  # benchmarks/shared_memory.py
+import json
+import logging
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import gbm_prices
+from shared_arrays import attach_frame, share_frame
+from utils import normalize_price_frame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BARS = 2_000_000
+DEFAULT_WORKERS = [1, 2, 4, 8]
+
+def private_bytes():
+    """Memory only this process maps (Private_Clean + Private_Dirty), shared pages are left out."""
+    try:
+        with open("/proc/self/smaps_rollup") as fh:
+            return sum(int(line.split()[1]) * 1024 for line in fh if line.startswith(("Private_Clean", "Private_Dirty")))
+    except OSError:
+        import resource  # Peak RSS in KB without procfs, counts shared pages too
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+# Private memory of each worker before its first task, set by _init_worker
+_baseline = {}
+
+def _init_worker():
+    _baseline["bytes"] = private_bytes()
+
+def _task(payload, shared):
+    """
+    Materialize the frame a backtest task would get and report how much private memory this
+    worker has grown by while holding it. A pickled frame is unpickled before the task starts.
+    """
+    data = attach_frame(payload) if shared else payload
+    data["Close"].to_numpy().sum()  # Touch the prices so every page is mapped in
+    data["Open"].to_numpy().sum()
+    return os.getpid(), private_bytes() - _baseline["bytes"]
+
+def measure(data, n_workers, shared, tasks_per_worker=2):
+    """
+    Run tasks that each receive the price frame, pickled or as a shared memory handle.
+
+    :return: Dict with the summed per-worker memory, the bytes pickled per task and the wall time
+    """
+    shared_frame = share_frame(data) if shared else None
+    payload = shared_frame.handle if shared else data
+    start = time.perf_counter()
+    try:
+        n_tasks = n_workers * tasks_per_worker
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker) as executor:
+            results = list(executor.map(_task, [payload] * n_tasks, [shared] * n_tasks))
+    finally:
+        if shared_frame is not None:
+            shared_frame.close()
+
+    per_worker = {}
+    for pid, delta in results:
+        per_worker[pid] = max(per_worker.get(pid, 0), delta)
+    return {
+        "worker_mb": sum(per_worker.values()) / 1e6,
+        "payload_bytes": len(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)),
+        "wall_s": time.perf_counter() - start,
+    }
+
+def run_shared_memory_benchmarks(n_bars=DEFAULT_BARS, worker_counts=DEFAULT_WORKERS, seed=0):
+    """
+    Compare pickling the price frame into every task with attaching to one shared copy.
+
+    :return: Report dict with one result per worker count
+    """
+    data = normalize_price_frame(gbm_prices(n_bars, seed=seed))
+    frame_mb = data.memory_usage(deep=True).sum() / 1e6
+    results = []
+    for n_workers in worker_counts:
+        pickled = measure(data, n_workers, shared=False)
+        shared = measure(data, n_workers, shared=True)
+        result = {
+            "workers": n_workers, "bars": n_bars, "frame_mb": frame_mb,
+            "pickled_worker_mb": pickled["worker_mb"], "shared_worker_mb": shared["worker_mb"],
+            "pickled_payload_bytes": pickled["payload_bytes"], "shared_payload_bytes": shared["payload_bytes"],
+            "pickled_wall_s": pickled["wall_s"], "shared_wall_s": shared["wall_s"],
+        }
+        logger.info(f"{n_workers:2d} workers  private memory {result['pickled_worker_mb']:8.1f} MB pickled vs "
+                    f"{result['shared_worker_mb']:6.1f} MB shared  payload {result['pickled_payload_bytes'] / 1e6:.1f} MB vs "
+                    f"{result['shared_payload_bytes']} B  wall {result['pickled_wall_s']:.2f}s vs {result['shared_wall_s']:.2f}s")
+        results.append(result)
+    return {"meta": {"python": sys.version.split()[0], "numpy": np.__version__, "seed": seed}, "results": results}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+
+    parser = argparse.ArgumentParser(description="Worker memory of pickled vs shared memory price frames.")
+    parser.add_argument('--bars', type=int, default=DEFAULT_BARS, help="History size.")
+    parser.add_argument('--workers', type=int, nargs='+', default=DEFAULT_WORKERS, help="Worker counts to measure.")
+    parser.add_argument('--output', type=str, default="shared_memory_results.json", help="Where to write the JSON report.")
+    args = parser.parse_args()
+
+    report = run_shared_memory_benchmarks(args.bars, args.workers)
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    logger.info(f"Shared memory results saved to {args.output}")
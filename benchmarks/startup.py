@@ -0,0 +1,81 @@
+import argparse  # benchmarks/startup.py
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.run_benchmarks import compare
+from benchmarks.synthetic import gbm_prices
+from config import TRADE_WINDOW_START_DATE, TRADE_WINDOW_END_DATE
+from data_loader import cache_file_path, save_cached_frame
+
+logger = logging.getLogger(__name__)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def time_command(command, cwd, repeats):
+    """Wall time of a fresh interpreter running command, repeats times."""
+    env = {**os.environ, "PYTHONPATH": REPO_DIR}
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def seed_cache(cache_dir, symbol):
+    """Write a synthetic history covering the configured trade window into the price cache."""
+    start, end = pd.Timestamp(TRADE_WINDOW_START_DATE), pd.Timestamp(TRADE_WINDOW_END_DATE)
+    data = gbm_prices(len(pd.bdate_range(start, end, inclusive="left")), symbol=symbol)
+    data.index = pd.bdate_range(start, end, inclusive="left", name="Date")
+    save_cached_frame(cache_file_path(cache_dir, symbol), data, (start, end))
+
+def run_startup_benchmarks(repeats=5, symbol="SYN"):
+    """
+    Time a bare `import main` and a full no-AI, no-plot run on cached data, each in a fresh
+    interpreter so import costs are included.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        seed_cache(os.path.join(workdir, ".cache", "ohlcv"), symbol)
+        commands = {
+            "startup_import_main": [sys.executable, "-c", "import main"],
+            "startup_run_no_ai_cached": [sys.executable, os.path.join(REPO_DIR, "main.py"), "--stock", symbol,
+                                         "--disable-ai", "--offline"],
+        }
+        for name, command in commands.items():
+            timings = time_command(command, workdir, repeats)
+            results.append({"stage": name, "bars": 0, "best_s": min(timings), "median_s": statistics.median(timings),
+                            "repeats": repeats})
+            logger.info(f"{name:28s} best {min(timings):.3f}s  median {statistics.median(timings):.3f}s")
+    return {"meta": {"python": sys.version.split()[0]}, "results": results}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+
+    parser = argparse.ArgumentParser(description="Quantanamo Bae CLI startup time benchmark.")
+    parser.add_argument('--repeats', type=int, default=5, help="Fresh interpreter runs per measurement.")
+    parser.add_argument('--output', type=str, default="startup_results.json", help="Where to write the JSON report.")
+    parser.add_argument('--baseline', type=str, help="Baseline JSON report to compare against.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown vs the baseline (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    report = run_startup_benchmarks(args.repeats)
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    logger.info(f"Startup results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            rows = compare(report, json.load(fh), args.threshold)
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else "ok"
+            print(f"{row['stage']:28s} {row['baseline_s']:.3f}s -> {row['current_s']:.3f}s  x{row['ratio']:.2f}  {flag}")
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
@@ -0,0 +1,33 @@
+import numpy as np  # benchmarks/synthetic.py
+import pandas as pd
+
+def gbm_prices(n_bars, symbol="SYN", s0=100.0, mu=0.05, sigma=0.2, bars_per_year=252, freq="min", seed=0):
+    """
+    Synthetic OHLCV history from geometric Brownian motion, in the same layout as fetch_stock_data.
+
+    :param n_bars: Number of bars to generate
+    :param symbol: Ticker used in the column MultiIndex
+    :param s0: Starting price
+    :param mu: Annual drift
+    :param sigma: Annual volatility
+    :param bars_per_year: Bars per year, scales mu and sigma per bar
+    :param freq: Bar frequency of the DatetimeIndex ("min" keeps 10M bars inside the Timestamp range)
+    :param seed: Random seed, the same seed always gives the same history
+    :return: DataFrame with Close/High/Low/Open/Volume columns
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / bars_per_year
+    log_returns = rng.normal((mu - 0.5 * sigma ** 2) * dt, sigma * np.sqrt(dt), n_bars)
+    close = s0 * np.exp(np.cumsum(log_returns))
+
+    spread = np.abs(rng.normal(0, sigma * np.sqrt(dt), n_bars)) * close
+    open_ = np.concatenate(([s0], close[:-1]))
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(1_000, 1_000_000, n_bars)
+
+    index = pd.date_range("2000-01-03", periods=n_bars, freq=freq, name="Date")
+    columns = pd.MultiIndex.from_product([["Close", "High", "Low", "Open", "Volume"], [symbol]], names=["Price", "Ticker"])
+    data = pd.DataFrame(np.column_stack([close, high, low, open_, volume]), index=index, columns=columns)
+    data[("Volume", symbol)] = volume
+    return data
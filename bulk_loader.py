@@ -0,0 +1,233 @@
+import logging  # bulk_loader.py
+import argparse
+import io
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from config import (
+    BULK_BACKOFF_BASE, BULK_BACKOFF_MAX, BULK_BURST, BULK_MAX_RETRIES, BULK_MAX_WORKERS, BULK_RATE_LIMIT,
+    DATA_CACHE_DIR, DATA_OFFLINE, TRADE_WINDOW_END_DATE, TRADE_WINDOW_START_DATE
+)
+from data_loader import download_stock_data, fetch_stock_data
+
+logger = logging.getLogger(__name__)
+
+
+class NonRetryableError(Exception):
+    """A transport failure that asking again won't fix, e.g. an unknown symbol."""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens refill at `rate` per second up to `capacity`, each request takes one. Up to
+    `capacity` requests can go out at once, after that they are spaced 1 / rate seconds apart.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        """
+        :param rate: Tokens added per second, None disables the limit
+        :param capacity: Most tokens held at once (the burst size)
+        :param clock: Monotonic clock in seconds, injectable for tests
+        :param sleep: Sleep function, injectable for tests
+        """
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(self.capacity)
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, blocking until one is available. Returns the seconds waited."""
+        if not self.rate:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            # Sleep outside the lock so other threads can refill and take tokens meanwhile
+            self.sleep(delay)
+            waited += delay
+
+
+class HTTPCSVTransport:
+    """
+    Transport that GETs daily bars as CSV from an HTTP endpoint.
+
+    The URL template is formatted with symbol, start and end (YYYY-MM-DD), the response must be
+    a CSV with a Date column followed by the price columns. A 404 is not retried, other HTTP
+    and connection errors are.
+    """
+
+    def __init__(self, url_template, timeout=10.0):
+        """
+        :param url_template: e.g. "http://localhost:8000/{symbol}.csv?start={start}&end={end}"
+        :param timeout: Socket timeout in seconds per request
+        """
+        self.url_template = url_template
+        self.timeout = timeout
+
+    def __call__(self, stock_symbol, start_date, end_date):
+        url = self.url_template.format(
+            symbol=urllib.parse.quote(stock_symbol), start=start_date, end=end_date
+        )
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                raise NonRetryableError(f"{stock_symbol} not found ({url})") from e
+            raise
+        return pd.read_csv(io.BytesIO(body), index_col="Date", parse_dates=True)
+
+
+class BulkLoadResult:
+    """Frames and per-symbol outcomes of a BulkLoader.load call."""
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self.frames = {}  # symbol -> DataFrame for every symbol that loaded
+        self.errors = {}  # symbol -> error message for every symbol that didn't
+        self.attempts = {}  # symbol -> transport calls made, retries included
+
+    def summary(self):
+        """DataFrame with one row per symbol: bars loaded, attempts and the error if it failed."""
+        return pd.DataFrame([{
+            "Symbol": symbol,
+            "Bars": len(self.frames[symbol]) if symbol in self.frames else 0,
+            "Attempts": self.attempts.get(symbol, 0),
+            "Error": self.errors.get(symbol),
+        } for symbol in self.symbols])
+
+
+class BulkLoader:
+    """
+    Fetches many symbols concurrently through fetch_stock_data.
+
+    Symbols are spread over a thread pool of max_workers, which bounds the requests in flight.
+    Every transport call first takes a token from a shared TokenBucket, and failed calls are
+    retried with exponential backoff plus jitter up to max_retries times. The per-symbol cache of
+    data_loader still applies, only ranges missing from it go to the transport. A symbol that
+    still fails, or comes back with no bars, is reported in the result instead of an empty frame.
+    """
+
+    def __init__(self, transport=None, max_workers=BULK_MAX_WORKERS, rate=BULK_RATE_LIMIT, burst=BULK_BURST,
+                 max_retries=BULK_MAX_RETRIES, backoff_base=BULK_BACKOFF_BASE, backoff_max=BULK_BACKOFF_MAX,
+                 cache_dir=DATA_CACHE_DIR, offline=DATA_OFFLINE, sleep=time.sleep, clock=time.monotonic):
+        """
+        :param transport: Callable (symbol, start_date, end_date) -> DataFrame that raises on
+                          failure, download_stock_data (Yahoo Finance) by default
+        :param max_workers: Symbols fetched at once
+        :param rate: Transport calls per second across all workers, None disables the limit
+        :param burst: Calls that may go out back to back before the rate applies
+        :param max_retries: Retries per transport call after the first attempt
+        :param backoff_base: Seconds before the first retry, doubled on every further one
+        :param backoff_max: Cap on the seconds between retries
+        """
+        self.transport = transport or download_stock_data
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.sleep = sleep
+        self.bucket = TokenBucket(rate, burst, clock=clock, sleep=sleep)
+        self._attempts = {}
+        self._attempts_lock = threading.Lock()
+
+    def backoff(self, retry):
+        """Seconds to wait before the given retry (1-based), with full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (retry - 1)))
+
+    def download(self, stock_symbol, start_date, end_date):
+        """Call the transport for one range, rate limited and retried. Raises the last error."""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self._attempts_lock:
+                self._attempts[stock_symbol] = self._attempts.get(stock_symbol, 0) + 1
+            try:
+                return self.transport(stock_symbol, start_date, end_date)
+            except NonRetryableError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt + 1)
+                logger.warning(f"Fetching {stock_symbol} failed ({e}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s.")
+                self.sleep(delay)
+
+    def fetch(self, stock_symbol, start_date, end_date):
+        """Fetch one symbol through the cache, raising if it fails or has no bars."""
+        data = fetch_stock_data(stock_symbol, start_date, end_date, cache_dir=self.cache_dir, offline=self.offline,
+                                download=self.download, raise_errors=True)
+        if data.empty:
+            raise ValueError(f"No data for {stock_symbol} in range {start_date} to {end_date}")
+        return data
+
+    def load(self, symbols, start_date=TRADE_WINDOW_START_DATE, end_date=TRADE_WINDOW_END_DATE):
+        """
+        Fetch every symbol and collect the outcomes.
+
+        :param symbols: List of stock symbols
+        :return: BulkLoadResult with the frames that loaded and the errors of the ones that didn't
+        """
+        symbols = list(dict.fromkeys(symbols))
+        result = BulkLoadResult(symbols)
+        logger.info(f"Fetching {len(symbols)} symbols with {self.max_workers} threads...")
+
+        def fetch_one(symbol):
+            try:
+                return symbol, self.fetch(symbol, start_date, end_date), None
+            except Exception as e:
+                return symbol, None, f"{type(e).__name__}: {e}"
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for symbol, data, error in executor.map(fetch_one, symbols):
+                if error is None:
+                    result.frames[symbol] = data
+                else:
+                    result.errors[symbol] = error
+                result.attempts[symbol] = self._attempts.pop(symbol, 0)
+
+        logger.info(f"Fetched {len(result.frames)} of {len(symbols)} symbols, {len(result.errors)} failed.")
+        return result
+
+
+if __name__ == "__main__":
+    from main import load_universe
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    logging.getLogger("data_loader").setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description="Quantanamo Bae bulk price downloader.")
+    parser.add_argument('universe', help="File of symbols or comma separated symbols.")
+    parser.add_argument('--start', type=str, default=TRADE_WINDOW_START_DATE, help="First date (YYYY-MM-DD).")
+    parser.add_argument('--end', type=str, default=TRADE_WINDOW_END_DATE, help="End date, exclusive (YYYY-MM-DD).")
+    parser.add_argument('--workers', type=int, default=BULK_MAX_WORKERS, help="Symbols fetched at once.")
+    parser.add_argument('--rate', type=float, default=BULK_RATE_LIMIT, help="Requests per second.")
+    parser.add_argument('--retries', type=int, default=BULK_MAX_RETRIES, help="Retries per request.")
+    parser.add_argument('--url', type=str, default=None,
+                        help="CSV endpoint template with {symbol}, {start} and {end}, Yahoo Finance by default.")
+    args = parser.parse_args()
+
+    loader = BulkLoader(HTTPCSVTransport(args.url) if args.url else None, max_workers=args.workers,
+                        rate=args.rate, max_retries=args.retries)
+    print(loader.load(load_universe(args.universe), args.start, args.end).summary().to_string(index=False))
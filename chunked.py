@@ -0,0 +1,203 @@
+import logging  # chunked.py
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import CHUNK_BARS, COLUMNAR_STORE_DIR, INITIAL_CAPITAL, STRATEGY_NAME
+from backtester import Backtester
+from ledger import EquityAccumulator, equity_curve_values
+from strategies.registry import STRATEGIES
+from utils import extract_column_values
+
+logger = logging.getLogger(__name__)
+
+META_FILE = "meta.json"
+INDEX_FILE = "Date.bin"
+
+
+class ColumnarWriter:
+    """
+    Appends price frames to a columnar store: one raw binary file per column plus an int64
+    nanosecond (UTC) index file and a small JSON file with the dtypes, length and timezone.
+    The files can be memory-mapped by ColumnarPrices, so a history only ever needs to fit on disk.
+    """
+
+    def __init__(self, directory, columns=("Close",)):
+        """
+        :param directory: Directory of the store, created if missing and overwritten if it exists
+        :param columns: Price columns to keep
+        """
+        self.directory = directory
+        self.columns = list(columns)
+        self.length = 0
+        self.tz = None
+        self.last_date = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._files = {name: open(self._path(name), "wb") for name in [INDEX_FILE] + self.columns}
+
+    def _path(self, name):
+        return os.path.join(self.directory, name if name == INDEX_FILE else f"{name}.bin")
+
+    def append(self, data):
+        """
+        Write the next rows of the history.
+
+        :param data: DataFrame with a DatetimeIndex continuing the rows written so far
+        """
+        if len(data) == 0:
+            return
+        index = pd.DatetimeIndex(data.index)
+        if self.length == 0:
+            self.tz = None if index.tz is None else str(index.tz)
+        dates = index.as_unit("ns").asi8
+        if self.last_date is not None and dates[0] < self.last_date:
+            raise ValueError("Rows must be appended in date order")
+
+        self._files[INDEX_FILE].write(dates.tobytes())
+        for name in self.columns:
+            self._files[name].write(np.ascontiguousarray(extract_column_values(data, name), dtype=np.float64).tobytes())
+        self.length += len(data)
+        self.last_date = dates[-1]
+
+    def close(self):
+        for handle in self._files.values():
+            handle.close()
+        meta = {"length": self.length, "tz": self.tz, "columns": {name: "float64" for name in self.columns}}
+        with open(os.path.join(self.directory, META_FILE), "w") as fh:
+            json.dump(meta, fh, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_columnar(data, directory, columns=("Close",)):
+    """Write an in-memory price frame to a columnar store."""
+    with ColumnarWriter(directory, columns) as writer:
+        writer.append(data)
+    return ColumnarPrices(directory)
+
+
+def csv_to_columnar(path, directory, date_column="Date", columns=("Close",), chunk_rows=CHUNK_BARS):
+    """
+    Convert a CSV history to a columnar store without loading it whole.
+
+    :param path: CSV file with a date column and the price columns
+    :param chunk_rows: Rows parsed per step
+    """
+    with ColumnarWriter(directory, columns) as writer:
+        # round_trip parsing so prices match the floats the file was written from bit for bit
+        for chunk in pd.read_csv(path, chunksize=chunk_rows, float_precision="round_trip"):
+            writer.append(chunk.set_index(pd.DatetimeIndex(pd.to_datetime(chunk[date_column]))))
+    return ColumnarPrices(directory)
+
+
+class ColumnarPrices:
+    """Read side of a columnar store, every column is a read-only np.memmap."""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, META_FILE)) as fh:
+            meta = json.load(fh)
+        self.directory = directory
+        self.length = meta["length"]
+        self.tz = meta["tz"]
+
+        def memmap(name, dtype):
+            if self.length == 0:
+                return np.empty(0, dtype=dtype)  # np.memmap refuses empty files
+            return np.memmap(os.path.join(directory, name), dtype=dtype, mode="r", shape=(self.length,))
+
+        self._dates = memmap(INDEX_FILE, np.int64)
+        self.columns = {name: memmap(f"{name}.bin", dtype) for name, dtype in meta["columns"].items()}
+
+    def __len__(self):
+        return self.length
+
+    def dates(self, start=0, stop=None):
+        """DatetimeIndex of a range of rows, in the timezone the store was written with."""
+        values = np.array(self._dates[start:stop])
+        if self.tz is None:
+            return pd.DatetimeIndex(values.view("datetime64[ns]"))
+        return pd.DatetimeIndex(values.view("datetime64[ns]")).tz_localize("UTC").tz_convert(self.tz)
+
+    def chunks(self, chunk_size=CHUNK_BARS, column="Close"):
+        """
+        Yield (start, dates, values) for consecutive blocks of chunk_size rows. Each block is
+        copied out of the memory map, so only one block is resident at a time.
+        """
+        values = self.columns[column]
+        for start in range(0, self.length, chunk_size):
+            stop = min(start + chunk_size, self.length)
+            yield start, self.dates(start, stop), np.array(values[start:stop])
+
+
+def backtest_chunked(store, strategy, initial_capital=INITIAL_CAPITAL, chunk_size=CHUNK_BARS):
+    """
+    Backtest a columnar history one block at a time.
+
+    Each block goes through the strategy's update_chunk, which carries the indicator state
+    over from the previous block, and through the vectorized backtest engine, which carries
+    cash and the open position. The equity curve of the block is marked to market from the
+    new ledger rows and folded into an EquityAccumulator, so memory stays O(chunk_size) plus
+    the ledger, and the trades and statistics are the same as a backtest of the whole frame.
+
+    :param store: ColumnarPrices
+    :param strategy: Strategy instance, its incremental state is reset first
+    :return: (backtester, stats) like Backtester.run, the backtester holds the ledger
+    """
+    strategy.reset_state()
+    backtester = Backtester(pd.DataFrame(), initial_capital, False, strategy, engine="vectorized")
+    equity = EquityAccumulator()
+    first_date = last_date = None
+
+    for start, dates, close in store.chunks(chunk_size):
+        signals = strategy.update_chunk(close)
+        if first_date is None:
+            first_date = dates[0]
+        last_date = dates[-1]
+
+        # Holdings entering the block, the equity curve starts from them
+        cash, shares = backtester.capital, backtester.position
+        first_row = len(backtester.ledger)
+
+        # Like a full run, the very last bar of the history is never traded
+        tradable = len(close) - 1 if start + len(close) == len(store) else len(close)
+        backtester.run_arrays(dates[:tradable], close[:tradable], signals[:tradable], bar_offset=start)
+
+        rows = backtester.ledger.rows[first_row:]
+        equity.push(equity_curve_values(rows, close, cash, shares, bar_offset=start)[2])
+        logger.debug(f"Backtested bars {start:,d}-{start + len(close):,d}, {len(backtester.ledger)} orders so far")
+
+    equity_metrics = None
+    if len(store) > 1:
+        years = (last_date - first_date).total_seconds() / (365 * 24 * 3600)
+        equity_metrics = equity.statistics(years)
+    return backtester, backtester.calculate_trade_statistics(equity_metrics)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    logging.getLogger("backtester").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(description="Quantanamo Bae out-of-core backtest of a long price history.")
+    parser.add_argument('source', help="Columnar store directory, or a CSV file with Date and Close columns to convert first.")
+    parser.add_argument('--store', type=str, default=COLUMNAR_STORE_DIR, help="Where a CSV source is converted to.")
+    parser.add_argument('--strategy', type=str, choices=list(STRATEGIES), default=STRATEGY_NAME, help="Trading strategy.")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_BARS, help="Bars per block.")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.source):
+        store = ColumnarPrices(args.source)
+    else:
+        logger.info(f"Converting {args.source} to a columnar store in {args.store}...")
+        store = csv_to_columnar(args.source, args.store)
+
+    _, stats = backtest_chunked(store, STRATEGIES[args.strategy](None), chunk_size=args.chunk_size)
+    for key, value in stats.items():
+        print(f"{key}: {value}")
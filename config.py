@@ -11,6 +11,59 @@ TODAY = datetime(2025, 3, 11, 5, 51, 45, 203360) # datetime.today()
 TRADE_WINDOW_START_DATE = (TODAY - timedelta(days=180)).strftime('%Y-%m-%d')
 TRADE_WINDOW_END_DATE = TODAY.strftime('%Y-%m-%d')
 
+# ===========================
+# Data Cache
+# ===========================
+DATA_CACHE_DIR = ".cache/ohlcv"  # Per-symbol price cache, None disables caching
+DATA_OFFLINE = False  # Serve price data from the cache only, never download
+
+# ===========================
+# Bulk Downloads
+# ===========================
+BULK_MAX_WORKERS = 8  # Symbols downloaded at once by bulk_loader.py
+BULK_RATE_LIMIT = 2.0  # Download requests per second across all threads, None disables the limit
+BULK_BURST = 5  # Requests that may go out back to back before the rate limit applies
+BULK_MAX_RETRIES = 4  # Retries per failed request, with exponential backoff
+BULK_BACKOFF_BASE = 1.0  # Seconds before the first retry, doubled on every further one
+BULK_BACKOFF_MAX = 30.0  # Cap on the seconds between retries
+
+# ===========================
+# Universe Runs
+# ===========================
+UNIVERSE_WORKERS = None  # Worker processes for --universe, None uses every CPU
+UNIVERSE_RANK_BY = "CAGR (%)"  # Stats key the universe results are ranked by
+UNIVERSE_TABLE_COLUMNS = ["Rank", "Symbol", "Total Trades", "Win Rate (%)", "CAGR (%)", "Max Drawdown",
+                          "Sharpe Ratio", "Profit Factor", "Error"]
+
+# ===========================
+# Portfolio Backtests
+# ===========================
+PORTFOLIO_SIZING = "equal_weight"  # "equal_weight", "fixed_fraction" or "cash_split", see portfolio.py
+PORTFOLIO_MAX_POSITIONS = 20  # Most symbols held at once, equal_weight sizes each at equity / this
+PORTFOLIO_POSITION_FRACTION = 0.05  # Fraction of equity per new position with fixed_fraction sizing
+
+# ===========================
+# Parameter Sweeps
+# ===========================
+SWEEP_WORKERS = None  # Worker processes for sweep.py, None uses every CPU
+SWEEP_SORT_BY = "CAGR (%)"  # Stats key sweep results are sorted by
+HALVING_ETA = 3  # optimizer.py keeps the best 1/eta of the candidates per round and grows the history eta times
+HALVING_MIN_BARS = 252  # Bars of the first successive halving round, about a year of daily bars
+HALVING_TOP = 5  # Candidates the successive halving search backtests on the full history
+
+# ===========================
+# Streaming Replay
+# ===========================
+REPLAY_BATCH_SIZE = 1024  # Bars per batch a replay source hands to the engine
+REPLAY_QUEUE_SIZE = 64  # Batches buffered between the sources and the engine
+REPLAY_SPEED = None  # Replay speed as a multiple of real time, None replays as fast as possible
+
+# ===========================
+# Out-of-core Backtesting
+# ===========================
+CHUNK_BARS = 1_048_576  # Bars read from a columnar store, signalled and traded per step
+COLUMNAR_STORE_DIR = ".cache/columnar"  # Where CSV histories are converted to columnar files
+
 # ===========================
 # Trading Parameters
 # ===========================
@@ -18,11 +71,42 @@ INITIAL_CAPITAL = 32000  # Starting capital for trading
 MIN_PROFIT_THRESHOLD = 0.005  # 0.5% profit target for selling
 MIN_HOLD_DAYS = 1  # Minimum days to hold before selling
 STOP_LOSS_THRESHOLD = -0.03  # -3% stop-loss limit
+BACKTEST_ENGINE = "loop"  # "loop" (bar by bar) or "vectorized" (NumPy, same results)
 
 # ===========================
 # AI Settings
 # ===========================
 USE_AI = True  # Toggle AI model usage
+AI_PREDICT_CHUNK_SIZE = 100_000  # Bars per model.predict call when backtesting with AI
+MODEL_STORE_DIR = ".cache/models"  # Trained model cache, None disables it
+MODEL_STORE_MAX_ENTRIES = 200  # Cached models kept before the least recently used are evicted
+MODEL_STORE_MAX_BYTES = 2 * 1024 ** 3  # Size limit of the model cache in bytes
+WALK_FORWARD = False  # Train one model per rolling window and only predict the bars after it
+WALK_FORWARD_TRAIN_WINDOW = 60  # Bars each walk-forward model is trained on
+WALK_FORWARD_TEST_WINDOW = 20  # Out-of-sample bars each walk-forward model predicts
+WALK_FORWARD_N_JOBS = -1  # joblib workers for fitting walk-forward folds, -1 uses every CPU
+AI_FEATURE_LAGS = (1, 2, 3, 5)  # Bars each strategy feature is lagged by in the AI feature matrix, () for none
+AI_RETURN_WINDOWS = (1, 5, 20)  # Bars of the Close log return features
+AI_ROLLING_WINDOWS = (5, 20)  # Bars of the rolling return mean/std features
+AI_FEATURE_CACHE_ENTRIES = 8  # Feature matrices kept in memory by features.py, keyed by a fingerprint of the data
+
+# ===========================
+# Robustness Analysis
+# ===========================
+ROBUSTNESS_SAMPLES = 10_000  # Resampled histories per scheme
+ROBUSTNESS_BLOCK_SIZE = 20  # Days per block of the block bootstrap (about a trading month)
+ROBUSTNESS_PERCENTILES = (5, 25, 50, 75, 95)  # Percentile bands reported for every metric
+ROBUSTNESS_BATCH_ELEMENTS = 4_000_000  # Largest 2D sample array built at once, bounds memory
+ROBUSTNESS_SEED = 0  # Seed of the resampling, None draws a fresh one every run
+
+# ===========================
+# Plotting
+# ===========================
+PLOT_OUTPUT_DIR = "plots"  # Directory chart images are saved to
+PLOT_MAX_POINTS = 4000  # Price line is downsampled (LTTB) to at most this many points
+PLOT_MAX_ANNOTATIONS = 50  # Profit labels drawn per chart, the largest moves are labelled first
+PLOT_DPI = 150  # Resolution of saved charts
+PLOT_WORKERS = None  # Worker processes for batch plotting, None uses every CPU
 
 # ===========================
 # Strategy Parameters
@@ -31,4 +115,7 @@ STRATEGY_NAME = "SMA"  # Default strategy
 SMA_SHORT_WINDOW = 20  # Short-term Simple Moving Average window
 SMA_LONG_WINDOW = 50  # Long-term Simple Moving Average window
 
+COMPACT_FRAMES = False  # float32 prices, indicators kept out of the data frame and int8 signals (--compact)
+
 DEBUG=False
+PROFILE = False  # Report per-stage timing and memory (--profile)
@@ -1,31 +1,179 @@
 import logging  # data_loader.py
+import os
+import re
 import time
-import yfinance as yf
+import numpy as np
 import pandas as pd
-from config import DEBUG
+from config import DEBUG, DATA_CACHE_DIR, DATA_OFFLINE
+from utils import normalize_price_frame
 
 logger = logging.getLogger(__name__)
 
-def fetch_stock_data(stock_symbol, start_date, end_date):
+def fetch_stock_data(stock_symbol, start_date, end_date, cache_dir=DATA_CACHE_DIR, offline=DATA_OFFLINE,
+                     download=None, raise_errors=False):
     """
     Fetch historical stock market data using Yahoo Finance API.
 
+    Bars are kept in a per-symbol .npz cache under cache_dir. Only the parts of the requested
+    window that the cache doesn't cover yet are downloaded, repeat requests are served from disk.
+
     :param stock_symbol: Stock ticker symbol (e.g., "AAPL")
     :param start_date: Start date for data retrieval (YYYY-MM-DD)
     :param end_date: End date for data retrieval (YYYY-MM-DD)
-    :return: Pandas DataFrame containing historical stock data
+    :param cache_dir: Directory of the on-disk cache, None disables caching
+    :param offline: Serve from the cache only, never touch the network
+    :param download: Callable (symbol, start_date, end_date) -> DataFrame used for the network
+                     requests, download_stock_data by default (see bulk_loader for retries)
+    :param raise_errors: Re-raise download errors instead of logging them and returning what
+                         could be served, for callers that report failures per symbol
+    :return: Pandas DataFrame containing historical stock data, in the canonical flat layout
+             of utils.normalize_price_frame
     """
     logger.info(f"Fetching {stock_symbol} {start_date} to {end_date}...")
+    download = download or download_stock_data
 
-    try:
-        data = yf.download(stock_symbol, start=start_date, end=end_date, auto_adjust=True, progress=DEBUG)
-    except Exception as e:
-        logger.error(f"Error fetching data from yfinance: {e}")
-        return pd.DataFrame()  # Return an empty DataFrame on failure
+    if cache_dir is None:
+        if offline:
+            logger.error("Offline mode requires a data cache directory.")
+            return pd.DataFrame()
+        try:
+            data = download(stock_symbol, start_date, end_date)
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"Error fetching data from yfinance: {e}")
+            return pd.DataFrame()  # Return an empty DataFrame on failure
+    else:
+        data = _fetch_cached(stock_symbol, pd.Timestamp(start_date), pd.Timestamp(end_date), cache_dir, offline,
+                             download, raise_errors)
 
     if data.empty:
         logger.warning(f"No data returned for {stock_symbol} in range {start_date} to {end_date}.")
         return data
 
     logger.info(f"Data for {stock_symbol} fetched successfully.")
+    return normalize_price_frame(data)
+
+def download_stock_data(stock_symbol, start_date, end_date):
+    """Download one symbol from Yahoo Finance, raising on transport errors."""
+    import yfinance as yf  # Slow to import, cache hits and offline runs never need it
+
+    data = yf.download(stock_symbol, start=start_date, end=end_date, auto_adjust=True, progress=DEBUG)
+
+    # yf.download logs failures and hands back an empty frame. Its only per-symbol record of them is
+    # the private dict yf.shared._ERRORS (yfinance 0.2.x), so look it up defensively and raise when
+    # it names the symbol, a failed range must never be recorded as covered in the cache. An empty
+    # frame with no error, or one only reporting missing prices, is a range without trading days
+    # (a weekend, a holiday, before the listing date) and is returned so the cache marks it covered.
+    errors = getattr(getattr(yf, "shared", None), "_ERRORS", None)
+    error = errors.get(stock_symbol) if isinstance(errors, dict) else None
+    if error and not (data.empty and "no price data found" in str(error)):
+        raise RuntimeError(error)
     return data
+
+def _fetch_cached(stock_symbol, start, end, cache_dir, offline, download, raise_errors=False):
+    """Serve [start, end) from the cache, downloading and merging any missing ranges first."""
+    cache_path = cache_file_path(cache_dir, stock_symbol)
+    cached, covered = load_cached_frame(cache_path, stock_symbol)
+
+    missing = missing_ranges(covered, start, end)
+    if missing and offline:
+        logger.warning(f"Offline mode: cache for {stock_symbol} does not cover {start.date()} to {end.date()}, serving what is cached.")
+    elif missing:
+        frames = [] if cached is None else [cached]
+        covered_start, covered_end = covered if covered else (start, start)
+        downloaded = False
+        error = None
+        for range_start, range_end in missing:
+            logger.info(f"Downloading missing range {range_start.date()} to {range_end.date()} for {stock_symbol}...")
+            try:
+                frames.append(download(stock_symbol, range_start.strftime('%Y-%m-%d'), range_end.strftime('%Y-%m-%d')))
+            except Exception as e:
+                logger.error(f"Error fetching data from yfinance: {e}")
+                error = error or e
+                continue
+            downloaded = True
+            covered_start, covered_end = min(covered_start, range_start), max(covered_end, range_end)
+
+        if downloaded:
+            frames = [frame for frame in frames if not frame.empty]
+            if frames:
+                cached = pd.concat(frames)
+                cached = cached[~cached.index.duplicated(keep='last')].sort_index()
+            # Bars for today are still moving, never mark them as covered
+            covered_end = max(covered_start, min(covered_end, pd.Timestamp.today().normalize()))
+            save_cached_frame(cache_path, cached, (covered_start, covered_end))
+
+        # Whatever did download is cached above before the failure is passed on
+        if error is not None and raise_errors:
+            raise error
+
+    if cached is None:
+        return pd.DataFrame()
+    return cached[(cached.index >= start) & (cached.index < end)]
+
+def missing_ranges(covered, start, end):
+    """
+    Ranges of [start, end) that are not in the covered interval. The cache keeps one contiguous
+    interval, so a request past either end is extended all the way to it.
+
+    :param covered: (start, end) tuple of the cached interval, or None for an empty cache
+    :return: List of (start, end) Timestamp tuples to download
+    """
+    if start >= end:
+        return []
+    if covered is None:
+        return [(start, end)]
+
+    covered_start, covered_end = covered
+    ranges = []
+    if start < covered_start:
+        ranges.append((start, covered_start))
+    if end > covered_end:
+        ranges.append((covered_end, end))
+    return ranges
+
+def cache_file_path(cache_dir, stock_symbol):
+    """Path of the .npz cache file for a symbol."""
+    safe_symbol = re.sub(r'[^A-Za-z0-9_.-]', '_', stock_symbol)
+    return os.path.join(cache_dir, f"{safe_symbol}.npz")
+
+def load_cached_frame(cache_path, stock_symbol):
+    """
+    Load a cached frame in the same column layout yf.download returns.
+
+    :return: (DataFrame or None, covered (start, end) tuple or None)
+    """
+    if not os.path.exists(cache_path):
+        return None, None
+
+    try:
+        with np.load(cache_path, allow_pickle=False) as cache:
+            fields = [str(field) for field in cache['fields']]
+            index = pd.DatetimeIndex(cache['index'].view('datetime64[ns]'), name='Date')
+            values = {field: cache[f"col_{field}"] for field in fields}
+            covered = tuple(pd.Timestamp(value) for value in cache['covered'].view('datetime64[ns]'))
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable cache file {cache_path}: {e}")
+        return None, None
+
+    frame = pd.DataFrame({(field, stock_symbol): values[field] for field in fields}, index=index)
+    frame.columns = pd.MultiIndex.from_product([fields, [stock_symbol]], names=['Price', 'Ticker'])
+    return frame, covered
+
+def save_cached_frame(cache_path, frame, covered):
+    """Write a frame and its covered interval to the cache, replacing the file atomically."""
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+
+    if frame is None:
+        fields, index, arrays = [], np.array([], dtype=np.int64), {}
+    else:
+        fields = [col[0] if isinstance(col, tuple) else col for col in frame.columns]
+        index = frame.index.as_unit('ns').asi8 if frame.index.tz is None else frame.index.tz_convert(None).as_unit('ns').asi8
+        arrays = {f"col_{field}": frame.iloc[:, i].to_numpy() for i, field in enumerate(fields)}
+
+    covered = np.array([ts.value for ts in pd.DatetimeIndex(covered).as_unit('ns')], dtype=np.int64)
+    tmp_path = f"{cache_path}.{os.getpid()}.{time.time_ns()}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        np.savez(fh, fields=np.array(fields, dtype=str), index=index, covered=covered, **arrays)
+    os.replace(tmp_path, cache_path)
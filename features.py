@@ -0,0 +1,153 @@
+import logging  # features.py
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from config import AI_FEATURE_CACHE_ENTRIES, AI_FEATURE_LAGS, AI_RETURN_WINDOWS, AI_ROLLING_WINDOWS
+from utils import extract_column_values, extract_feature_matrix
+
+logger = logging.getLogger(__name__)
+
+# Feature matrices by fingerprint, least recently used first. Shared by every builder in the
+# process, so training and the backtest of the same run build the matrix once.
+_feature_cache = OrderedDict()
+
+
+class FeatureBuilder:
+    """
+    Builds the AI feature matrix of a price frame in one shot.
+
+    Columns, in order:
+      - the strategy features of the current bar (e.g. SMA_short, SMA_long)
+      - each strategy feature lagged by every lag in lags ("SMA_short_lag1", ...)
+      - the log return of Close over each window in return_windows ("return_5")
+      - the rolling mean and standard deviation of the one bar log returns over each window in
+        rolling_windows ("return_mean_20", "return_std_20")
+
+    Every column only looks back, so a row never sees a later bar, and rows without enough
+    history are NaN. The lags and windows are read from sliding_window_view views instead of
+    shifting and rolling column by column. The matrix is stored as one C-contiguous read-only
+    float32 array (the dtype the tree models fit on) and cached by a fingerprint of its inputs,
+    so AIModel training and batched Backtester inference consume the same matrix.
+    """
+
+    def __init__(self, lags=AI_FEATURE_LAGS, return_windows=AI_RETURN_WINDOWS, rolling_windows=AI_ROLLING_WINDOWS):
+        """
+        :param lags: Bars to lag each strategy feature by, empty for none
+        :param return_windows: Bars of each Close log return feature, empty for none
+        :param rolling_windows: Bars of each rolling return mean/std pair, empty for none
+        """
+        if any(lag < 1 for lag in (*lags, *return_windows)) or any(window < 2 for window in rolling_windows):
+            raise ValueError("Feature lags and return windows must be at least 1 bar, rolling windows at least 2")
+        self.lags = tuple(lags)
+        self.return_windows = tuple(return_windows)
+        self.rolling_windows = tuple(rolling_windows)
+
+    def feature_names(self, base_names):
+        """Names of the matrix columns for the given strategy feature names."""
+        names = list(base_names)
+        names += [f"{name}_lag{lag}" for name in base_names for lag in self.lags]
+        names += [f"return_{window}" for window in self.return_windows]
+        for window in self.rolling_windows:
+            names += [f"return_mean_{window}", f"return_std_{window}"]
+        return names
+
+    def fingerprint(self, close, base):
+        """Hash of the inputs and settings that decide the matrix."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr((self.lags, self.return_windows, self.rolling_windows)).encode())
+        for array in (close, base):
+            array = np.ascontiguousarray(array)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())
+            digest.update(array.tobytes())
+        return digest.hexdigest()
+
+    def build(self, data, feature_column_names):
+        """
+        Feature matrix of a frame, from the cache when the same inputs were built before.
+
+        :param data: DataFrame with Close and the strategy feature columns
+        :param feature_column_names: Strategy feature names (partial match allowed)
+        :return: (read-only float32 array of bars x features, list of column names)
+        :raises ValueError: If a feature column is not found
+        """
+        base = extract_feature_matrix(data, feature_column_names)
+        close = extract_column_values(data, "Close")
+        key = self.fingerprint(close, base)
+
+        cached = _feature_cache.get(key)
+        if cached is not None:
+            _feature_cache.move_to_end(key)
+            return cached
+
+        matrix = self.build_arrays(close, base)
+        entry = (matrix, self.feature_names(list(feature_column_names)))
+        _feature_cache[key] = entry
+        while len(_feature_cache) > AI_FEATURE_CACHE_ENTRIES:
+            _feature_cache.popitem(last=False)
+        logger.debug(f"Built {matrix.shape[1]} features over {matrix.shape[0]} bars ({matrix.nbytes / 1e6:.1f} MB)")
+        return entry
+
+    def build_arrays(self, close, base):
+        """
+        Feature matrix from arrays, uncached.
+
+        :param close: 1-D array of closing prices
+        :param base: 2-D array of the strategy features (bars x features)
+        :return: Read-only C-contiguous float32 array
+        """
+        close = np.asarray(close, dtype=np.float64)
+        base = np.asarray(base, dtype=np.float64)
+        base = base[:, None] if base.ndim == 1 else base
+        n_bars, n_base = base.shape
+        n_columns = n_base * (1 + len(self.lags)) + len(self.return_windows) + 2 * len(self.rolling_windows)
+        matrix = np.empty((n_bars, n_columns), dtype=np.float32)
+        matrix[:, :n_base] = base
+        column = n_base
+        if n_bars == 0:
+            matrix.flags.writeable = False
+            return matrix
+
+        if self.lags:
+            # windows[t, f, j] is feature f at bar t - max_lag + j, NaN before the first bar
+            max_lag = max(self.lags)
+            windows = sliding_window_view(_pad(base, max_lag), max_lag + 1, axis=0)
+            lagged = windows[:, :, [max_lag - lag for lag in self.lags]]
+            matrix[:, column:column + lagged.shape[1] * lagged.shape[2]] = lagged.reshape(n_bars, -1)
+            column += lagged.shape[1] * lagged.shape[2]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_close = np.log(close)
+
+        if self.return_windows:
+            longest = max(self.return_windows)
+            windows = sliding_window_view(_pad(log_close, longest), longest + 1)
+            for window in self.return_windows:
+                matrix[:, column] = windows[:, longest] - windows[:, longest - window]
+                column += 1
+
+        if self.rolling_windows:
+            returns = np.empty(n_bars)
+            returns[:1] = np.nan
+            returns[1:] = np.diff(log_close)
+            for window in self.rolling_windows:
+                # Row t holds the window of returns ending at t, NaN until the window is full
+                windows = sliding_window_view(_pad(returns, window - 1), window)
+                matrix[:, column] = windows.mean(axis=-1)
+                matrix[:, column + 1] = windows.std(axis=-1, ddof=1)
+                column += 2
+
+        matrix.flags.writeable = False
+        return matrix
+
+
+def _pad(values, count):
+    """values with count rows of NaN in front."""
+    return np.concatenate((np.full((count,) + values.shape[1:], np.nan), values))
+
+
+def clear_feature_cache():
+    """Drop every cached feature matrix."""
+    _feature_cache.clear()
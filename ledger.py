@@ -0,0 +1,328 @@
+import numpy as np  # ledger.py
+import pandas as pd
+
+BUY, SELL = 1, -1
+
+# One row per executed order. Dates are stored as int64 nanoseconds since the epoch (UTC) and
+# "bar" is the position of the order in the backtested frame. Profit % and Days Held are NaN
+# on BUY rows.
+LEDGER_DTYPE = np.dtype([
+    ("bar", np.int64),
+    ("date", np.int64),
+    ("action", np.int8),
+    ("price", np.float64),
+    ("shares", np.float64),
+    ("profit_pct", np.float64),
+    ("days_held", np.float64),
+])
+
+ACTION_NAMES = {BUY: "BUY", SELL: "SELL"}
+
+
+class TradeLedger:
+    """
+    Columnar record of the orders a backtest executes.
+
+    Rows live in a preallocated NumPy structured array that doubles in size when it fills up,
+    so appending a trade never reallocates per row and the statistics can read each column as
+    a contiguous array. The list views (trades, buy_signals, sell_signals) are built on demand
+    for the plotter and callers that want the old row layout.
+    """
+
+    def __init__(self, capacity=64):
+        self._rows = np.empty(max(1, capacity), dtype=LEDGER_DTYPE)
+        self._size = 0
+        self.tz = None  # Timezone of the dates, restored when rows are turned back into Timestamps
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def rows(self):
+        """The filled part of the ledger as a structured array view."""
+        return self._rows[:self._size]
+
+    def column(self, name):
+        return self._rows[name][:self._size]
+
+    def append(self, action, date, price, shares, profit_pct=np.nan, days_held=np.nan, bar=-1):
+        """
+        Record one order.
+
+        :param action: BUY or SELL
+        :param date: Anything pd.Timestamp accepts
+        :param bar: Position of the order in the backtested frame, -1 if unknown
+        """
+        if self._size == len(self._rows):
+            grown = np.empty(2 * len(self._rows), dtype=LEDGER_DTYPE)
+            grown[:self._size] = self._rows
+            self._rows = grown
+
+        timestamp = pd.Timestamp(date)
+        if self._size == 0:
+            self.tz = timestamp.tz
+        self._rows[self._size] = (bar, timestamp.value, action, price, shares, profit_pct, days_held)
+        self._size += 1
+
+    def _timestamps(self, dates):
+        return [pd.Timestamp(value, tz=self.tz) for value in dates.tolist()]
+
+    def trades(self):
+        """Rows as [date, action, price, shares, profit %, days held] lists, None on BUY rows."""
+        rows = self.rows
+        return [
+            [date, ACTION_NAMES[action], price, shares,
+             None if action == BUY else profit_pct, None if action == BUY else int(days_held)]
+            for date, action, price, shares, profit_pct, days_held in zip(
+                self._timestamps(rows["date"]), rows["action"].tolist(), rows["price"].tolist(),
+                rows["shares"].tolist(), rows["profit_pct"].tolist(), rows["days_held"].tolist()
+            )
+        ]
+
+    def buy_signals(self):
+        """BUY rows as (date, price, shares) tuples."""
+        rows = self.rows[self.column("action") == BUY]
+        return list(zip(self._timestamps(rows["date"]), rows["price"].tolist(), rows["shares"].tolist()))
+
+    def sell_signals(self):
+        """SELL rows as (date, price, shares, profit %) tuples."""
+        rows = self.rows[self.column("action") == SELL]
+        return list(zip(
+            self._timestamps(rows["date"]), rows["price"].tolist(), rows["shares"].tolist(), rows["profit_pct"].tolist()
+        ))
+
+
+def trade_statistics(profit_pct, days_held, trading_days, initial_capital, final_capital):
+    """
+    Compute the numeric performance metrics of a ledger in one pass over its columns.
+
+    Every BUY row counts as a trade with a NaN profit, which is how the metrics have always
+    been defined: it adds to Total Trades, breaks win streaks and lowers the win rate. Sums
+    are taken over the same values in the same order as the pandas implementation this
+    replaces, so the results match it exactly.
+
+    :param profit_pct: Profit % per ledger row, NaN on BUY rows
+    :param days_held: Days held per ledger row, NaN on BUY rows
+    :param trading_days: Calendar days between the first and last backtested bar
+    :return: Dict of stats keyed like Backtester.calculate_trade_statistics
+    """
+    profit_pct = np.asarray(profit_pct, dtype=np.float64)
+    days_held = np.asarray(days_held, dtype=np.float64)
+    total_trades = len(profit_pct)
+
+    sold = ~np.isnan(profit_pct)
+    n_sold = int(np.count_nonzero(sold))
+    win = profit_pct > 0
+    wins = profit_pct[win]
+    losses = profit_pct[profit_pct <= 0]
+
+    if np.isnan(days_held).all():
+        avg_trade_duration = trading_days / max(1, total_trades)  # Fallback method
+    else:
+        avg_trade_duration = np.nanmean(days_held)
+
+    # NaN rows are skipped by the running sum and max and left out of the drawdown
+    filled = np.where(sold, profit_pct, 0.0)
+    portfolio_values = np.where(sold, initial_capital + (np.cumsum(filled) / 100 * initial_capital), np.nan)
+    rolling_max = np.fmax.accumulate(portfolio_values)
+    drawdown = ((portfolio_values - rolling_max) / rolling_max)[sold]
+    max_drawdown = float(drawdown.min()) if n_sold else float("nan")
+
+    # Mean and sample standard deviation over the sold rows, summed with NaNs as zeros
+    if n_sold:
+        mean_profit = filled.sum() / n_sold
+        squared = (mean_profit - filled) ** 2
+        squared[~sold] = 0
+        volatility = np.sqrt(squared.sum() / (n_sold - 1)) if n_sold > 1 else np.float64("nan")
+        max_trade_gain, max_trade_loss = profit_pct[sold].max(), profit_pct[sold].min()
+    else:
+        mean_profit = volatility = max_trade_gain = max_trade_loss = np.float64("nan")
+
+    sharpe_ratio = mean_profit / volatility if volatility > 0 else 0
+    total_profit = wins.sum()
+    total_loss = abs(losses.sum())
+    profit_factor = total_profit / total_loss if total_loss > 0 else float("inf")
+    risk_reward_ratio = abs(max_trade_gain / max_trade_loss) if max_trade_loss != 0 else float("inf")
+
+    try:
+        cagr = ((final_capital / initial_capital) ** (365 / trading_days) - 1) * 100 if trading_days > 0 else 0
+    except OverflowError:
+        cagr = float("inf")  # Annualizing a large gain over a few days (e.g. minute bars) overflows
+
+    # Streaks are runs of equal win/not-win rows, BUY rows count as not-win
+    run_starts = np.flatnonzero(np.concatenate(([True], win[1:] != win[:-1])))
+    run_lengths = np.diff(np.append(run_starts, total_trades))
+    run_wins = win[run_starts]
+    longest_win_streak = run_lengths[run_wins].max() if run_wins.any() else float("nan")
+    longest_loss_streak = run_lengths[~run_wins].max() if not run_wins.all() else float("nan")
+
+    return {
+        "Total Trades": total_trades,
+        "Win Rate (%)": len(wins) / total_trades * 100 if total_trades > 0 else 0,
+        "Max Drawdown": max_drawdown,
+        "Sharpe Ratio": sharpe_ratio,
+        "Profit Factor": profit_factor,
+        "CAGR (%)": cagr,
+        "Avg Profit per Trade (%)": mean_profit,
+        "Avg Trade Duration (days)": avg_trade_duration,
+        "Max Trade Gain (%)": max_trade_gain,
+        "Max Trade Loss (%)": max_trade_loss,
+        "Risk-Reward Ratio": risk_reward_ratio,
+        "Volatility (Std Dev)": volatility,
+        "Longest Win Streak": longest_win_streak,
+        "Longest Loss Streak": longest_loss_streak,
+        "Trading Days": trading_days,
+    }
+
+
+def equity_curve_values(rows, close, initial_capital, initial_shares=0.0, bar_offset=0):
+    """
+    Mark a ledger to market at every bar.
+
+    The cash and shares held after each order are spread forward to the following bars with a
+    running maximum over the ledger row index, so the whole curve is a handful of array
+    operations whatever the number of bars or trades.
+
+    :param rows: Ledger rows (TradeLedger.rows), every bar index must be set
+    :param close: Close price per bar
+    :param initial_capital: Cash held before the first row
+    :param initial_shares: Shares held before the first row, for a curve that starts mid-backtest
+    :param bar_offset: Bar index of close[0], rows carry bar indexes of the whole history
+    :return: (cash, shares, equity) arrays, one value per bar
+    """
+    close = np.asarray(close, dtype=np.float64)
+    if len(rows) == 0:
+        cash = np.full(len(close), float(initial_capital))
+        shares = np.full(len(close), float(initial_shares))
+        return cash, shares, cash + shares * close
+
+    # Ledger row in effect at each bar, -1 before the first order
+    row_at_bar = np.full(len(close), -1, dtype=np.int64)
+    row_at_bar[rows["bar"] - bar_offset] = np.arange(len(rows))
+    row_at_bar = np.maximum.accumulate(row_at_bar)
+
+    # A buy spends all the cash and a sell turns all the shares back into cash
+    is_buy = rows["action"] == BUY
+    shares_after = np.where(is_buy, rows["shares"], 0.0)
+    cash_after = np.where(is_buy, 0.0, rows["shares"] * rows["price"])
+
+    started = row_at_bar >= 0
+    shares = np.where(started, shares_after[row_at_bar], float(initial_shares))
+    cash = np.where(started, cash_after[row_at_bar], float(initial_capital))
+    return cash, shares, cash + shares * close
+
+
+class EquityAccumulator:
+    """
+    Risk metrics of an equity curve fed in consecutive pieces.
+
+    Only the running peak, the worst drawdown, the first and last values and the count, mean
+    and sum of squared deviations (M2) of the returns are kept, so a curve of any length is
+    summarized in O(piece) memory. Each fixed block of RETURN_BLOCK returns, counted from the
+    start of the curve, gets its mean and M2 in two passes like numpy's std, and the blocks are
+    merged in order with Chan's pairwise update. That makes every metric bit for bit the same
+    however the curve is split into pieces, and a curve of one block gets exactly
+    returns.std(ddof=1). Unlike a raw sum of squares it does not cancel catastrophically when
+    the returns are small next to their mean.
+    """
+
+    RETURN_BLOCK = 4096
+
+    def __init__(self):
+        self.first = self.last = None
+        self.peak = -np.inf
+        self.max_drawdown = np.inf
+        self.n_returns = 0
+        self.mean_return = self.m2_returns = 0.0
+        self._pending = np.empty(0)  # Returns of the current, not yet full, block
+
+    def push(self, equity):
+        """Add the next values of the curve."""
+        equity = np.asarray(equity, dtype=np.float64)
+        if len(equity) == 0:
+            return
+
+        # Returns across the boundary with the previous piece count too
+        previous = equity if self.last is None else np.concatenate(([self.last], equity))
+        returns = np.diff(previous) / previous[:-1]
+        if self.first is None:
+            self.first = float(equity[0])
+        self.last = float(equity[-1])
+
+        rolling_max = np.maximum.accumulate(equity)
+        np.maximum(rolling_max, self.peak, out=rolling_max)
+        self.peak = float(rolling_max[-1])
+        self.max_drawdown = min(self.max_drawdown, float(((equity - rolling_max) / rolling_max).min()))
+
+        returns = np.concatenate((self._pending, returns))
+        full = len(returns) - len(returns) % self.RETURN_BLOCK
+        for start in range(0, full, self.RETURN_BLOCK):
+            self._add_block(returns[start:start + self.RETURN_BLOCK])
+        self._pending = returns[full:].copy()
+
+    def _add_block(self, returns):
+        self.n_returns, self.mean_return, self.m2_returns = _merge_moments(
+            (self.n_returns, self.mean_return, self.m2_returns), _moments(returns)
+        )
+
+    def statistics(self, years):
+        """Same dict as equity_statistics for everything pushed so far."""
+        n_returns, mean_return, m2_returns = _merge_moments(
+            (self.n_returns, self.mean_return, self.m2_returns), _moments(self._pending)
+        )
+        periods_per_year = n_returns / years if years > 0 else 1.0
+
+        std = np.sqrt(m2_returns / (n_returns - 1)) if n_returns > 1 else float("nan")
+        sharpe_ratio = mean_return / std * np.sqrt(periods_per_year) if std > 0 else 0
+        volatility = std * np.sqrt(periods_per_year) * 100
+
+        try:
+            cagr = ((self.last / self.first) ** (1 / years) - 1) * 100 if years > 0 else 0
+        except OverflowError:
+            cagr = float("inf")  # Annualizing a large gain over a few days (e.g. minute bars) overflows
+
+        return {
+            "Max Drawdown": self.max_drawdown,
+            "Sharpe Ratio": sharpe_ratio,
+            "CAGR (%)": cagr,
+            "Volatility (Std Dev)": volatility,
+        }
+
+
+def _moments(returns):
+    """(count, mean, M2) of a block of returns, with the same two passes as numpy's std."""
+    if len(returns) == 0:
+        return 0, 0.0, 0.0
+    mean = np.sum(returns) / len(returns)
+    deviations = returns - mean
+    return len(returns), float(mean), float(np.sum(deviations * deviations))
+
+
+def _merge_moments(a, b):
+    """(count, mean, M2) of two consecutive blocks, Chan et al.'s pairwise update."""
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    if n_a == 0:
+        return b
+    if n_b == 0:
+        return a
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+
+def equity_statistics(equity, years):
+    """
+    Risk metrics of a per-bar equity curve.
+
+    Returns are taken bar to bar and annualized with the number of bars per year the curve
+    actually has, so the same code serves daily and intraday histories.
+
+    :param equity: Portfolio value per bar
+    :param years: Time between the first and last bar in years
+    :return: Dict with Max Drawdown (fraction), Sharpe Ratio and Volatility (Std Dev) (annualized,
+             in %) and CAGR (%)
+    """
+    accumulator = EquityAccumulator()
+    accumulator.push(equity)
+    return accumulator.statistics(years)
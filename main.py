@@ -1,17 +1,22 @@
 import logging
 import argparse
+import cProfile
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import pandas as pd
 
 from config import *
 from data_loader import fetch_stock_data
-from ai_model import AIModel
+from utils import compact_frame
+from profiler import StageProfiler
 from backtester import Backtester
-from plotter import plot_trading_strategy
-from strategies.sma import SMA
-from strategies.rsi import RSI
-from strategies.macd import MACD
-from rich.console import Console
-from rich.table import Table
+from strategies.registry import STRATEGIES
+
+# sklearn (ai_model), joblib (model_store), matplotlib (plotter) and rich are imported by the code
+# paths that use them, so no-AI, no-plot runs from a scheduler start fast
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,35 +27,51 @@ logging.basicConfig(
 class QuantanamoBae:
     """Main class for running trading strategies."""
 
-    def __init__(self, stock_symbol, strategy_name=STRATEGY_NAME, use_ai=USE_AI, plot_results=False):
+    def __init__(self, stock_symbol, strategy_name=STRATEGY_NAME, use_ai=USE_AI, plot_results=False, engine=BACKTEST_ENGINE,
+                 offline=DATA_OFFLINE, walk_forward=WALK_FORWARD, profile=PROFILE, profile_backtest=None,
+                 compact=COMPACT_FRAMES, robustness_samples=None):
         self.stock_symbol = stock_symbol
         self.strategy_name = strategy_name
         self.use_ai = use_ai
         self.plot_results = plot_results
+        self.engine = engine
+        self.offline = offline
+        self.walk_forward = walk_forward
+        self.profiler = StageProfiler(enabled=profile)
+        self.profile_backtest = profile_backtest  # Optional path for a cProfile dump of the backtest
+        self.compact = compact  # float32 prices, indicators and int8 signals kept out of the frame
+        self.robustness_samples = robustness_samples  # Resamples per robustness scheme, None skips the analysis
         self.data = None
+        self.signals = None
         self.strategy = None
         self.model = None
         self.scaler = None
-        self.console = Console()
+        self._console = None
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def console(self):
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console()
+        return self._console
+
     def select_strategy(self):
         """Select trading strategy based on provided name."""
-        strategies = {"SMA": SMA, "RSI": RSI, "MACD": MACD}
-
-        if self.strategy_name not in strategies:
+        if self.strategy_name not in STRATEGIES:
             self.logger.error(
-                f"Invalid strategy '{self.strategy_name}'. Valid options: {list(strategies.keys())}"
+                f"Invalid strategy '{self.strategy_name}'. Valid options: {list(STRATEGIES.keys())}"
             )
             sys.exit(1)
 
-        return strategies[self.strategy_name]
+        return STRATEGIES[self.strategy_name]
 
     def prepare_data(self):
         """Fetch and prepare historical stock data."""
-        self.data = fetch_stock_data(
-            self.stock_symbol, TRADE_WINDOW_START_DATE, TRADE_WINDOW_END_DATE
-        )
+        with self.profiler.stage("fetch_stock_data"):
+            self.data = fetch_stock_data(
+                self.stock_symbol, TRADE_WINDOW_START_DATE, TRADE_WINDOW_END_DATE, offline=self.offline
+            )
 
         if self.data.empty:
             self.logger.error("No data retrieved. Exiting.")
@@ -60,32 +81,80 @@ class QuantanamoBae:
             self.logger.info(f"Data retrieved with {self.data.isna().sum().sum()} missing values.")
             self.logger.info(f"Data preview:\n{self.data.head()}")
 
+        if self.compact:
+            self.data = compact_frame(self.data)
+
         StrategyClass = self.select_strategy()
-        self.strategy = StrategyClass(self.data)
-        self.data["Signal"] = self.strategy.generate_signals()
+        self.strategy = StrategyClass(self.data, compact=self.compact)
+        with self.profiler.stage("generate_signals", bars=len(self.data)):
+            self.signals = self.strategy.generate_signals()
+        if not self.compact:
+            self.data["Signal"] = self.signals
 
-    def train_and_backtest(self):
-        """Train AI model (if enabled) and perform backtesting."""
+    def train_and_backtest(self, display=True):
+        """Train AI model (if enabled) and perform backtesting, returning the stats."""
+        # Compact runs keep the signals out of the frame and only build the AI feature columns
+        # for as long as the model needs them
+        signals = self.signals if self.compact and not self.use_ai else None
+        data = self.strategy.feature_frame() if self.compact and self.use_ai else self.data
         if self.use_ai:
+            from ai_model import AIModel
+            from model_store import ModelStore
+
             ai_model = AIModel(self.strategy)
-            self.model, self.scaler = ai_model.train(self.data)
+            with self.profiler.stage("ai_train", bars=len(data)):
+                if self.walk_forward:
+                    # Out-of-sample predictions only, the backtester never sees a model's training bars
+                    signals = ai_model.walk_forward(data)
+                else:
+                    store = ModelStore() if MODEL_STORE_DIR else None
+                    self.model, self.scaler = ai_model.train(data, store=store, symbol=self.stock_symbol)
+                    if self.compact and self.model is None:
+                        signals = self.signals  # Nothing to train on, fall back to the strategy signals
+            self.profiler.count("model_predict_calls", ai_model.predict_calls)
 
         backtester = Backtester(
-            self.data, INITIAL_CAPITAL, self.use_ai, self.strategy, self.model, self.scaler
+            data, INITIAL_CAPITAL, self.use_ai, self.strategy, self.model, self.scaler, engine=self.engine,
+            signals=signals, feature_builder=ai_model.feature_builder if self.use_ai else None
         )
-        stats = backtester.run()
-        self.display_results(stats)
+        with self.profiler.stage("backtest", bars=len(self.data)):
+            if self.profile_backtest:
+                backtest_profile = cProfile.Profile()
+                stats = backtest_profile.runcall(backtester.run)
+                backtest_profile.dump_stats(self.profile_backtest)
+                self.logger.info(f"Backtest cProfile dump saved to {self.profile_backtest}")
+            else:
+                stats = backtester.run()
+        self.profiler.count("model_predict_calls", backtester.predict_calls)
+
+        if display:
+            self.display_results(stats)
+
+        if self.robustness_samples:
+            from robustness import robustness_report
+
+            with self.profiler.stage("robustness"):
+                report = robustness_report(backtester, n_samples=self.robustness_samples)
+            if display:
+                self.display_robustness(report)
 
         if self.plot_results:
+            from plotter import plot_trading_strategy
+
             buy_signals = backtester.get_buy_signals()
             sell_signals = backtester.get_sell_signals()
-            plot_trading_strategy(self.data, self.stock_symbol, buy_signals, sell_signals)
+            with self.profiler.stage("plot_trading_strategy"):
+                plot_trading_strategy(self.data, self.stock_symbol, buy_signals, sell_signals)
+
+        return stats
 
     def display_results(self, stats):
         """
         Display backtest results in the console.
         """
 
+        from rich.table import Table
+
         # Performance Stats Table
         self.console.print("[bold blue]📊 Performance Statistics:[/bold blue]")
         metrics_table = Table(title="", header_style="bold cyan")
@@ -98,26 +167,151 @@ class QuantanamoBae:
 
         self.console.print(metrics_table)
 
+    def display_robustness(self, report):
+        """Display the percentile bands of every robustness scheme in the console."""
+        from rich.table import Table
+
+        for scheme, bands in report.items():
+            self.console.print(f"[bold blue]🎲 Robustness ({scheme.replace('_', ' ')}, {self.robustness_samples:,d} samples):[/bold blue]")
+            table = Table(title="", header_style="bold cyan")
+            table.add_column("Metric", justify="left")
+            for column in bands.columns:
+                table.add_column(column, justify="right")
+            for metric, row in bands.iterrows():
+                table.add_row(metric, *(f"{value:.2f}" for value in row))
+            self.console.print(table)
+
+    def display_profile(self):
+        """Print the --profile record as JSON."""
+        self.console.print("[bold blue]⏱️ Profile:[/bold blue]")
+        self.console.print_json(self.profiler.to_json(
+            symbol=self.stock_symbol, strategy=self.strategy_name, use_ai=self.use_ai, engine=self.engine
+        ))
+
     def run(self):
         """Execute the entire pipeline."""
         try:
             self.logger.info("Welcome to Quantanamo Bae")
             if DEBUG:
-                valid_flags = {"strategy_name", "stock_symbol", "use_ai", "plot_results"}
+                valid_flags = {"strategy_name", "stock_symbol", "use_ai", "plot_results", "engine", "offline", "walk_forward",
+                               "compact", "robustness_samples"}
                 config = {k: v for k, v in vars(self).items() if k in valid_flags}
                 self.logger.info(f"Configuration: \n{config}")
             self.prepare_data()
             self.train_and_backtest()
+            if self.profiler.enabled:
+                self.display_profile()
             self.logger.info("We hope you enjoyed your stay!")
         except Exception as e:
             self.logger.critical(f"Fatal error occurred: {e}", exc_info=True)
             sys.exit(1)
 
 
+def load_universe(universe):
+    """
+    Resolve a universe into a list of symbols.
+
+    :param universe: Path to a file with symbols (one per line or comma separated, '#' comments)
+                     or a comma separated list of symbols
+    :return: Symbols in their original order with duplicates removed
+    """
+    if os.path.isfile(universe):
+        with open(universe) as fh:
+            text = "\n".join(line.split("#", 1)[0] for line in fh)
+    else:
+        text = universe
+
+    symbols = [symbol.strip().upper() for symbol in text.replace("\n", ",").split(",")]
+    return list(dict.fromkeys(symbol for symbol in symbols if symbol))
+
+
+def backtest_symbol(stock_symbol, strategy_name, use_ai, engine, offline, walk_forward=WALK_FORWARD, plot=False,
+                    compact=COMPACT_FRAMES):
+    """Run the full pipeline for one symbol and return its stats as a results row, plotting it if asked."""
+    quantanamo_bae = QuantanamoBae(stock_symbol, strategy_name, use_ai, plot, engine, offline, walk_forward,
+                                   compact=compact)
+    try:
+        quantanamo_bae.prepare_data()
+        stats = quantanamo_bae.train_and_backtest(display=False)
+        error = None if stats else "No trades executed"
+    except SystemExit as e:
+        stats, error = {}, f"Exited with status {e.code}"
+    except Exception as e:
+        quantanamo_bae.logger.error(f"Backtest failed for {stock_symbol}: {e}")
+        stats, error = {}, f"{type(e).__name__}: {e}"
+    return {"Symbol": stock_symbol, **stats, "Error": error}
+
+
+def run_universe(symbols, strategy_name=STRATEGY_NAME, use_ai=USE_AI, engine=BACKTEST_ENGINE, offline=DATA_OFFLINE,
+                 workers=UNIVERSE_WORKERS, rank_by=UNIVERSE_RANK_BY, walk_forward=WALK_FORWARD, plot=False,
+                 compact=COMPACT_FRAMES, prefetch=False):
+    """
+    Backtest every symbol in a process pool and rank the results.
+
+    Rows are collected in submission order and ranked with a stable sort that breaks ties on
+    the symbol, so the table is the same no matter how the pool schedules the work.
+
+    With prefetch the prices are first downloaded into the data cache by a BulkLoader
+    (concurrent, rate limited and retried), symbols that fail to download get their error row
+    right away and the rest are backtested offline from the cache.
+
+    :param symbols: List of stock symbols
+    :param workers: Number of worker processes, None uses every CPU
+    :param rank_by: Stats key to rank by, highest first
+    :param plot: Render each symbol's chart in the worker that backtested it
+    :param prefetch: Bulk download every symbol into the data cache before backtesting
+    :return: DataFrame with one row per symbol, best first
+    """
+    logger = logging.getLogger(__name__)
+    failed = []
+    if prefetch and not offline and DATA_CACHE_DIR:
+        from bulk_loader import BulkLoader
+
+        loaded = BulkLoader().load(symbols)
+        failed = [{"Symbol": symbol, "Error": error} for symbol, error in loaded.errors.items()]
+        symbols, offline = [symbol for symbol in symbols if symbol in loaded.frames], True
+
+    logger.info(f"Backtesting {len(symbols)} symbols with {workers or os.cpu_count()} workers...")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        rows = list(executor.map(
+            backtest_symbol, symbols, repeat(strategy_name), repeat(use_ai), repeat(engine), repeat(offline),
+            repeat(walk_forward), repeat(plot), repeat(compact)
+        ))
+
+    results = pd.DataFrame(rows + failed)
+    if rank_by not in results.columns:
+        results[rank_by] = float("nan")
+    results = results.sort_values("Symbol", kind="mergesort")
+    results = results.sort_values(rank_by, ascending=False, kind="mergesort", na_position="last").reset_index(drop=True)
+    results.insert(0, "Rank", results.index + 1)
+    return results
+
+
+def display_universe_results(results, console=None):
+    """Display the ranked universe table in the console."""
+    from rich.console import Console
+    from rich.table import Table
+
+    console = console or Console()
+    console.print("[bold blue]🌎 Universe Results:[/bold blue]")
+    table = Table(title="", header_style="bold cyan")
+    columns = [column for column in UNIVERSE_TABLE_COLUMNS if column in results.columns]
+    for column in columns:
+        table.add_column(column, justify="left" if column in ("Symbol", "Error") else "right")
+
+    trunc = lambda amount: "" if amount is None or (isinstance(amount, float) and amount != amount) else \
+        f"{amount:.2f}" if isinstance(amount, float) else f"{amount}"
+    for row in results[columns].itertuples(index=False):
+        table.add_row(*(trunc(value) for value in row))
+
+    console.print(table)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Quantanamo Bae Trading Strategy Executor.")
     parser.add_argument(
-        '--strategy', type=str, choices=['SMA', 'RSI', 'MACD'], default='SMA', help="Trading strategy."
+        '--strategy', type=str, choices=list(STRATEGIES), default='SMA', help="Trading strategy."
     )
     parser.add_argument(
         '--stock', type=str, default=STOCK_SYMBOL, help="Stock symbol to trade."
@@ -126,10 +320,55 @@ if __name__ == "__main__":
         '--disable-ai', action='store_false', dest='use_ai', help="Disable AI model for predictions (AI enabled by default)."
     )
     parser.add_argument(
-        '--plot', action='store_true', help="Enable plotting of results."
+        '--plot', action='store_true', help="Enable plotting of results (one chart per symbol with --universe)."
+    )
+    parser.add_argument(
+        '--engine', type=str, choices=['loop', 'vectorized'], default=BACKTEST_ENGINE, help="Backtest engine."
+    )
+    parser.add_argument(
+        '--offline', action='store_true', default=DATA_OFFLINE, help="Use cached price data only, no network."
+    )
+    parser.add_argument(
+        '--walk-forward', action='store_true', default=WALK_FORWARD,
+        help="Train the AI model walk-forward and backtest on out-of-sample predictions only."
+    )
+    parser.add_argument(
+        '--profile', action='store_true', default=PROFILE,
+        help="Report per-stage wall/CPU time, peak memory and throughput as JSON."
+    )
+    parser.add_argument(
+        '--profile-backtest', type=str, metavar='PATH', help="Write a cProfile dump of the backtest to PATH."
+    )
+    parser.add_argument(
+        '--compact', action='store_true', default=COMPACT_FRAMES,
+        help="Low-memory mode: float32 prices and indicators, int8 signals, no extra frame columns."
+    )
+    parser.add_argument(
+        '--robustness', type=int, nargs='?', const=ROBUSTNESS_SAMPLES, metavar='SAMPLES',
+        help=f"Bootstrap percentile bands of the stats (default {ROBUSTNESS_SAMPLES:,d} samples per scheme)."
+    )
+    parser.add_argument(
+        '--universe', type=str, help="File of symbols or comma separated symbols to backtest in parallel."
+    )
+    parser.add_argument(
+        '--workers', type=int, default=UNIVERSE_WORKERS, help="Worker processes for --universe (default: all CPUs)."
+    )
+    parser.add_argument(
+        '--no-prefetch', dest='prefetch', action='store_false',
+        help="Let every --universe worker download its own prices instead of bulk downloading them first."
     )
 
     args = parser.parse_args()
 
-    quantanamo_bae = QuantanamoBae(args.stock, args.strategy, args.use_ai, args.plot)
-    quantanamo_bae.run()
+    if args.universe:
+        results = run_universe(
+            load_universe(args.universe), args.strategy, args.use_ai, args.engine, args.offline, args.workers,
+            walk_forward=args.walk_forward, plot=args.plot, compact=args.compact, prefetch=args.prefetch
+        )
+        display_universe_results(results)
+    else:
+        quantanamo_bae = QuantanamoBae(
+            args.stock, args.strategy, args.use_ai, args.plot, args.engine, args.offline, args.walk_forward,
+            args.profile, args.profile_backtest, args.compact, args.robustness
+        )
+        quantanamo_bae.run()
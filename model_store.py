@@ -0,0 +1,117 @@
+import hashlib  # model_store.py
+import json
+import logging
+import os
+import time
+import joblib
+import numpy as np
+from config import MODEL_STORE_DIR, MODEL_STORE_MAX_ENTRIES, MODEL_STORE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+class ModelStore:
+    """
+    On-disk cache of trained (model, scaler) pairs.
+
+    Entries are keyed by a hash of everything that decides the fit: the feature matrix and
+    target, the symbol, the strategy and its parameters, and the model hyperparameters. Loading
+    an entry refreshes its modification time, and the least recently used entries are evicted
+    once the store holds more than max_entries files or max_bytes bytes.
+    """
+
+    def __init__(self, directory=MODEL_STORE_DIR, max_entries=MODEL_STORE_MAX_ENTRIES, max_bytes=MODEL_STORE_MAX_BYTES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(features, target, strategy, model, symbol=None):
+        """
+        Build the cache key for a training run.
+
+        :param features: 2-D feature matrix the model is fitted on
+        :param target: Target labels
+        :param strategy: Strategy instance, its name and get_params() are part of the key
+        :param model: Unfitted estimator, its get_params() are part of the key
+        :param symbol: Optional stock symbol
+        :return: Hex digest string
+        """
+        digest = hashlib.sha256()
+        for array in (features, target):
+            array = np.ascontiguousarray(array)
+            digest.update(f"{array.dtype.str}{array.shape}".encode())
+            digest.update(array.tobytes())
+
+        description = {
+            "symbol": symbol,
+            "strategy": strategy.get_name(),
+            "params": strategy.get_params(),
+            "model": type(model).__name__,
+            "hyperparameters": model.get_params(),
+        }
+        digest.update(json.dumps(description, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.joblib")
+
+    def load(self, key):
+        """Return the cached (model, scaler) pair for a key, or None on a miss."""
+        path = self.path(key)
+        try:
+            model, scaler = joblib.load(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable model cache entry {path}: {e}")
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used for eviction
+        except FileNotFoundError:
+            pass  # Evicted by another process since it was read, the loaded pair is still good
+        logger.info(f"Loaded trained model {key[:12]} from {self.directory}")
+        return model, scaler
+
+    def save(self, key, model, scaler):
+        """Store a (model, scaler) pair under a key and evict old entries if over the limits."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.{time.time_ns()}.tmp"
+        joblib.dump((model, scaler), tmp_path)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved trained model {key[:12]} to {self.directory}")
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """
+        Delete least recently used entries until the store is within max_entries and max_bytes.
+
+        Several processes can share the store and evict at once, so an entry another one deletes
+        between the listing and the stat or remove here is skipped instead of failing the save.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".joblib"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort()
+
+        count, total_bytes = len(entries), sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            over_count = self.max_entries is not None and count > self.max_entries
+            over_size = self.max_bytes is not None and total_bytes > self.max_bytes
+            if not (over_count or over_size):
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                logger.info(f"Evicted cached model {os.path.basename(path)}")
+            except FileNotFoundError:
+                pass  # Already evicted by another process, it no longer counts either way
+            count, total_bytes = count - 1, total_bytes - size
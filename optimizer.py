@@ -0,0 +1,176 @@
+import logging  # optimizer.py
+import argparse
+import math
+import os
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    DATA_OFFLINE, HALVING_ETA, HALVING_MIN_BARS, HALVING_TOP, INITIAL_CAPITAL, STOCK_SYMBOL, SWEEP_SORT_BY,
+    SWEEP_WORKERS, TRADE_WINDOW_END_DATE, TRADE_WINDOW_START_DATE
+)
+from strategies.registry import STRATEGIES
+from sweep import IndicatorCache, _backtest_worker, backtest_params, expand_grid, parse_grid, worker_pool
+from utils import extract_column_values
+
+logger = logging.getLogger(__name__)
+
+
+def halving_schedule(n_bars, n_candidates, eta=HALVING_ETA, min_bars=HALVING_MIN_BARS, top=HALVING_TOP):
+    """
+    History lengths and candidate counts of each successive halving round.
+
+    The last round always backtests the full history. Every round before it sees 1 / eta of
+    the bars of the next one (at least min_bars), and only the best 1 / eta of its candidates,
+    but at least top of them, move on. There are only as many rounds as it takes to get down
+    to top candidates.
+
+    :return: List of (bars, candidates) tuples, first round first
+    """
+    if eta <= 1:
+        raise ValueError(f"eta must be greater than 1, got {eta}")
+
+    by_bars = 1 + max(0, math.floor(math.log(n_bars / min_bars, eta) + 1e-9)) if n_bars > min_bars else 1
+    by_candidates = 1 + max(0, math.ceil(math.log(n_candidates / top, eta) - 1e-9)) if n_candidates > top else 1
+    n_rounds = min(by_bars, by_candidates)
+
+    schedule, candidates = [], n_candidates
+    for remaining in range(n_rounds - 1, -1, -1):
+        schedule.append((max(min(min_bars, n_bars), math.ceil(n_bars / eta ** remaining)), candidates))
+        candidates = max(min(top, candidates), math.ceil(candidates / eta))
+    return schedule
+
+
+class SuccessiveHalving:
+    """
+    Adaptive parameter search that spends little compute on obviously bad grid points.
+
+    Every grid point is first backtested on a short prefix of the history. Each round ranks the
+    candidates on the objective, drops all but the best 1 / eta of them and backtests the
+    survivors again on eta times as many bars, until the last few run on the full history
+    (successive halving, the inner loop of Hyperband). Indicators come from one IndicatorCache
+    over the full history, a prefix of its signals is exactly what the shorter history gives.
+    """
+
+    def __init__(self, data, strategy_name, grid, objective=SWEEP_SORT_BY, eta=HALVING_ETA, min_bars=HALVING_MIN_BARS,
+                 top=HALVING_TOP, initial_capital=INITIAL_CAPITAL, workers=1):
+        """
+        :param data: Pandas DataFrame with a Close column
+        :param strategy_name: Name of the strategy in STRATEGIES
+        :param grid: Dict of parameter name to list of values
+        :param objective: Numeric calculate_trade_statistics key to maximize (e.g. "Sharpe Ratio")
+        :param eta: Fraction of candidates dropped per round is 1 - 1 / eta, and the history grows eta times
+        :param min_bars: Bars of the first round
+        :param top: Candidates kept for the full history run
+        :param workers: Number of worker processes, None uses every CPU and 1 runs in-process
+        """
+        self.strategy_name = strategy_name
+        self.combos = expand_grid(strategy_name, grid)
+        self.objective = objective
+        self.cache = IndicatorCache(extract_column_values(data, "Close"))
+        self.dates = data.index
+        self.initial_capital = initial_capital
+        self.workers = workers or os.cpu_count()
+        self.schedule = halving_schedule(len(data), len(self.combos), eta, min_bars, top)
+
+        self.backtests = 0
+        self.bars_backtested = 0
+
+    def _evaluate(self, executor, candidates, bars):
+        """Backtest the candidates (indexes into combos) on the first bars of the history."""
+        params = [self.combos[i] for i in candidates]
+        if executor is None:
+            rows = [backtest_params(self.dates, self.cache, self.strategy_name, p, self.initial_capital, bars) for p in params]
+        else:
+            chunksize = max(1, len(params) // (4 * self.workers))
+            rows = list(executor.map(_backtest_worker, params, [bars] * len(params), chunksize=chunksize))
+        self.backtests += len(params)
+        self.bars_backtested += len(params) * bars
+        return rows
+
+    def _score(self, row):
+        value = row.get(self.objective, np.nan)
+        if value is not None and not isinstance(value, (int, float, np.number)):
+            raise ValueError(f"Objective '{self.objective}' is not a numeric statistic (got {value!r})")
+        return np.nan if value is None else float(value)
+
+    def run(self):
+        """
+        Run every round.
+
+        :return: DataFrame with one row per grid point, its params, the last round it reached,
+                 the bars of that round and its stats there. Rows are ranked by round reached,
+                 then by the objective, so the full history survivors come first, best first.
+        """
+        n_bars = len(self.dates)
+        logger.info(f"Successive halving over {len(self.combos)} {self.strategy_name} parameter combinations "
+                    f"in {len(self.schedule)} rounds {[bars for bars, _ in self.schedule]}...")
+
+        # Fill the cache before any worker attaches so every indicator is computed exactly once
+        for params in self.combos:
+            self.cache.signals(self.strategy_name, params)
+
+        candidates = list(range(len(self.combos)))
+        last_rows = {}
+        parallel = self.workers > 1 and len(self.combos) > 1
+        with worker_pool(self.dates, self.cache, self.strategy_name, self.initial_capital, self.workers) \
+                if parallel else nullcontext() as executor:
+            for round_number, (bars, _) in enumerate(self.schedule, start=1):
+                rows = self._evaluate(executor, candidates, bars)
+                for candidate, row in zip(candidates, rows):
+                    last_rows[candidate] = {**row, "Round": round_number, "Bars": bars}
+
+                if round_number < len(self.schedule):
+                    keep = self.schedule[round_number][1]
+                    scores = np.array([self._score(row) for row in rows])
+                    # Best first, no trades (NaN) last, ties keep grid order
+                    order = np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind="stable")
+                    candidates = sorted(candidates[i] for i in order[:keep])
+                    logger.info(f"Round {round_number}: {len(rows)} candidates on {bars} bars, {keep} move on")
+
+        if not any(self.objective in row for row in last_rows.values()):
+            raise ValueError(f"Objective '{self.objective}' is not in the backtest statistics")
+
+        results = pd.DataFrame([last_rows[i] for i in range(len(self.combos))])
+        results = results.sort_values(self.objective, ascending=False, kind="mergesort", na_position="last")
+        results = results.sort_values("Round", ascending=False, kind="mergesort", ignore_index=True)
+        logger.info(f"Ran {self.backtests} backtests over {self.bars_backtested:,d} bars, "
+                    f"{self.bars_backtested / (n_bars * len(self.combos)):.0%} of an exhaustive sweep")
+        return results
+
+
+if __name__ == "__main__":
+    from data_loader import fetch_stock_data
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    logging.getLogger("backtester").setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description="Quantanamo Bae successive halving parameter search.")
+    parser.add_argument('--strategy', type=str, choices=list(STRATEGIES), default='SMA', help="Trading strategy.")
+    parser.add_argument('--stock', type=str, default=STOCK_SYMBOL, help="Stock symbol to trade.")
+    parser.add_argument(
+        '--grid', action='append', default=[], help="Parameter values, e.g. --grid short_window=10,20,30 (repeatable)."
+    )
+    parser.add_argument('--objective', type=str, default=SWEEP_SORT_BY, help="Stats key to maximize.")
+    parser.add_argument('--eta', type=float, default=HALVING_ETA, help="Keep 1/eta of the candidates per round.")
+    parser.add_argument('--min-bars', type=int, default=HALVING_MIN_BARS, help="Bars of the first round.")
+    parser.add_argument('--top', type=int, default=HALVING_TOP, help="Candidates run on the full history.")
+    parser.add_argument('--workers', type=int, default=SWEEP_WORKERS, help="Worker processes (default: all CPUs).")
+    parser.add_argument('--output', type=str, help="Write the full results to this CSV file.")
+    parser.add_argument('--offline', action='store_true', default=DATA_OFFLINE, help="Use cached price data only.")
+    args = parser.parse_args()
+
+    data = fetch_stock_data(args.stock, TRADE_WINDOW_START_DATE, TRADE_WINDOW_END_DATE, offline=args.offline)
+    if data.empty:
+        logger.error("No data retrieved. Exiting.")
+        raise SystemExit(1)
+
+    search = SuccessiveHalving(data, args.strategy, parse_grid(args.grid), args.objective, args.eta, args.min_bars,
+                               args.top, workers=args.workers)
+    results = search.run()
+    if args.output:
+        results.to_csv(args.output, index=False)
+        logger.info(f"Search results saved to {args.output}")
+    print(results.head(args.top).to_string())
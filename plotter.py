@@ -1,47 +1,132 @@
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use("Agg")  # Charts are only ever saved to files, never shown, and workers have no display
+
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from config import PLOT_DPI, PLOT_MAX_ANNOTATIONS, PLOT_MAX_POINTS, PLOT_OUTPUT_DIR, PLOT_WORKERS
+from utils import extract_column_values
 
 logger = logging.getLogger(__name__)
 
-def plot_trading_strategy(data, stock_symbol, buy_signals, sell_signals, output_dir="plots"):
+NS_PER_DAY = 86_400 * 10 ** 9
+
+def lttb_indices(x, y, n_out):
+    """
+    Pick the points of a line to keep with Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept. The points in between are split into n_out - 2
+    buckets and each bucket keeps the point forming the largest triangle with the point kept
+    from the previous bucket and the average of the next one, so spikes and turns survive.
+
+    :param x: Increasing x values
+    :param y: y values
+    :param n_out: Number of points to keep
+    :return: Sorted indices of the kept points
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = np.diff(edges)
+    mean_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / counts
+    mean_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / counts
+    # The bucket after the last one is the final point
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(n_out - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        area = np.abs(
+            (x[a] - next_x[bucket]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[bucket] - y[a])
+        )
+        a = lo + int(area.argmax())
+        selected[bucket + 1] = a
+    return selected
+
+def _date_numbers(dates):
+    """Matplotlib date numbers (days since 1970-01-01) for an array of dates, without a Python loop."""
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_convert(None)
+    return dates.as_unit("ns").asi8 / NS_PER_DAY
+
+def plot_trading_strategy(data, stock_symbol, buy_signals, sell_signals, output_dir=PLOT_OUTPUT_DIR,
+                          max_points=PLOT_MAX_POINTS, max_annotations=PLOT_MAX_ANNOTATIONS, dpi=PLOT_DPI):
     """
     Plot trading signals on a stock price chart and save as an image.
 
+    The price line is downsampled to max_points with LTTB, the trade paths are drawn as a
+    single line and the buy and sell markers as one scatter each, so the cost of a chart
+    hardly depends on the length of the history or the number of trades.
+
     :param data: Pandas DataFrame containing stock price data
     :param stock_symbol: Stock ticker symbol
     :param buy_signals: List of buy signals (date, price, shares)
     :param sell_signals: List of sell signals (date, price, shares, profit percentage)
     :param output_dir: Directory to save the plot
+    :param max_points: Most points drawn for the price line, None draws every bar
+    :param max_annotations: Most trades labelled with their profit, the largest moves first
+    :param dpi: Resolution of the saved image
+    :return: Path of the saved image
     """
     logger.info(f"Generating plot for {stock_symbol}...")
 
     # Ensure the output directory exists
     os.makedirs(output_dir, exist_ok=True)
 
-    # Create the figure and axis
-    fig, ax = plt.subplots(figsize=(14, 7))
-    ax.plot(data.index, data['Close'], label='Close Price', color='steelblue', linewidth=1.5)
+    # A bare Figure renders with Agg and keeps no pyplot state, so nothing leaks between charts
+    fig = Figure(figsize=(14, 7))
+    ax = fig.add_subplot()
+
+    x = _date_numbers(data.index)
+    close = extract_column_values(data, "Close")
+    finite = np.flatnonzero(np.isfinite(close))
+    if max_points:
+        finite = finite[lttb_indices(x[finite], close[finite], max_points)]
+    ax.plot(x[finite], close[finite], label='Close Price', color='steelblue', linewidth=1.5)
 
     # Plot Buy signals
     if buy_signals:
         buy_dates, buy_prices, _ = zip(*buy_signals)
-        ax.scatter(buy_dates, buy_prices, marker='^', color='green', label='Buy Signal', alpha=1, edgecolors='k', zorder=5)
+        buy_x = _date_numbers(buy_dates)
+        ax.scatter(buy_x, buy_prices, marker='^', color='green', label='Buy Signal', alpha=1, edgecolors='k', zorder=5)
 
     # Plot Sell signals
     if sell_signals:
         sell_dates, sell_prices, shares, profit_perc = zip(*sell_signals)
-        ax.scatter(sell_dates, sell_prices, marker='v', color='red', label='Sell Signal', alpha=1, edgecolors='k', zorder=5)
-
-        # Draw lines connecting each buy to its corresponding sell
-        first_trade_path = True
-    for (buy_date, buy_price, _), (sell_date, sell_price, shares, profit) in zip(buy_signals, sell_signals):
-            ax.plot([buy_date, sell_date], [buy_price, sell_price], linestyle='dashed', color='black', alpha=0.9, label='Trade Path' if first_trade_path else "")
-            first_trade_path = False
-
-            # Annotate with trade details
-            ax.annotate(f'Profit: {profit:.2f}%',
-                        xy=(sell_date, sell_price),
+        sell_x = _date_numbers(sell_dates)
+        ax.scatter(sell_x, sell_prices, marker='v', color='red', label='Sell Signal', alpha=1, edgecolors='k', zorder=5)
+
+        # Draw lines connecting each buy to its corresponding sell as one NaN-separated line,
+        # a single path renders far faster than a LineCollection with a path per trade
+        n_paths = min(len(buy_signals), len(sell_signals))
+        if n_paths:
+            path_x = np.full((n_paths, 3), np.nan)
+            path_y = np.full((n_paths, 3), np.nan)
+            path_x[:, 0], path_x[:, 1] = buy_x[:n_paths], sell_x[:n_paths]
+            path_y[:, 0], path_y[:, 1] = buy_prices[:n_paths], sell_prices[:n_paths]
+            ax.plot(path_x.ravel(), path_y.ravel(), linestyle='dashed', color='black', alpha=0.9, label='Trade Path')
+
+        # Annotate with trade details, only the biggest moves once there are too many to read
+        profit_perc = np.asarray(profit_perc, dtype=np.float64)
+        labelled = np.argsort(-np.abs(profit_perc), kind="stable")[:max_annotations]
+        for i in np.sort(labelled):
+            ax.annotate(f'Profit: {profit_perc[i]:.2f}%',
+                        xy=(sell_x[i], sell_prices[i]),
                         xytext=(0, 15),
                         textcoords='offset points',
                         ha='center',
@@ -55,21 +140,44 @@ def plot_trading_strategy(data, stock_symbol, buy_signals, sell_signals, output_
     # if 'SMA_long' in data.columns:
     #     ax.plot(data.index.intersection(data['SMA_long'].dropna().index), data['SMA_long'].dropna(), label='200-Day SMA', color='purple', linestyle='--', linewidth=1)
 
-
     # Configure plot labels and title
+    ax.xaxis_date()
     ax.set_title(f"Trading Strategy for {stock_symbol}", fontsize=14)
     ax.set_xlabel("Date", fontsize=12)
     ax.set_ylabel("Stock Price", fontsize=12)
-    ax.legend(loc='best', fontsize='small', frameon=True, markerscale=1.2)
+    # A fixed corner, loc='best' scans every marker and trade path for the emptiest spot
+    ax.legend(loc='upper left', fontsize='small', frameon=True, markerscale=1.2)
     ax.grid(True, linestyle='--', alpha=0.6)
 
     # Rotate date labels for better readability
-    plt.xticks(rotation=45)
+    ax.tick_params(axis='x', labelrotation=45)
 
     # Save the figure
     image_path = os.path.join(output_dir, f"{stock_symbol}_strategy.png")
-    plt.tight_layout()
-    plt.savefig(image_path, dpi=300)
-    plt.close(fig)  # Close the figure to free up memory
+    fig.tight_layout()
+    fig.savefig(image_path, dpi=dpi)
 
     logger.info(f"Plot saved to {image_path}")
+    return image_path
+
+def _plot_chart(chart, output_dir):
+    return plot_trading_strategy(*chart, output_dir=output_dir)
+
+def plot_trading_strategies(charts, output_dir=PLOT_OUTPUT_DIR, workers=PLOT_WORKERS):
+    """
+    Render the charts of many symbols in parallel worker processes.
+
+    :param charts: List of (data, stock_symbol, buy_signals, sell_signals) tuples
+    :param output_dir: Directory to save the plots
+    :param workers: Number of worker processes, None uses every CPU and 1 renders in-process
+    :return: Image paths in the order of charts
+    """
+    charts = list(charts)
+    workers = min(workers or os.cpu_count(), len(charts)) or 1
+    logger.info(f"Rendering {len(charts)} charts with {workers} workers...")
+
+    if workers == 1:
+        return [_plot_chart(chart, output_dir) for chart in charts]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_plot_chart, charts, [output_dir] * len(charts)))
@@ -0,0 +1,259 @@
+import logging  # portfolio.py
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    DATA_OFFLINE, INITIAL_CAPITAL, MIN_PROFIT_THRESHOLD, PORTFOLIO_MAX_POSITIONS, PORTFOLIO_POSITION_FRACTION,
+    PORTFOLIO_SIZING, STOP_LOSS_THRESHOLD, STRATEGY_NAME, TRADE_WINDOW_END_DATE, TRADE_WINDOW_START_DATE
+)
+from ledger import ACTION_NAMES, BUY, LEDGER_DTYPE, SELL, equity_statistics, trade_statistics
+from strategies.registry import STRATEGIES
+from utils import extract_column_values
+
+logger = logging.getLogger(__name__)
+
+SIZINGS = ("equal_weight", "fixed_fraction", "cash_split")
+NS_PER_DAY = 86_400 * 10 ** 9
+
+# Ledger rows of a portfolio also record the column of the symbol traded
+PORTFOLIO_LEDGER_DTYPE = np.dtype(LEDGER_DTYPE.descr + [("symbol", np.int32)])
+
+
+class PortfolioBacktester:
+    """
+    Backtests one pool of capital over many symbols.
+
+    Prices and signals are aligned (bars x symbols) matrices. Each bar is one step over all
+    symbols at once: open positions are checked against the sell signal and the
+    profit/stop-loss thresholds of the single symbol Backtester with array comparisons, then
+    the freed cash is sized into the symbols with a buy signal. The Python work is per bar,
+    never per symbol, so wide universes cost little more than a single symbol.
+
+    Position sizing:
+      - equal_weight: every new position gets equity / max_positions
+      - fixed_fraction: every new position gets position_fraction of the equity
+      - cash_split: the available cash is split evenly between the bar's buy signals
+    Buys are filled in column order until the cash or the max_positions slots run out.
+    """
+
+    def __init__(self, close, signals, initial_capital=INITIAL_CAPITAL, sizing=PORTFOLIO_SIZING,
+                 max_positions=PORTFOLIO_MAX_POSITIONS, position_fraction=PORTFOLIO_POSITION_FRACTION,
+                 strategy_name=STRATEGY_NAME):
+        """
+        :param close: DataFrame of Close prices, one column per symbol, NaN where a symbol has no bar
+        :param signals: Trade signals of the same shape (1 buy, -1 sell, 0 hold)
+        :param sizing: One of SIZINGS
+        :param max_positions: Most symbols held at once
+        :param position_fraction: Fraction of equity per position with fixed_fraction sizing
+        """
+        if sizing not in SIZINGS:
+            raise ValueError(f"Unknown position sizing '{sizing}'. Valid options: {list(SIZINGS)}")
+        if np.shape(signals) != close.shape:
+            raise ValueError(f"Signals {np.shape(signals)} don't match the prices {close.shape}")
+
+        self.symbols = list(close.columns)
+        self.dates = pd.DatetimeIndex(close.index)
+        self.close = close.to_numpy(dtype=np.float64)
+        self.signals = np.asarray(signals, dtype=np.int8)
+        self.initial_capital = initial_capital
+        self.sizing = sizing
+        self.max_positions = max_positions
+        self.position_fraction = position_fraction
+        self.strategy_name = strategy_name
+
+        self.ledger = np.empty(0, dtype=PORTFOLIO_LEDGER_DTYPE)
+        self.cash = self.equity = None
+
+    def _targets(self, n_candidates, cash, equity):
+        """Amount each new position would like to get before the cash runs out."""
+        if self.sizing == "equal_weight":
+            target = equity / self.max_positions
+        elif self.sizing == "fixed_fraction":
+            target = equity * self.position_fraction
+        else:
+            target = cash / n_candidates
+        return np.full(n_candidates, target)
+
+    def run(self):
+        """Execute the backtest and return its statistics."""
+        n_bars, n_symbols = self.close.shape
+        logger.info(f"Starting portfolio backtest of {n_symbols} symbols over {n_bars} bars ({self.sizing} sizing)...")
+
+        close = self.close
+        tradable = np.isfinite(close)
+        # Positions are marked at the last known price through gaps in a symbol's history
+        mark = pd.DataFrame(close).ffill().fillna(0.0).to_numpy()
+        dates = self.dates.as_unit("ns").asi8
+
+        cash = float(self.initial_capital)
+        shares = np.zeros(n_symbols)
+        entry_price = np.ones(n_symbols)  # Ones keep the profit division clean for flat symbols
+        entry_date = np.zeros(n_symbols, dtype=np.int64)
+        cash_curve = np.empty(n_bars)
+        equity_curve = np.empty(n_bars)
+        blocks = []
+
+        # Like the single symbol backtester, the final bar is only marked, never traded
+        for t in range(n_bars - 1):
+            price, signal = close[t], self.signals[t]
+            held = shares > 0
+
+            # Sells: sell signal or a threshold hit on every open position at once
+            price_change = (price - entry_price) / entry_price
+            exits = np.flatnonzero(held & tradable[t] & (
+                (signal == -1) | (price_change >= MIN_PROFIT_THRESHOLD) | (price_change <= STOP_LOSS_THRESHOLD)
+            ))
+            if exits.size:
+                proceeds = shares[exits] * price[exits]
+                blocks.append(self._rows(
+                    t, dates[t], SELL, exits, price[exits], shares[exits], price_change[exits] * 100,
+                    (dates[t] - entry_date[exits]) // NS_PER_DAY
+                ))
+                cash += proceeds.sum()
+                shares[exits] = 0.0
+
+            # Buys: symbols with a buy signal and no position, skipping the ones sold this bar
+            slots = self.max_positions - int(np.count_nonzero(shares > 0))
+            if slots > 0 and cash > 0:
+                candidates = np.flatnonzero((signal == 1) & tradable[t] & ~held)[:slots]
+                if candidates.size:
+                    equity = cash + shares @ mark[t]
+                    targets = self._targets(candidates.size, cash, equity)
+                    # Fill in column order, the last position gets whatever cash is left
+                    allocation = np.clip(cash - (np.cumsum(targets) - targets), 0.0, targets)
+                    filled = allocation > 0
+                    candidates, allocation = candidates[filled], allocation[filled]
+                    if candidates.size:
+                        bought = allocation / price[candidates]
+                        shares[candidates] = bought
+                        entry_price[candidates] = price[candidates]
+                        entry_date[candidates] = dates[t]
+                        blocks.append(self._rows(t, dates[t], BUY, candidates, price[candidates], bought))
+                        cash = max(cash - allocation.sum(), 0.0)
+
+            cash_curve[t] = cash
+            equity_curve[t] = cash + shares @ mark[t]
+
+        if n_bars:
+            cash_curve[-1] = cash
+            equity_curve[-1] = cash + shares @ mark[-1]
+
+        self.ledger = np.concatenate(blocks) if blocks else np.empty(0, dtype=PORTFOLIO_LEDGER_DTYPE)
+        self.cash, self.equity = cash_curve, equity_curve
+        logger.info(f"Portfolio backtest complete, {len(self.ledger)} orders.")
+        return self.calculate_statistics()
+
+    @staticmethod
+    def _rows(bar, date, action, symbols, price, shares, profit_pct=np.nan, days_held=np.nan):
+        rows = np.empty(len(symbols), dtype=PORTFOLIO_LEDGER_DTYPE)
+        rows["bar"], rows["date"], rows["action"], rows["symbol"] = bar, date, action, symbols
+        rows["price"], rows["shares"] = price, shares
+        rows["profit_pct"], rows["days_held"] = profit_pct, days_held
+        return rows
+
+    def trades(self):
+        """Executed orders as a DataFrame with one row per order."""
+        rows = self.ledger
+        dates = pd.DatetimeIndex(rows["date"].view("datetime64[ns]"))
+        if self.dates.tz is not None:
+            dates = dates.tz_localize("UTC").tz_convert(self.dates.tz)
+        return pd.DataFrame({
+            "Date": dates,
+            "Symbol": np.asarray(self.symbols, dtype=object)[rows["symbol"]] if len(rows) else [],
+            "Action": [ACTION_NAMES[action] for action in rows["action"].tolist()],
+            "Price": rows["price"],
+            "Shares": rows["shares"],
+            "Profit %": rows["profit_pct"],
+            "Days Held": rows["days_held"],
+        })
+
+    def equity_curve(self):
+        """DataFrame with the Cash, Positions (market value) and Equity of every bar."""
+        return pd.DataFrame(
+            {"Cash": self.cash, "Positions": self.equity - self.cash, "Equity": self.equity}, index=self.dates
+        )
+
+    def calculate_statistics(self):
+        """Stats keyed like Backtester.calculate_trade_statistics, the final value marks open positions to market."""
+        if len(self.ledger) == 0:
+            logger.warning("No trades executed. Skipping performance calculations.")
+            return {}
+
+        final_value = float(self.equity[-1])
+        trading_days = (self.dates[-2] - self.dates[0]).days
+        metrics = trade_statistics(
+            self.ledger["profit_pct"], self.ledger["days_held"], trading_days, self.initial_capital, final_value
+        )
+        years = (self.dates[-1] - self.dates[0]).total_seconds() / (365 * 24 * 3600)
+        metrics.update(equity_statistics(self.equity, years))
+
+        profit_color = "green" if final_value > self.initial_capital else "red" if final_value < self.initial_capital else "white"
+        return {
+            "Strategy": self.strategy_name,
+            "Symbols": len(self.symbols),
+            "Symbols Traded": len(np.unique(self.ledger["symbol"])),
+            **metrics,
+            "Initial Portfolio Value": f"${self.initial_capital}",
+            "Current Portfolio Value": f"[{profit_color}]${final_value:.2f}[/{profit_color}]",
+            "Percent Return": f"[{profit_color}]{((final_value - self.initial_capital) / self.initial_capital) * 100:.2f}%[/{profit_color}]"
+        }
+
+
+def build_matrices(frames, strategy_name=STRATEGY_NAME, strategy_params=None):
+    """
+    Align the price histories of many symbols and generate their signals.
+
+    :param frames: Dict of symbol to OHLCV DataFrame
+    :return: (close, signals) DataFrames over the union of the dates, NaN prices and 0 signals
+             where a symbol has no bar
+    """
+    closes, signals = {}, {}
+    for symbol, frame in frames.items():
+        if frame is None or frame.empty:
+            logger.warning(f"No data for {symbol}, leaving it out of the portfolio.")
+            continue
+        strategy = STRATEGIES[strategy_name](frame, compact=True, **(strategy_params or {}))
+        try:
+            symbol_signals = strategy.generate_signals()
+        except ValueError as e:
+            logger.warning(f"Skipping {symbol}: {e}")
+            continue
+        closes[symbol] = pd.Series(extract_column_values(frame, "Close"), index=frame.index)
+        signals[symbol] = pd.Series(symbol_signals, index=frame.index)
+
+    close = pd.DataFrame(closes).sort_index()
+    signals = pd.DataFrame(signals).reindex(close.index).fillna(0).astype(np.int8)
+    return close, signals
+
+
+if __name__ == "__main__":
+    from data_loader import fetch_stock_data
+    from main import load_universe
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    for name in ("data_loader", "strategies.sma", "strategies.rsi", "strategies.macd"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description="Quantanamo Bae shared-capital portfolio backtest.")
+    parser.add_argument('universe', help="File of symbols or comma separated symbols.")
+    parser.add_argument('--strategy', type=str, choices=list(STRATEGIES), default=STRATEGY_NAME, help="Trading strategy.")
+    parser.add_argument('--sizing', type=str, choices=SIZINGS, default=PORTFOLIO_SIZING, help="Position sizing.")
+    parser.add_argument('--max-positions', type=int, default=PORTFOLIO_MAX_POSITIONS, help="Most symbols held at once.")
+    parser.add_argument('--position-fraction', type=float, default=PORTFOLIO_POSITION_FRACTION,
+                        help="Equity fraction per position with fixed_fraction sizing.")
+    parser.add_argument('--offline', action='store_true', default=DATA_OFFLINE, help="Use cached price data only.")
+    args = parser.parse_args()
+
+    frames = {
+        symbol: fetch_stock_data(symbol, TRADE_WINDOW_START_DATE, TRADE_WINDOW_END_DATE, offline=args.offline)
+        for symbol in load_universe(args.universe)
+    }
+    close, signals = build_matrices(frames, args.strategy)
+    stats = PortfolioBacktester(
+        close, signals, sizing=args.sizing, max_positions=args.max_positions,
+        position_fraction=args.position_fraction, strategy_name=args.strategy
+    ).run()
+    for key, value in stats.items():
+        print(f"{key}: {value}")
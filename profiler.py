@@ -0,0 +1,73 @@
+import json  # profiler.py
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+class StageProfiler:
+    """
+    Collects wall time, CPU time and peak traced memory for each pipeline stage, plus named
+    counters (e.g. model predict calls). When disabled every method is a no-op, so the pipeline
+    can always call it.
+
+    Stages are meant to run one after another, the tracemalloc peak is reset at the start of
+    each stage so nested stages would hide the outer stage's peak.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = []
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name, bars=None):
+        """
+        Profile the enclosed block as one stage.
+
+        :param name: Stage name in the report
+        :param bars: Bars processed by the stage, used for the bars per second rate
+        """
+        if not self.enabled:
+            yield
+            return
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            record = {"stage": name, "wall_s": wall, "cpu_s": cpu, "peak_mem_mb": peak / 1024 ** 2}
+            if bars is not None:
+                record["bars"] = bars
+                record["bars_per_s"] = bars / wall if wall > 0 else None
+            self.stages.append(record)
+            logger.debug(f"Stage {name}: {wall:.4f}s wall, {cpu:.4f}s cpu, {record['peak_mem_mb']:.1f} MB peak")
+
+    def count(self, name, amount=1):
+        """Add to a named counter."""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self, **meta):
+        """Structured record of every stage and counter, with any extra fields from meta."""
+        return {
+            **meta,
+            "total_wall_s": sum(stage["wall_s"] for stage in self.stages),
+            "total_cpu_s": sum(stage["cpu_s"] for stage in self.stages),
+            "stages": self.stages,
+            "counters": self.counters,
+        }
+
+    def to_json(self, **meta):
+        return json.dumps(self.report(**meta))
@@ -0,0 +1,300 @@
+import logging  # replay.py
+import argparse
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from config import INITIAL_CAPITAL, REPLAY_BATCH_SIZE, REPLAY_QUEUE_SIZE, REPLAY_SPEED, STRATEGY_NAME
+from backtester import Backtester
+from strategies.registry import STRATEGIES
+
+logger = logging.getLogger(__name__)
+
+
+class Bar(NamedTuple):
+    symbol: str
+    date: object  # datetime.datetime / pd.Timestamp, anything Backtester.execute_trade accepts
+    close: float
+
+
+class BarSource(ABC):
+    """
+    Base class of the asynchronous bar feeds the ReplayEngine consumes.
+
+    Bars travel in batches so the per-bar cost of the event loop stays small.
+    """
+
+    name = "source"
+
+    @abstractmethod
+    async def batches(self):
+        """Each source must implement this as an async generator of lists of Bars in time order."""
+
+
+class CSVReplaySource(BarSource):
+    """
+    Replays bars from a CSV file.
+
+    The file needs a date column (Date, Datetime or Timestamp) and a Close column, plus a
+    Symbol column unless symbol is given. It is read in chunks on a worker thread so a large
+    file never blocks the event loop.
+    """
+
+    DATE_COLUMNS = ("Date", "Datetime", "Timestamp")
+
+    def __init__(self, path, symbol=None, batch_size=REPLAY_BATCH_SIZE, speed=REPLAY_SPEED):
+        """
+        :param path: CSV file path
+        :param symbol: Symbol of every bar, read from the Symbol column when None
+        :param batch_size: Bars per batch handed to the engine
+        :param speed: Replay speed as a multiple of real time (60 plays an hour of bars per
+                      minute), None replays as fast as possible
+        """
+        self.path = path
+        self.symbol = symbol
+        self.batch_size = batch_size
+        self.speed = speed
+        self.name = str(path)
+
+    def _read_chunks(self):
+        # round_trip parsing so prices match the floats the file was written from bit for bit
+        return pd.read_csv(self.path, chunksize=max(self.batch_size, 65_536), float_precision="round_trip")
+
+    async def batches(self):
+        reader = await asyncio.to_thread(self._read_chunks)
+        first_time, wall_start = None, time.monotonic()
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, reader, None)
+                if chunk is None:
+                    break
+
+                date_column = next((column for column in self.DATE_COLUMNS if column in chunk.columns), None)
+                if date_column is None or "Close" not in chunk.columns:
+                    raise ValueError(f"{self.path} needs a date column ({', '.join(self.DATE_COLUMNS)}) and a Close column")
+                if self.symbol is None and "Symbol" not in chunk.columns:
+                    raise ValueError(f"{self.path} has no Symbol column, pass the symbol of its bars")
+
+                dates = pd.DatetimeIndex(pd.to_datetime(chunk[date_column]))
+                symbols = [self.symbol] * len(chunk) if self.symbol else chunk["Symbol"].astype(str).tolist()
+                bars = list(map(Bar, symbols, dates.to_pydatetime(), chunk["Close"].to_numpy(dtype=np.float64).tolist()))
+
+                for start in range(0, len(bars), self.batch_size):
+                    batch = bars[start:start + self.batch_size]
+                    if self.speed:
+                        # Hold each batch until its first bar is due at the requested speed
+                        if first_time is None:
+                            first_time = batch[0].date
+                        due = (batch[0].date - first_time).total_seconds() / self.speed
+                        delay = due - (time.monotonic() - wall_start)
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                    yield batch
+        finally:
+            reader.close()
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of latencies in nanoseconds: every power of two is split into
+    SUB_BUCKETS buckets, so percentiles are accurate to within 1/SUB_BUCKETS of the value while
+    recording stays a couple of integer operations.
+    """
+
+    SUB_BUCKETS = 8
+    _SHIFT = 3  # log2(SUB_BUCKETS)
+
+    def __init__(self):
+        self.counts = [0] * (64 * self.SUB_BUCKETS)
+        self.total = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        bits = ns.bit_length()
+        if bits <= self._SHIFT:
+            index = ns
+        else:
+            index = (bits - self._SHIFT) * self.SUB_BUCKETS + ((ns >> (bits - self._SHIFT - 1)) & (self.SUB_BUCKETS - 1))
+        self.counts[index] += 1
+        self.total += 1
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def _upper_bound(self, index):
+        """Largest latency that lands in a bucket."""
+        if index < self.SUB_BUCKETS:
+            return index
+        octave, sub = divmod(index, self.SUB_BUCKETS)
+        bits = octave + self._SHIFT
+        return ((self.SUB_BUCKETS + sub + 1) << (bits - self._SHIFT - 1)) - 1
+
+    def percentile(self, q):
+        """Latency in nanoseconds below which a fraction q of the recorded values fall."""
+        if self.total == 0:
+            return float("nan")
+        rank = q * self.total
+        cumulative = np.cumsum(self.counts)
+        index = int(np.searchsorted(cumulative, rank, side="left"))
+        return min(self._upper_bound(index), self.max_ns)
+
+    def summary(self):
+        """Count and p50/p90/p99/p99.9/max latencies in microseconds."""
+        summary = {"count": self.total}
+        for label, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("p99.9", 0.999)):
+            summary[f"{label}_us"] = self.percentile(q) / 1000
+        summary["max_us"] = self.max_ns / 1000
+        return summary
+
+
+class SymbolState:
+    """Incremental strategy and paper-trading account of one symbol."""
+
+    def __init__(self, symbol, strategy, initial_capital):
+        self.symbol = symbol
+        self.strategy = strategy
+        self.backtester = Backtester(pd.DataFrame(), initial_capital, False, strategy)
+        self.bars = 0
+
+
+class ReplayEngine:
+    """
+    Streams bars from any number of async sources through per-symbol strategy state.
+
+    Each source runs as its own task and pushes batches onto a bounded queue, the engine pops
+    them and, for every bar, updates the symbol's strategy in O(1) and hands the signal to
+    Backtester.execute_trade, the same order logic the batch backtests use. Two latency
+    histograms are kept: "processing" is the strategy update plus order handling of a bar and
+    "end_to_end" also counts the time its batch waited in the queue.
+    """
+
+    def __init__(self, strategy_name=STRATEGY_NAME, initial_capital=INITIAL_CAPITAL, strategy_params=None,
+                 queue_size=REPLAY_QUEUE_SIZE):
+        if strategy_name not in STRATEGIES:
+            raise ValueError(f"Invalid strategy '{strategy_name}'. Valid options: {list(STRATEGIES.keys())}")
+        self.strategy_name = strategy_name
+        self.initial_capital = initial_capital
+        self.strategy_params = strategy_params or {}
+        self.queue_size = queue_size
+        self.sources = []
+        self.states = {}
+        self.processing_latency = LatencyHistogram()
+        self.end_to_end_latency = LatencyHistogram()
+        self.bars_processed = 0
+        self.elapsed_s = 0.0
+
+    def add_source(self, source):
+        self.sources.append(source)
+        return self
+
+    def _state(self, symbol):
+        state = SymbolState(symbol, STRATEGIES[self.strategy_name](None, **self.strategy_params), self.initial_capital)
+        self.states[symbol] = state
+        return state
+
+    async def _produce(self, source, queue):
+        """Push a source's batches onto the queue, then (None, error) to mark the source finished."""
+        error = None
+        try:
+            async for batch in source.batches():
+                await queue.put((time.perf_counter_ns(), batch))
+        except Exception as e:
+            error = e
+        await queue.put((None, error))
+
+    def process_batch(self, batch, enqueued_ns):
+        """Run one batch of bars through the strategies and order logic."""
+        states = self.states
+        perf_counter_ns = time.perf_counter_ns
+        record_processing = self.processing_latency.record
+        record_end_to_end = self.end_to_end_latency.record
+
+        for symbol, date, close in batch:
+            start = perf_counter_ns()
+            state = states.get(symbol) or self._state(symbol)
+            backtester = state.backtester
+            if backtester.trade_start_date is None:
+                backtester.trade_start_date = date
+
+            signal = state.strategy.update(close)
+            backtester.execute_trade(signal, close, date)
+            backtester.trade_end_date = date
+            state.bars += 1
+
+            end = perf_counter_ns()
+            record_processing(end - start)
+            record_end_to_end(end - enqueued_ns)
+        self.bars_processed += len(batch)
+
+    async def run(self):
+        """Consume every source to the end and return the per-symbol results."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        producers = [asyncio.create_task(self._produce(source, queue)) for source in self.sources]
+
+        start = time.perf_counter()
+        running = len(producers)
+        try:
+            while running:
+                enqueued_ns, batch = await queue.get()
+                if enqueued_ns is None:
+                    running -= 1
+                    if batch is not None:
+                        raise batch  # The source failed
+                    continue
+                self.process_batch(batch, enqueued_ns)
+        finally:
+            for producer in producers:
+                producer.cancel()
+            self.elapsed_s = time.perf_counter() - start
+
+        logger.info(f"Replayed {self.bars_processed:,d} bars for {len(self.states)} symbols in {self.elapsed_s:.2f}s "
+                    f"({self.throughput():,.0f} bars/s)")
+        return self.results()
+
+    def throughput(self):
+        return self.bars_processed / self.elapsed_s if self.elapsed_s > 0 else float("nan")
+
+    def results(self):
+        """DataFrame with one row of trade statistics per symbol, in symbol order."""
+        rows = [
+            {"Symbol": symbol, "Bars": state.bars, **state.backtester.calculate_trade_statistics()}
+            for symbol, state in sorted(self.states.items())
+        ]
+        return pd.DataFrame(rows)
+
+    def latency_report(self):
+        """Throughput and latency percentiles of the last run."""
+        return {
+            "bars": self.bars_processed,
+            "symbols": len(self.states),
+            "elapsed_s": self.elapsed_s,
+            "bars_per_s": self.throughput(),
+            "processing": self.processing_latency.summary(),
+            "end_to_end": self.end_to_end_latency.summary(),
+        }
+
+
+if __name__ == "__main__":
+    import json
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    logging.getLogger("backtester").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(description="Quantanamo Bae paper trading replay of CSV bar files.")
+    parser.add_argument('csv', nargs='+', help="CSV files with Date, Close and Symbol columns (or SYMBOL=path).")
+    parser.add_argument('--strategy', type=str, choices=list(STRATEGIES), default=STRATEGY_NAME, help="Trading strategy.")
+    parser.add_argument('--speed', type=float, default=REPLAY_SPEED, help="Multiple of real time, default as fast as possible.")
+    parser.add_argument('--batch-size', type=int, default=REPLAY_BATCH_SIZE, help="Bars per batch.")
+    args = parser.parse_args()
+
+    engine = ReplayEngine(args.strategy)
+    for spec in args.csv:
+        symbol, _, path = spec.rpartition("=")
+        engine.add_source(CSVReplaySource(path, symbol or None, batch_size=args.batch_size, speed=args.speed))
+
+    results = asyncio.run(engine.run())
+    print(results.to_string())
+    print(json.dumps(engine.latency_report(), indent=2))
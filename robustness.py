@@ -0,0 +1,299 @@
+import logging  # robustness.py
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    ROBUSTNESS_BATCH_ELEMENTS, ROBUSTNESS_BLOCK_SIZE, ROBUSTNESS_PERCENTILES, ROBUSTNESS_SAMPLES, ROBUSTNESS_SEED
+)
+from ledger import BUY, SELL, equity_statistics, trade_statistics
+from utils import extract_column_values
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+def _run_lengths(flags):
+    """Length of the run of True ending at every position of each row of a 2D boolean array."""
+    counts = np.cumsum(flags, axis=1)
+    # The count at the last False before each position, subtracting it restarts the run
+    return counts - np.maximum.accumulate(np.where(flags, 0, counts), axis=1)
+
+
+def round_trip_statistics(profit_pct, days_held, trading_days, initial_capital, final_capital, open_position=False):
+    """
+    trade_statistics for many trade histories at once, one per row of 2D arrays of round trips.
+
+    The ledger of a history is a BUY row (with a NaN profit) before every SELL, plus a
+    trailing BUY when a position is still open. Instead of building those rows the BUY row
+    conventions of trade_statistics are applied directly: they add to Total Trades and lower
+    the win rate, cap win streaks at 1 and lengthen loss streaks. Each row's values agree
+    with trade_statistics on the equivalent ledger up to rounding.
+
+    :param profit_pct: (samples, trades) Profit % of every round trip
+    :param days_held: (samples, trades) Days held of every round trip
+    :param trading_days: Calendar days between the first and last backtested bar
+    :param final_capital: Final portfolio value per sample
+    :param open_position: Whether the histories end with a position open
+    :return: Dict of stats keyed like trade_statistics, one value per sample
+    """
+    profit_pct = np.asarray(profit_pct, dtype=np.float64)
+    days_held = np.asarray(days_held, dtype=np.float64)
+    n_samples, n_trips = profit_pct.shape
+    total_trades = 2 * n_trips + bool(open_position)
+    win = profit_pct > 0
+    n_wins = np.count_nonzero(win, axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        portfolio_values = initial_capital + np.cumsum(profit_pct, axis=1) / 100 * initial_capital
+        rolling_max = np.maximum.accumulate(portfolio_values, axis=1)
+        max_drawdown = ((portfolio_values - rolling_max) / rolling_max).min(axis=1, initial=np.inf)
+
+        mean_profit = profit_pct.sum(axis=1) / n_trips
+        volatility = profit_pct.std(axis=1, ddof=1) if n_trips > 1 else np.full(n_samples, np.nan)
+        max_trade_gain = profit_pct.max(axis=1, initial=-np.inf)
+        max_trade_loss = profit_pct.min(axis=1, initial=np.inf)
+
+        sharpe_ratio = np.where(volatility > 0, mean_profit / volatility, 0.0)
+        total_profit = np.where(win, profit_pct, 0.0).sum(axis=1)
+        total_loss = np.abs(np.where(win, 0.0, profit_pct).sum(axis=1))
+        profit_factor = np.where(total_loss > 0, total_profit / total_loss, np.inf)
+        risk_reward_ratio = np.where(max_trade_loss != 0, np.abs(max_trade_gain / max_trade_loss), np.inf)
+
+        final_capital = np.asarray(final_capital, dtype=np.float64)
+        if trading_days > 0:
+            cagr = ((final_capital / initial_capital) ** (365 / trading_days) - 1) * 100
+        else:
+            cagr = np.zeros(n_samples)
+
+    # j losing trips in a row are 2j ledger rows, plus the BUY of the winning trip after them,
+    # or of the open position when they end the history
+    losing_runs = _run_lengths(~win)
+    previous_run = np.zeros_like(losing_runs)
+    previous_run[:, 1:] = losing_runs[:, :-1]
+    before_win = np.where(win, 2 * previous_run + 1, 0).max(axis=1, initial=0)
+    trailing = 2 * losing_runs[:, -1] + bool(open_position) if n_trips else np.full(n_samples, total_trades)
+    longest_loss_streak = np.maximum(before_win, trailing).astype(np.float64)
+    longest_loss_streak[longest_loss_streak == 0] = np.nan
+
+    return {
+        "Total Trades": np.full(n_samples, total_trades),
+        "Win Rate (%)": n_wins / total_trades * 100 if total_trades > 0 else np.zeros(n_samples),
+        "Max Drawdown": np.where(n_trips > 0, max_drawdown, np.nan),
+        "Sharpe Ratio": sharpe_ratio,
+        "Profit Factor": profit_factor,
+        "CAGR (%)": cagr,
+        "Avg Profit per Trade (%)": mean_profit,
+        "Avg Trade Duration (days)": days_held.mean(axis=1) if n_trips else np.full(n_samples, trading_days / max(1, total_trades)),
+        "Max Trade Gain (%)": max_trade_gain,
+        "Max Trade Loss (%)": max_trade_loss,
+        "Risk-Reward Ratio": risk_reward_ratio,
+        "Volatility (Std Dev)": volatility,
+        # Every win is followed by the BUY row of the next trip, so win streaks never pass 1
+        "Longest Win Streak": np.where(n_wins > 0, 1.0, np.nan),
+        "Longest Loss Streak": longest_loss_streak,
+        "Trading Days": np.full(n_samples, trading_days),
+    }
+
+
+def _batches(n_samples, row_length, batch_elements=ROBUSTNESS_BATCH_ELEMENTS):
+    """Sample counts per batch so no 2D array holds more than about batch_elements values."""
+    batch = max(1, batch_elements // max(1, row_length))
+    return [min(batch, n_samples - start) for start in range(0, n_samples, batch)]
+
+
+def _concat(batches):
+    return {key: np.concatenate([batch[key] for batch in batches]) for key in batches[0]}
+
+
+def _compounded_statistics(trip_profit, trip_days, trading_days, initial_capital, open_position):
+    """round_trip_statistics of (samples, trades) round trips compounded from the initial capital."""
+    # Every sell reinvests everything, so the capital compounds trade by trade. A position
+    # still open at the end holds no cash, like Backtester.capital
+    if open_position:
+        final_capital = np.zeros(len(trip_profit))
+    else:
+        final_capital = initial_capital * np.prod(1 + trip_profit / 100, axis=1)
+    return round_trip_statistics(trip_profit, trip_days, trading_days, initial_capital, final_capital, open_position)
+
+
+def trade_bootstrap(profit_pct, days_held, trading_days, initial_capital, open_position=False,
+                    n_samples=ROBUSTNESS_SAMPLES, seed=ROBUSTNESS_SEED):
+    """
+    Resample the completed trades with replacement into n_samples alternative trade orders
+    and histories of the same length.
+
+    :param profit_pct: Profit % of every completed trade
+    :param days_held: Days held of every completed trade
+    :param open_position: Whether the run ended with a position open
+    :return: Dict of stats keyed like trade_statistics, one value per sample
+    """
+    profit_pct = np.asarray(profit_pct, dtype=np.float64)
+    days_held = np.asarray(days_held, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+
+    results = []
+    for batch in _batches(n_samples, len(profit_pct)):
+        picks = rng.integers(0, len(profit_pct), size=(batch, len(profit_pct)))
+        results.append(_compounded_statistics(profit_pct[picks], days_held[picks], trading_days, initial_capital, open_position))
+    return _concat(results)
+
+
+def daily_equity(equity):
+    """Last equity value of every calendar day, the per-bar curve of intraday runs is too noisy to block."""
+    equity = equity.dropna()
+    if len(equity) > 1 and (equity.index[1:] - equity.index[:-1]).min() < pd.Timedelta(days=1):
+        equity = equity.groupby(equity.index.normalize()).last()
+    return equity
+
+
+def block_bootstrap(equity, n_samples=ROBUSTNESS_SAMPLES, block_size=ROBUSTNESS_BLOCK_SIZE, seed=ROBUSTNESS_SEED):
+    """
+    Circular block bootstrap of the daily returns of an equity curve.
+
+    Returns are drawn in blocks of block_size consecutive days from random starting days so
+    the autocorrelation inside a block (volatility clusters, trends) is kept, then compounded
+    from the first equity value into n_samples alternative curves.
+
+    :param equity: Equity Series indexed by date (Backtester.equity_curve()["Equity"])
+    :return: Dict with the equity_statistics metrics and Percent Return, one value per sample
+    """
+    equity = daily_equity(equity)
+    values = equity.to_numpy(dtype=np.float64)
+    returns = np.diff(values) / values[:-1]
+    n = len(returns)
+    if n < 2:
+        raise ValueError("Block bootstrap needs at least three days of equity.")
+
+    years = (equity.index[-1] - equity.index[0]).total_seconds() / SECONDS_PER_YEAR
+    periods_per_year = n / years if years > 0 else 1.0
+    block_size = max(1, min(block_size, n))
+    n_blocks = -(-n // block_size)
+    # Every block as a row of a strided view over the returns extended circularly, so a
+    # sample is a gather of whole rows instead of one index per return
+    blocks = np.lib.stride_tricks.sliding_window_view(np.concatenate((returns, returns[:block_size - 1])), block_size)
+    rng = np.random.default_rng(seed)
+
+    results = []
+    for batch in _batches(n_samples, n_blocks * block_size):
+        starts = rng.integers(0, n, size=(batch, n_blocks))
+        sampled = blocks[starts].reshape(batch, -1)[:, :n]
+
+        curves = values[0] * np.cumprod(1 + sampled, axis=1)
+        rolling_max = np.maximum(np.maximum.accumulate(curves, axis=1), values[0])
+        std = sampled.std(axis=1, ddof=1)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            results.append({
+                "Max Drawdown": np.minimum(((curves - rolling_max) / rolling_max).min(axis=1), 0.0),
+                "Sharpe Ratio": np.where(std > 0, sampled.mean(axis=1) / std * np.sqrt(periods_per_year), 0.0),
+                "CAGR (%)": ((curves[:, -1] / values[0]) ** (1 / years) - 1) * 100 if years > 0 else np.zeros(batch),
+                "Volatility (Std Dev)": std * np.sqrt(periods_per_year) * 100,
+                "Percent Return": (curves[:, -1] / values[0] - 1) * 100,
+            })
+    return _concat(results)
+
+
+def holding_bars(rows):
+    """Bars between each BUY and the SELL that closes it, from ledger rows with bar indexes."""
+    buys = rows["bar"][rows["action"] == BUY]
+    sells = rows["bar"][rows["action"] == SELL]
+    return sells - buys[:len(sells)]
+
+
+def random_entry(close, dates, holding, trading_days, initial_capital, open_position=False,
+                 n_samples=ROBUSTNESS_SAMPLES, seed=ROBUSTNESS_SEED):
+    """
+    Baseline of trades entered at random bars: every sample has as many trades as the run,
+    each held for a holding period drawn from the run's, so a strategy whose bands don't
+    beat this one has no edge over its own exposure.
+
+    Random trades may overlap, each one is priced on its own.
+
+    :param close: Close price per bar
+    :param dates: DatetimeIndex of the bars
+    :param holding: Holding period of every completed trade in bars (holding_bars)
+    :return: Dict of stats keyed like trade_statistics, one value per sample
+    """
+    close = np.asarray(close, dtype=np.float64)
+    holding = np.asarray(holding, dtype=np.int64)
+    day_numbers = pd.DatetimeIndex(dates).as_unit("ns").asi8 // (86_400 * 10 ** 9)
+    n_trades = len(holding)
+    rng = np.random.default_rng(seed)
+
+    results = []
+    for batch in _batches(n_samples, n_trades):
+        held = np.minimum(holding[rng.integers(0, n_trades, size=(batch, n_trades))], len(close) - 1)
+        # Entries are uniform over the bars that leave room for the holding period
+        entries = (rng.random((batch, n_trades)) * (len(close) - held)).astype(np.int64)
+        exits = entries + held
+        trip_profit = (close[exits] - close[entries]) / close[entries] * 100
+        trip_days = (day_numbers[exits] - day_numbers[entries]).astype(np.float64)
+        results.append(_compounded_statistics(trip_profit, trip_days, trading_days, initial_capital, open_position))
+    return _concat(results)
+
+
+def percentile_bands(samples, actual=None, percentiles=ROBUSTNESS_PERCENTILES):
+    """
+    Percentiles of every sampled metric.
+
+    :param samples: Dict of metric name to sampled values
+    :param actual: Stats dict of the original run, added as an Actual column when given
+    :return: DataFrame with one row per metric and one column per percentile
+    """
+    names = list(samples)
+    values = np.stack([np.asarray(samples[name], dtype=np.float64) for name in names])
+    with np.errstate(invalid="ignore"):
+        bands = np.nanpercentile(values, percentiles, axis=1).T if values.size else np.empty((len(names), len(percentiles)))
+    table = pd.DataFrame(bands, index=names, columns=[f"p{p:g}" for p in percentiles])
+    if actual is not None:
+        table.insert(0, "Actual", [actual.get(name, np.nan) for name in names])
+    return table
+
+
+def robustness_report(backtester, n_samples=ROBUSTNESS_SAMPLES, block_size=ROBUSTNESS_BLOCK_SIZE,
+                      seed=ROBUSTNESS_SEED, percentiles=ROBUSTNESS_PERCENTILES):
+    """
+    Percentile bands of a finished backtest under three resampling schemes:
+
+    - trade_bootstrap: the completed trades resampled with replacement
+    - block_bootstrap: daily returns of the equity curve resampled in blocks
+    - random_entry: trades of the same holding periods entered at random bars
+
+    :param backtester: Backtester after run()
+    :return: Dict of scheme name to percentile_bands DataFrame, schemes without enough data are left out
+    """
+    rows = backtester.ledger.rows
+    sold = rows[rows["action"] == SELL]
+    open_position = len(rows) > 0 and rows["action"][-1] == BUY
+    trading_days = (backtester.trade_end_date - backtester.trade_start_date).days if backtester.trade_start_date else 0
+    actual = trade_statistics(
+        rows["profit_pct"], rows["days_held"], trading_days, backtester.initial_capital, backtester.capital
+    )
+
+    report = {}
+    if len(sold) == 0:
+        logger.warning("No completed trades, skipping the robustness analysis.")
+        return report
+
+    report["trade_bootstrap"] = percentile_bands(trade_bootstrap(
+        sold["profit_pct"], sold["days_held"], trading_days, backtester.initial_capital, open_position, n_samples, seed
+    ), actual, percentiles)
+
+    equity_curve = backtester.equity_curve() if len(backtester.data) > 1 else None
+    if equity_curve is not None:
+        equity = daily_equity(equity_curve["Equity"])
+        if len(equity) > 2:
+            years = (equity.index[-1] - equity.index[0]).total_seconds() / SECONDS_PER_YEAR
+            actual_equity = equity_statistics(equity.to_numpy(), years)
+            actual_equity["Percent Return"] = (equity.iloc[-1] / equity.iloc[0] - 1) * 100
+            report["block_bootstrap"] = percentile_bands(
+                block_bootstrap(equity, n_samples, block_size, seed), actual_equity, percentiles
+            )
+
+        report["random_entry"] = percentile_bands(random_entry(
+            extract_column_values(backtester.data, "Close"), equity_curve.index, holding_bars(rows), trading_days,
+            backtester.initial_capital, open_position, n_samples, seed
+        ), actual, percentiles)
+
+    return report
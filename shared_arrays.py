@@ -0,0 +1,165 @@
+import logging  # shared_arrays.py
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from utils import normalize_price_frame
+
+logger = logging.getLogger(__name__)
+
+ALIGNMENT = 64  # Byte alignment of every array in a segment, one cache line
+
+# Segments attached in this process, kept open for as long as views into them may exist
+_attached = {}
+
+
+class SharedArraysHandle:
+    """
+    Picklable description of a SharedArrays segment: its name plus the offset, dtype and shape
+    of every array. This is all a worker task has to carry, a few hundred bytes however large
+    the arrays are.
+    """
+
+    def __init__(self, name, layout, meta=None):
+        """
+        :param name: Name of the shared memory segment
+        :param layout: Dict of key to (offset, dtype str, shape)
+        :param meta: Small picklable extras, e.g. column names or a timezone
+        """
+        self.name = name
+        self.layout = layout
+        self.meta = meta or {}
+
+    def __repr__(self):
+        return f"SharedArraysHandle({self.name!r}, {len(self.layout)} arrays)"
+
+
+class SharedArrays:
+    """
+    Copies a dict of NumPy arrays into one multiprocessing.shared_memory segment, once.
+
+    Worker processes attach() to the handle and get read-only NumPy views of the same physical
+    pages, so neither the arrays nor per-worker copies of them are pickled. The creating process
+    owns the segment: close() (or leaving the with block) unlinks it, after which it can no
+    longer be attached.
+    """
+
+    def __init__(self, arrays, meta=None):
+        """
+        :param arrays: Dict of picklable key to array, copied into the segment
+        :param meta: Small picklable extras passed along in the handle
+        """
+        arrays = {key: np.asarray(value) for key, value in arrays.items()}
+        layout, offset = {}, 0
+        for key, value in arrays.items():
+            layout[key] = (offset, value.dtype.str, value.shape)
+            offset += -(-value.nbytes // ALIGNMENT) * ALIGNMENT
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        self.handle = SharedArraysHandle(self.shm.name, layout, meta)
+        for key, value in arrays.items():
+            _view(self.shm, *layout[key])[...] = value
+        logger.debug(f"Shared {len(arrays)} arrays ({offset / 1e6:.1f} MB) in segment {self.shm.name}")
+
+    def arrays(self):
+        """Read-only views of the shared arrays, for use in the creating process."""
+        return {key: _read_only(_view(self.shm, *spec)) for key, spec in self.handle.layout.items()}
+
+    def close(self):
+        """Release and unlink the segment. Views handed out before must not be used afterwards."""
+        if self.shm is not None:
+            _close(self.shm)
+            self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _view(shm, offset, dtype, shape):
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape, dtype=np.int64))
+    return np.frombuffer(shm.buf, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+
+def _close(shm):
+    try:
+        shm.close()
+    except BufferError:
+        # NumPy views still point into the mapping, it can only be unmapped once they are gone
+        logger.warning(f"Segment {shm.name} still has live views, drop them before closing it.")
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+def attach(handle):
+    """
+    Attach to a shared segment by its handle.
+
+    :param handle: SharedArraysHandle from the creating process
+    :return: Dict of key to read-only NumPy view, no data is copied
+    """
+    shm = _attached.get(handle.name)
+    if shm is None:
+        # Processes of a multiprocessing pool share the creator's resource tracker, which
+        # unlinks the segment once when the creator closes it
+        shm = _attached[handle.name] = shared_memory.SharedMemory(name=handle.name)
+    return {key: _read_only(_view(shm, *spec)) for key, spec in handle.layout.items()}
+
+
+def detach(handle):
+    """Close this process's mapping of a segment. Views from attach() must not be used afterwards."""
+    shm = _attached.pop(handle.name, None)
+    if shm is not None:
+        _close(shm)
+
+
+def dates_to_array(dates):
+    """(int64 nanoseconds since the epoch in UTC, timezone name or None) of a DatetimeIndex."""
+    dates = pd.DatetimeIndex(dates)
+    return dates.as_unit("ns").asi8, None if dates.tz is None else str(dates.tz)
+
+
+def array_to_dates(values, tz=None, name=None):
+    """DatetimeIndex over int64 nanoseconds from dates_to_array."""
+    dates = pd.DatetimeIndex(values.view("datetime64[ns]"), name=name)
+    return dates if tz is None else dates.tz_localize("UTC").tz_convert(tz)
+
+
+def share_frame(data):
+    """
+    Put a price frame in shared memory.
+
+    The frame is brought into the canonical layout of utils.normalize_price_frame and its
+    column block and Date index are copied into one segment.
+
+    :param data: Pandas DataFrame of prices
+    :return: SharedArrays whose handle attach_frame() turns back into the frame
+    """
+    data = normalize_price_frame(data)
+    dates, tz = dates_to_array(data.index)
+    block = np.ascontiguousarray(data.to_numpy(dtype=np.float64).T)
+    return SharedArrays({"Date": dates, "values": block}, meta={"columns": list(data.columns), "tz": tz})
+
+
+def attach_frame(handle):
+    """
+    Rebuild a frame shared by share_frame() over the shared pages.
+
+    The columns are read-only views, adding columns (e.g. Signal) works as usual but the shared
+    prices can't be modified.
+
+    :param handle: SharedArraysHandle of share_frame()
+    :return: DataFrame equal to the normalized frame that was shared
+    """
+    arrays = attach(handle)
+    index = array_to_dates(arrays["Date"], handle.meta["tz"], name="Date")
+    # The transpose of the (columns x bars) block is kept as is, one contiguous row per column
+    return pd.DataFrame(arrays["values"].T, index=index, columns=handle.meta["columns"], copy=False)
@@ -1,49 +1,101 @@
 import logging
 import numpy as np
-from strategies.strategy_base import Strategy
-from utils import extract_close_column
+import pandas as pd
+from config import COMPACT_FRAMES
+from strategies.strategy_base import Strategy, bar_close
+from utils import extract_column_values
 
 logger = logging.getLogger(__name__)
 
 class MACD(Strategy):
-    def __init__(self, data, fast_period=12, slow_period=26, signal_period=9):
-        super().__init__(data)
+    def __init__(self, data, fast_period=12, slow_period=26, signal_period=9, compact=COMPACT_FRAMES):
+        super().__init__(data, compact)
         self.fast_period = fast_period
         self.slow_period = slow_period
         self.signal_period = signal_period
+        self.reset_state()
 
     def get_name(self): return "MACD"
 
     def get_feature_column_names(self): return ['MACD', 'MACD_signal']
 
+    def get_params(self): return {"fast_period": self.fast_period, "slow_period": self.slow_period, "signal_period": self.signal_period}
+
     def generate_signals(self):
         """Generate MACD trading signals robustly."""
         logger.info("Generating MACD trade signals...")
 
-        # Robust selection of Close column
-        close_col = extract_close_column(self.data)
-
-        close_prices = self.data[close_col[0]].astype(float)
-
-        self.data['EMA_fast'] = self.ema(close_prices, self.fast_period)
-        self.data['EMA_slow'] = self.ema(close_prices, self.slow_period)
+        close_prices = pd.Series(extract_column_values(self.data, 'Close'), index=self.data.index)
 
-        self.data['MACD'] = self.data['EMA_fast'] - self.data['EMA_slow']
+        ema_fast = self.ema(close_prices, self.fast_period)
+        ema_slow = self.ema(close_prices, self.slow_period)
+        macd = ema_fast - ema_slow
+        macd_signal = self.ema(macd, self.signal_period)
 
-        self.data['MACD_signal'] = self.ema(self.data['MACD'], self.signal_period)
-        self.data['MACD_histogram'] = self.data['MACD'] - self.data['MACD_signal']
+        # The compact mode only keeps what the signals and the AI features need
+        if self.compact:
+            self.store_indicators(MACD=macd, MACD_signal=macd_signal)
+        else:
+            self.store_indicators(EMA_fast=ema_fast, EMA_slow=ema_slow, MACD=macd, MACD_signal=macd_signal,
+                                  MACD_histogram=macd - macd_signal)
 
         # Generate signals based on MACD crossover
-        self.data['Signal'] = 0
-        self.data.loc[self.data['MACD'] > self.data['MACD_signal'], 'Signal'] = 1
-        self.data.loc[self.data['MACD'] < self.data['MACD_signal'], 'Signal'] = -1
+        signals = macd_signals(macd, macd_signal)
 
-        buys = (self.data['Signal'] == 1).sum()
-        sells = (self.data['Signal'] == -1).sum()
+        buys = (signals == 1).sum()
+        sells = (signals == -1).sum()
         logger.info(f"Buy signals: {buys}, Sell signals: {sells}")
 
-        return self.data['Signal']
+        return self.signal_output(signals)
 
     def ema(self, prices, period):
         """Compute Exponential Moving Average."""
-        return prices.ewm(span=period, adjust=False).mean()
+        return ema(prices, period)
+
+    def reset_state(self):
+        self.ema_fast_state = RunningEMA(self.fast_period)
+        self.ema_slow_state = RunningEMA(self.slow_period)
+        self.macd_signal_state = RunningEMA(self.signal_period)
+        self.macd = self.macd_signal = float("nan")
+
+    def update(self, bar):
+        """Consume one bar and return its signal using running EMAs."""
+        close = bar_close(bar)
+        self.macd = self.ema_fast_state.update(close) - self.ema_slow_state.update(close)
+        self.macd_signal = self.macd_signal_state.update(self.macd)
+        return 1 if self.macd > self.macd_signal else -1 if self.macd < self.macd_signal else 0
+
+class RunningEMA:
+    """
+    EMA updated in O(1) per value, repeating the arithmetic of pandas'
+    ewm(span=period, adjust=False).mean() so the values match the batch columns exactly.
+    """
+
+    def __init__(self, period):
+        com = (period - 1) / 2.0
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - self.alpha
+        self.weighted = None
+
+    def update(self, value):
+        """Push a value and return the updated average."""
+        if self.weighted is None or self.weighted != self.weighted:
+            # First value, or still waiting for the first non-NaN one
+            self.weighted = value
+        elif value == value and self.weighted != value:
+            old_wt = self.old_wt_factor
+            self.weighted = (old_wt * self.weighted + self.alpha * value) / (old_wt + self.alpha)
+        return self.weighted
+
+def ema(prices, period):
+    """Compute the Exponential Moving Average of a pandas Series or DataFrame."""
+    return prices.ewm(span=period, adjust=False).mean()
+
+def macd_signals(macd, macd_signal):
+    """Buy (1) while MACD is above its signal line, sell (-1) while below, hold (0) when equal."""
+    macd = np.asarray(macd, dtype=np.float64).ravel()
+    macd_signal = np.asarray(macd_signal, dtype=np.float64).ravel()
+    signals = np.zeros(len(macd), dtype=np.int64)
+    signals[macd > macd_signal] = 1
+    signals[macd < macd_signal] = -1
+    return signals
@@ -0,0 +1,6 @@
+from strategies.sma import SMA  # strategies/registry.py
+from strategies.rsi import RSI
+from strategies.macd import MACD
+
+# Strategy classes by the name used on the command line and in config.STRATEGY_NAME
+STRATEGIES = {"SMA": SMA, "RSI": RSI, "MACD": MACD}
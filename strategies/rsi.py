@@ -1,71 +1,173 @@
 import logging
 import numpy as np
-from strategies.strategy_base import Strategy
-from utils import extract_close_column
+from config import COMPACT_FRAMES
+from strategies.strategy_base import Strategy, bar_close
+from utils import extract_column_values
 
 logger = logging.getLogger(__name__)
 
 class RSI(Strategy):
-    def __init__(self, data, period=14, overbought=70, oversold=30):
-        super().__init__(data)
+    def __init__(self, data, period=14, overbought=70, oversold=30, compact=COMPACT_FRAMES):
+        super().__init__(data, compact)
         self.period = period
         self.overbought = overbought
         self.oversold = oversold
+        self.reset_state()
 
     def get_name(self): return "RSI"
 
     def get_feature_column_names(self): return ["RSI"]
 
+    def get_params(self): return {"period": self.period, "overbought": self.overbought, "oversold": self.oversold}
+
     def generate_signals(self):
         """Generate RSI signals using Wilder's smoothing method robustly."""
         logger.info("Generating RSI trade signals...")
 
-        # Robust selection of Close column
-        close_col = extract_close_column(self.data)
-
-        close_prices = self.data[close_col].values.astype(float)
-
-        if len(close_prices) <= self.period:
-            logger.error(f"Insufficient data ({len(close_prices)}) for RSI calculation, requires at least {self.period + 1}")
-            raise ValueError("Insufficient data for RSI calculation.")
-
-        delta = np.diff(close_prices)
-        gain = np.maximum(delta, 0)
-        loss = np.abs(np.minimum(delta, 0))
-
-        initial_gain = gain[:self.period]
-        initial_loss = loss[:self.period]
-
-        if len(initial_gain) < self.period or len(initial_loss) < self.period:
-            logger.error("Not enough data to calculate initial average gain/loss.")
-            raise ValueError("Insufficient data for initial RSI averages.")
+        close_prices = extract_column_values(self.data, "Close")
+        rsi = wilder_rsi(close_prices, self.period)
 
-        avg_gain = np.zeros(len(close_prices))
-        avg_loss = np.zeros(len(close_prices))
-
-        avg_gain[self.period] = np.mean(initial_gain)
-        avg_loss[self.period] = np.mean(initial_loss)
-
-        if np.isnan(avg_gain[self.period]) or np.isnan(avg_loss[self.period]):
-            logger.error("Initial avg_gain or avg_loss resulted in NaN.")
-            raise ValueError("NaN encountered during RSI initialization.")
-
-        for i in range(self.period + 1, len(close_prices)):
-            avg_gain[i] = (avg_gain[i - 1] * (self.period - 1) + gain[i - 1]) / self.period
-            avg_loss[i] = (avg_loss[i - 1] * (self.period - 1) + loss[i - 1]) / self.period
-
-        rs = avg_gain / (avg_loss + 1e-10)
-        rsi = 100 - (100 / (1 + rs))
-
-        self.data['RSI'] = rsi
+        self.store_indicators(RSI=rsi)
 
         # Generate signals based on RSI
-        self.data['Signal'] = 0
-        self.data.loc[rsi < self.oversold, 'Signal'] = 1
-        self.data.loc[rsi > self.overbought, 'Signal'] = -1
+        signals = rsi_signals(rsi, self.overbought, self.oversold)
 
-        buys = (self.data['Signal'] == 1).sum()
-        sells = (self.data['Signal'] == -1).sum()
+        buys = (signals == 1).sum()
+        sells = (signals == -1).sum()
         logger.info(f"Buy signals: {buys}, Sell signals: {sells}")
 
-        return self.data['Signal']
+        return self.signal_output(signals)
+
+    def reset_state(self):
+        self.prev_close = None
+        self.bars_seen = 0
+        self.initial_gains, self.initial_losses = [], []
+        self.avg_gain = self.avg_loss = 0.0
+        self.rsi = None
+        (self.smoothing_weight,), (_, a1) = wilder_filter_coefficients(self.period)
+        self.smoothing_decay = -a1
+
+    def update(self, bar):
+        """Consume one bar and return its signal using running Wilder averages."""
+        close = bar_close(bar)
+        if self.prev_close is not None:
+            delta = close - self.prev_close
+            gain, loss = max(delta, 0.0), abs(min(delta, 0.0))
+
+            if self.bars_seen <= self.period:
+                self.initial_gains.append(gain)
+                self.initial_losses.append(loss)
+            if self.bars_seen == self.period:
+                # Same seed as the batch calculation, mean of the first period moves
+                self.avg_gain = float(np.mean(self.initial_gains))
+                self.avg_loss = float(np.mean(self.initial_losses))
+                self.initial_gains, self.initial_losses = [], []
+            elif self.bars_seen > self.period:
+                # Same arithmetic as the lfilter step in wilder_rsi
+                self.avg_gain = self.smoothing_decay * self.avg_gain + self.smoothing_weight * gain
+                self.avg_loss = self.smoothing_decay * self.avg_loss + self.smoothing_weight * loss
+        self.prev_close = close
+
+        rs = self.avg_gain / (self.avg_loss + 1e-10)
+        self.rsi = 100 - (100 / (1 + rs))
+        self.bars_seen += 1
+        return 1 if self.rsi < self.oversold else -1 if self.rsi > self.overbought else 0
+
+    def update_chunk(self, close):
+        """
+        Signals of a block of closes. Once the Wilder averages are seeded the rest of the
+        block goes through the same lfilter call as wilder_rsi, started from the running
+        averages, so the values match the batch RSI exactly.
+        """
+        close = np.asarray(close, dtype=np.float64)
+        signals = np.empty(len(close), dtype=np.int64)
+
+        # The first period moves only collect the seed, replay them bar by bar
+        seeded = 0
+        while seeded < len(close) and self.bars_seen <= self.period:
+            signals[seeded] = self.update(float(close[seeded]))
+            seeded += 1
+        if seeded == len(close):
+            return signals
+
+        from scipy.signal import lfilter
+
+        rest = close[seeded:]
+        delta = np.diff(rest, prepend=self.prev_close)
+        gain = np.maximum(delta, 0)
+        loss = np.abs(np.minimum(delta, 0), out=delta)
+
+        b, a = wilder_filter_coefficients(self.period)
+        avg_gain = lfilter(b, a, gain, zi=[-a[1] * self.avg_gain])[0]
+        avg_loss = lfilter(b, a, loss, zi=[-a[1] * self.avg_loss])[0]
+        self.avg_gain, self.avg_loss = float(avg_gain[-1]), float(avg_loss[-1])
+        self.prev_close = float(rest[-1])
+        self.bars_seen += len(rest)
+
+        rsi = np.divide(avg_gain, np.add(avg_loss, 1e-10, out=avg_loss), out=avg_gain)
+        rsi += 1
+        np.divide(100, rsi, out=rsi)
+        np.subtract(100, rsi, out=rsi)
+        self.rsi = float(rsi[-1])
+        signals[seeded:] = rsi_signals(rsi, self.overbought, self.oversold)
+        return signals
+
+def wilder_rsi(close_prices, period):
+    """
+    Compute the RSI of a price array using Wilder's smoothing.
+
+    :param close_prices: NumPy array of closing prices
+    :param period: Lookback period
+    :return: NumPy array of RSI values, one per price
+    :raises ValueError: If there is not enough data for the lookback period
+    """
+    if len(close_prices) <= period:
+        logger.error(f"Insufficient data ({len(close_prices)}) for RSI calculation, requires at least {period + 1}")
+        raise ValueError("Insufficient data for RSI calculation.")
+
+    delta = np.diff(close_prices)
+    gain = np.maximum(delta, 0)
+    loss = np.abs(np.minimum(delta, 0), out=delta)
+
+    initial_gain = gain[:period]
+    initial_loss = loss[:period]
+
+    if len(initial_gain) < period or len(initial_loss) < period:
+        logger.error("Not enough data to calculate initial average gain/loss.")
+        raise ValueError("Insufficient data for initial RSI averages.")
+
+    avg_gain = np.zeros(len(close_prices))
+    avg_loss = np.zeros(len(close_prices))
+
+    avg_gain[period] = np.mean(initial_gain)
+    avg_loss[period] = np.mean(initial_loss)
+
+    if np.isnan(avg_gain[period]) or np.isnan(avg_loss[period]):
+        logger.error("Initial avg_gain or avg_loss resulted in NaN.")
+        raise ValueError("NaN encountered during RSI initialization.")
+
+    # Wilder's smoothing avg[i] = avg[i - 1] * (period - 1) / period + gain[i - 1] / period is a
+    # first order IIR filter, so run it through lfilter seeded with the initial averages
+    if len(close_prices) > period + 1:
+        from scipy.signal import lfilter  # Slow to import, only needed once there is data to smooth
+
+        b, a = wilder_filter_coefficients(period)
+        avg_gain[period + 1:] = lfilter(b, a, gain[period:], zi=[-a[1] * avg_gain[period]])[0]
+        avg_loss[period + 1:] = lfilter(b, a, loss[period:], zi=[-a[1] * avg_loss[period]])[0]
+
+    # 100 - (100 / (1 + avg_gain / (avg_loss + 1e-10))), worked in place to skip temporaries
+    rsi = np.divide(avg_gain, np.add(avg_loss, 1e-10, out=avg_loss), out=avg_gain)
+    rsi += 1
+    np.divide(100, rsi, out=rsi)
+    return np.subtract(100, rsi, out=rsi)
+
+def wilder_filter_coefficients(period):
+    """lfilter (b, a) coefficients of Wilder's smoothing for a lookback period."""
+    return [1.0 / period], [1.0, -(period - 1) / period]
+
+def rsi_signals(rsi, overbought, oversold):
+    """Buy (1) below the oversold level, sell (-1) above the overbought level, hold (0) otherwise."""
+    signals = np.zeros(len(rsi), dtype=np.int64)
+    signals[rsi < oversold] = 1
+    signals[rsi > overbought] = -1
+    return signals
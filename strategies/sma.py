@@ -1,26 +1,32 @@
 import logging # strategies/sma_strategy.py
+import math
 import numpy as np
-from config import SMA_SHORT_WINDOW, SMA_LONG_WINDOW
-from strategies.strategy_base import Strategy
+import pandas as pd
+from config import SMA_SHORT_WINDOW, SMA_LONG_WINDOW, COMPACT_FRAMES
+from utils import extract_column_values
+from strategies.strategy_base import Strategy, bar_close
 
 logger = logging.getLogger(__name__)
 
 class SMA(Strategy):
-    def __init__(self, data, short_window=SMA_SHORT_WINDOW, long_window=SMA_LONG_WINDOW):
-        super().__init__(data)
+    def __init__(self, data, short_window=SMA_SHORT_WINDOW, long_window=SMA_LONG_WINDOW, compact=COMPACT_FRAMES):
+        super().__init__(data, compact)
         self.short_window = short_window
         self.long_window = long_window
+        self.reset_state()
 
     def get_name(self): return "SMA"
 
     def get_feature_column_names(self): return ["SMA_short", "SMA_long"]
 
+    def get_params(self): return {"short_window": self.short_window, "long_window": self.long_window}
+
     def generate_signals(self):
         """Generate buy/sell signals based on SMA crossover."""
         logger.info("Generating SMA trade signals...")
 
         # Validate sufficient data for SMA calculations
-        min_required_days = max(SMA_SHORT_WINDOW, SMA_LONG_WINDOW)
+        min_required_days = max(self.short_window, self.long_window)
         if len(self.data) < min_required_days:
             logger.warning(f"Data length ({len(self.data)}) is insufficient for SMA calculations.")
             raise ValueError("Not enough data for SMA window")
@@ -29,22 +35,112 @@ class SMA(Strategy):
             logger.error("Missing 'Close' column in data. Cannot generate signals.")
             raise ValueError("Missing 'Close' column in data")
 
-        # Calculate SMAs
-        self.data['SMA_short'] = self.data['Close'].rolling(window=SMA_SHORT_WINDOW).mean()
-        self.data['SMA_long'] = self.data['Close'].rolling(window=SMA_LONG_WINDOW).mean()
+        # Calculate SMAs (in float64, compact frames hold float32 prices)
+        close = pd.Series(extract_column_values(self.data, 'Close'), index=self.data.index)
+        sma_short = close.rolling(window=self.short_window).mean()
+        sma_long = close.rolling(window=self.long_window).mean()
 
         # Ensure SMA calculations are valid
-        if self.data['SMA_short'].isna().all() or self.data['SMA_long'].isna().all():
+        if np.all(sma_short.isna()) or np.all(sma_long.isna()):
             logger.warning("Insufficient data for rolling window. All SMA values are NaN.")
             raise ValueError("SMA calculations resulted in all NaN values.")
+        self.store_indicators(SMA_short=sma_short, SMA_long=sma_long)
 
         # Generate trading signals (1 = Buy, -1 = Sell)
-        self.data['Signal'] = np.where(self.data['SMA_short'] > self.data['SMA_long'], 1, -1)
+        signals = sma_signals(sma_short, sma_long)
 
         # Logging trade signal counts
-        buys = (self.data['Signal'] == 1).sum()
-        sells = (self.data['Signal'] == -1).sum()
+        buys = (signals == 1).sum()
+        sells = (signals == -1).sum()
         logger.info(f"Buy signals: {buys}, Sell signals: {sells}")
 
-        return self.data["Signal"]
+        return self.signal_output(signals)
+
+    def reset_state(self):
+        self.sma_short_state = RollingMean(self.short_window)
+        self.sma_long_state = RollingMean(self.long_window)
+        self.sma_short = self.sma_long = float("nan")
+
+    def update(self, bar):
+        """Consume one bar and return its signal, O(1) regardless of history length."""
+        close = bar_close(bar)
+        self.sma_short = self.sma_short_state.update(close)
+        self.sma_long = self.sma_long_state.update(close)
+        return 1 if self.sma_short > self.sma_long else -1
+
+class RollingMean:
+    """
+    Rolling mean over a ring buffer, updated in O(1) per value.
+
+    Uses the same compensated add/remove arithmetic as pandas' rolling().mean(), so the values
+    match the batch SMA columns exactly.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = [float("nan")] * window
+        self.count = 0
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = float("nan")
+
+    def update(self, value):
+        """Push a value and return the mean of the last window values (NaN until the window is full)."""
+        slot = self.count % self.window
+        if self.window == 1:
+            self.buffer[slot] = value
+            self.count += 1
+            return value
+        if self.count >= self.window:
+            self._remove(self.buffer[slot])
+        elif self.count == 0:
+            self.prev_value = value
+        self.buffer[slot] = value
+        self.count += 1
+        self._add(value)
+
+        if self.nobs < self.window:
+            return float("nan")
+        result = self.sum_x / self.nobs
+        if self.num_consecutive_same_value >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+    def _add(self, value):
+        if value != value:
+            return
+        self.nobs += 1
+        y = value - self.compensation_add
+        t = self.sum_x + y
+        self.compensation_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_ct += 1
+        if value == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = value
+
+    def _remove(self, value):
+        if value != value:
+            return
+        self.nobs -= 1
+        y = -value - self.compensation_remove
+        t = self.sum_x + y
+        self.compensation_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_ct -= 1
 
+def sma_signals(sma_short, sma_long):
+    """Buy (1) while the short SMA is above the long SMA, sell (-1) otherwise."""
+    return np.where(sma_short > sma_long, 1, -1)
@@ -1,8 +1,16 @@
-from abc import ABC, abstractmethod  # strategy.py
+import numbers  # strategy.py
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+from utils import extract_column_values
 
 class Strategy:
-    def __init__(self, data):
+    def __init__(self, data, compact=False):
         self.data = data  # Historical market data
+        # Compact mode leaves the data frame untouched: indicators go to self.indicators as
+        # float32 arrays and generate_signals returns an int8 array instead of a Signal column
+        self.compact = compact
+        self.indicators = {}
 
     @abstractmethod
     def get_name(self):
@@ -16,7 +24,81 @@ class Strategy:
         as features when AI training."""
         pass
 
+    @abstractmethod
+    def get_params(self):
+        """Each strategy must implement this method to return its tunable parameters as a dict."""
+        pass
+
     @abstractmethod
     def generate_signals(self):
         """Each strategy must implement this method to generate trade signals."""
         pass
+
+    @abstractmethod
+    def reset_state(self):
+        """Each strategy must implement this method to clear the state used by update."""
+        pass
+
+    @abstractmethod
+    def update(self, bar):
+        """Each strategy must implement this method to consume one new bar in O(1) and return
+        the signal generate_signals would give for it."""
+        pass
+
+    def update_chunk(self, close):
+        """
+        Signals of a block of consecutive closes, continuing the incremental state of update
+        so a history can be processed one block at a time. Strategies with a vectorized form
+        of their recurrence override this, the default feeds the bars through update.
+
+        :param close: NumPy array of closing prices
+        :return: int64 array with the signal of every bar
+        """
+        update = self.update
+        return np.fromiter((update(value) for value in close.tolist()), dtype=np.int64, count=len(close))
+
+    def store_indicators(self, **columns):
+        """Keep indicator values, as data columns or as float32 arrays in self.indicators in compact mode."""
+        for name, values in columns.items():
+            if self.compact:
+                self.indicators[name] = np.asarray(values, dtype=np.float32).ravel()
+            else:
+                self.data[name] = values
+
+    def signal_output(self, signals):
+        """Return the signals the way generate_signals hands them out for the current mode."""
+        if self.compact:
+            return np.asarray(signals, dtype=np.int8).ravel()
+        self.data['Signal'] = signals
+        return self.data['Signal']
+
+    def feature_frame(self):
+        """
+        Close and the feature indicators of a compact strategy as a small float32 DataFrame,
+        built on demand for the AI model, which works on named columns.
+        """
+        columns = {"Close": extract_column_values(self.data, "Close").astype(np.float32)}
+        for name in self.get_feature_column_names():
+            columns[name] = self.indicators[name]
+        return pd.DataFrame(columns, index=self.data.index)
+
+    def warmup(self, data=None):
+        """
+        Seed the incremental state by replaying historical bars through update.
+
+        :param data: DataFrame with a Close column, defaults to the strategy data
+        :return: Signal of the last historical bar, None if there were no bars
+        """
+        self.reset_state()
+        signal = None
+        for close in extract_column_values(self.data if data is None else data, "Close"):
+            signal = self.update(float(close))
+        return signal
+
+def bar_close(bar):
+    """Close price of a bar passed as a number or as a mapping/row with a 'Close' entry."""
+    if type(bar) is float:
+        return bar  # Streaming hot path, skips the slower ABC check below
+    if isinstance(bar, numbers.Real):
+        return float(bar)
+    return float(np.ravel(bar["Close"])[0])
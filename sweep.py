@@ -0,0 +1,241 @@
+import logging  # sweep.py
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    DATA_OFFLINE, INITIAL_CAPITAL, STOCK_SYMBOL, SWEEP_SORT_BY, SWEEP_WORKERS, TRADE_WINDOW_END_DATE,
+    TRADE_WINDOW_START_DATE
+)
+from backtester import Backtester
+from shared_arrays import SharedArrays, array_to_dates, attach, dates_to_array
+from strategies.registry import STRATEGIES
+from strategies.sma import sma_signals
+from strategies.rsi import wilder_rsi, rsi_signals
+from strategies.macd import ema, macd_signals
+from utils import extract_column_values
+
+logger = logging.getLogger(__name__)
+
+# Set in each worker process by _init_worker so tasks only carry the grid point
+_worker_state = {}
+
+
+class IndicatorCache:
+    """
+    Memoizes indicators over one Close series, so each rolling window, RSI period and EMA span
+    is computed once no matter how many grid points use it.
+    """
+
+    def __init__(self, close):
+        self.close = pd.Series(np.asarray(close, dtype=np.float64))
+        self._cache = {}
+
+    def arrays(self):
+        """The Close series and every cached indicator as NumPy arrays, keyed like the cache."""
+        return {"close": self.close.to_numpy(), **{key: np.asarray(value) for key, value in self._cache.items()}}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a filled cache from arrays(), wrapping the arrays (e.g. shared memory views) without copying."""
+        cache = cls(arrays["close"])
+        for key, values in arrays.items():
+            if key != "close":
+                cache._cache[key] = values if key[0] == "rsi" else pd.Series(values, copy=False)
+        return cache
+
+    def _memo(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def sma(self, window):
+        return self._memo(("sma", window), lambda: self.close.rolling(window=window).mean())
+
+    def rsi(self, period):
+        return self._memo(("rsi", period), lambda: wilder_rsi(self.close.to_numpy(), period))
+
+    def ema(self, span):
+        return self._memo(("ema", span), lambda: ema(self.close, span))
+
+    def macd(self, fast_period, slow_period):
+        return self._memo(("macd", fast_period, slow_period), lambda: self.ema(fast_period) - self.ema(slow_period))
+
+    def macd_signal(self, fast_period, slow_period, signal_period):
+        return self._memo(
+            ("macd_signal", fast_period, slow_period, signal_period),
+            lambda: ema(self.macd(fast_period, slow_period), signal_period)
+        )
+
+    def signals(self, strategy_name, params):
+        """Trade signals for one grid point, built from the cached indicators."""
+        if strategy_name == "SMA":
+            return sma_signals(self.sma(params["short_window"]), self.sma(params["long_window"]))
+        if strategy_name == "RSI":
+            return rsi_signals(self.rsi(params["period"]), params["overbought"], params["oversold"])
+        if strategy_name == "MACD":
+            fast_period, slow_period = params["fast_period"], params["slow_period"]
+            return macd_signals(
+                self.macd(fast_period, slow_period), self.macd_signal(fast_period, slow_period, params["signal_period"])
+            )
+        raise ValueError(f"Invalid strategy '{strategy_name}'. Valid options: {list(STRATEGIES.keys())}")
+
+
+def expand_grid(strategy_name, grid):
+    """
+    Expand a parameter grid into one params dict per combination.
+
+    :param strategy_name: Name of the strategy in STRATEGIES
+    :param grid: Dict of parameter name to list of values, missing parameters keep the strategy defaults
+    :return: List of params dicts
+    :raises ValueError: If the grid names a parameter the strategy doesn't have
+    """
+    if strategy_name not in STRATEGIES:
+        raise ValueError(f"Invalid strategy '{strategy_name}'. Valid options: {list(STRATEGIES.keys())}")
+
+    defaults = STRATEGIES[strategy_name](None).get_params()
+    unknown = set(grid) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown {strategy_name} parameters {sorted(unknown)}. Valid options: {list(defaults)}")
+
+    names = list(defaults)
+    values = [list(grid.get(name, [defaults[name]])) for name in names]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def backtest_params(dates, cache, strategy_name, params, initial_capital, bars=None):
+    """
+    Backtest one grid point and return its params and stats as a results row.
+
+    :param bars: Only backtest the first bars of the history, None uses all of it. The
+                 indicators only look back, so a prefix of the full history signals is exactly
+                 what a run on the shorter history would produce.
+    """
+    frame = pd.DataFrame(
+        {"Close": cache.close.to_numpy()[:bars], "Signal": cache.signals(strategy_name, params)[:bars]}, index=dates[:bars]
+    )
+    strategy = STRATEGIES[strategy_name](frame, **params)
+    stats = Backtester(frame, initial_capital, False, strategy, engine="vectorized").run()
+    return {**params, **stats}
+
+
+def _init_worker(handle, strategy_name, initial_capital):
+    arrays = attach(handle)
+    dates = array_to_dates(arrays.pop("Date"), handle.meta["tz"], handle.meta["name"])
+    _worker_state.update(
+        dates=dates, cache=IndicatorCache.from_arrays(arrays), strategy_name=strategy_name, initial_capital=initial_capital
+    )
+
+
+def _backtest_worker(params, bars=None):
+    state = _worker_state
+    return backtest_params(state["dates"], state["cache"], state["strategy_name"], params, state["initial_capital"], bars)
+
+
+@contextmanager
+def worker_pool(dates, cache, strategy_name, initial_capital, workers):
+    """
+    Process pool whose workers backtest grid points with _backtest_worker.
+
+    The dates and every indicator already in the cache go into one shared memory segment, the
+    workers attach to read-only views of it instead of each unpickling a copy.
+    """
+    date_values, tz = dates_to_array(dates)
+    # The pool shuts down before the segment is unlinked on the way out of the with block
+    with SharedArrays({**cache.arrays(), "Date": date_values}, meta={"tz": tz, "name": dates.name}) as shared, \
+            ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(shared.handle, strategy_name, initial_capital)
+            ) as executor:
+        yield executor
+
+
+def sweep(data, strategy_name, grid, initial_capital=INITIAL_CAPITAL, workers=SWEEP_WORKERS, sort_by=SWEEP_SORT_BY):
+    """
+    Backtest every combination of a strategy parameter grid.
+
+    Indicators are computed once in the parent process and shared with the workers through
+    worker_pool, the workers only build signals and run the vectorized backtest per grid point.
+
+    :param data: Pandas DataFrame with a Close column
+    :param strategy_name: Name of the strategy in STRATEGIES
+    :param grid: Dict of parameter name to list of values
+    :param workers: Number of worker processes, None uses every CPU and 1 runs in-process
+    :param sort_by: Stats key to sort by, highest first, None keeps grid order
+    :return: DataFrame with one row per grid point (params followed by the stats)
+    """
+    combos = expand_grid(strategy_name, grid)
+    cache = IndicatorCache(extract_column_values(data, "Close"))
+    dates = data.index
+
+    # Fill the cache before forking so every indicator is computed exactly once
+    for params in combos:
+        cache.signals(strategy_name, params)
+
+    workers = workers or os.cpu_count()
+    logger.info(f"Sweeping {len(combos)} {strategy_name} parameter combinations with {workers} workers...")
+
+    if workers == 1 or len(combos) == 1:
+        rows = [backtest_params(dates, cache, strategy_name, params, initial_capital) for params in combos]
+    else:
+        with worker_pool(dates, cache, strategy_name, initial_capital, workers) as executor:
+            rows = list(executor.map(_backtest_worker, combos, chunksize=max(1, len(combos) // (4 * workers))))
+
+    results = pd.DataFrame(rows)
+    if sort_by:
+        if sort_by not in results.columns:
+            results[sort_by] = float("nan")
+        results = results.sort_values(sort_by, ascending=False, kind="mergesort", na_position="last", ignore_index=True)
+    return results
+
+
+def parse_grid(specs):
+    """Parse ['short_window=10,20', ...] into {'short_window': [10, 20], ...}."""
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if not values:
+            raise ValueError(f"Invalid grid '{spec}', expected name=value1,value2,...")
+        grid[name.strip()] = [_parse_number(value.strip()) for value in values.split(",") if value.strip()]
+    return grid
+
+
+def _parse_number(value):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+if __name__ == "__main__":
+    from data_loader import fetch_stock_data
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+
+    parser = argparse.ArgumentParser(description="Quantanamo Bae strategy parameter sweep.")
+    parser.add_argument('--strategy', type=str, choices=list(STRATEGIES), default='SMA', help="Trading strategy.")
+    parser.add_argument('--stock', type=str, default=STOCK_SYMBOL, help="Stock symbol to trade.")
+    parser.add_argument(
+        '--grid', action='append', default=[], help="Parameter values, e.g. --grid short_window=10,20,30 (repeatable)."
+    )
+    parser.add_argument('--sort-by', type=str, default=SWEEP_SORT_BY, help="Stats key to sort by.")
+    parser.add_argument('--workers', type=int, default=SWEEP_WORKERS, help="Worker processes (default: all CPUs).")
+    parser.add_argument('--top', type=int, default=20, help="Number of rows to show.")
+    parser.add_argument('--output', type=str, help="Write the full results to this CSV file.")
+    parser.add_argument('--offline', action='store_true', default=DATA_OFFLINE, help="Use cached price data only.")
+    args = parser.parse_args()
+
+    data = fetch_stock_data(args.stock, TRADE_WINDOW_START_DATE, TRADE_WINDOW_END_DATE, offline=args.offline)
+    if data.empty:
+        logger.error("No data retrieved. Exiting.")
+        raise SystemExit(1)
+
+    results = sweep(data, args.strategy, parse_grid(args.grid), workers=args.workers, sort_by=args.sort_by)
+    if args.output:
+        results.to_csv(args.output, index=False)
+        logger.info(f"Sweep results saved to {args.output}")
+    print(results.head(args.top).to_string())
@@ -0,0 +1,43 @@
+import pytest
+import pandas as pd
+import numpy as np
+from unittest.mock import MagicMock
+from sklearn.ensemble import RandomForestClassifier
+from ai_model import AIModel
+
+@pytest.fixture
+def feature_data():
+    rng = np.random.default_rng(5)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 400)))
+    data = pd.DataFrame({'Close': close}, index=pd.date_range('2022-01-01', periods=400))
+    data['SMA_short'] = data['Close'].rolling(5).mean()
+    data['SMA_long'] = data['Close'].rolling(20).mean()
+    return data
+
+@pytest.fixture
+def ai_model():
+    strategy = MagicMock()
+    strategy.get_feature_column_names.return_value = ['SMA_short', 'SMA_long']
+    model = AIModel(strategy)
+    model.model = RandomForestClassifier(n_estimators=10, random_state=42)
+    return model
+
+def test_walk_forward_only_predicts_after_first_window(ai_model, feature_data):
+    signals = ai_model.walk_forward(feature_data, train_window=100, test_window=50, n_jobs=1)
+    assert len(signals) == len(feature_data)
+    assert not signals[:100].any()
+    assert set(np.unique(signals[100:])) <= {0, 1}
+
+def test_walk_forward_has_no_look_ahead(ai_model, feature_data):
+    signals = ai_model.walk_forward(feature_data, train_window=100, test_window=50, n_jobs=1)
+
+    # Rewriting everything after bar 250 must not change any prediction up to it
+    future = feature_data.copy()
+    future.iloc[251:] = future.iloc[251:] * 3
+    changed = ai_model.walk_forward(future, train_window=100, test_window=50, n_jobs=1)
+    np.testing.assert_array_equal(changed[:250], signals[:250])
+
+def test_walk_forward_parallel_matches_serial(ai_model, feature_data):
+    serial = ai_model.walk_forward(feature_data, train_window=100, test_window=50, n_jobs=1)
+    parallel = ai_model.walk_forward(feature_data, train_window=100, test_window=50, n_jobs=2)
+    np.testing.assert_array_equal(serial, parallel)
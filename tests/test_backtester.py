@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 from unittest.mock import MagicMock
 from backtester import Backtester
+from ledger import trade_statistics
 
 # Sample DataFrame for basic tests
 @pytest.fixture
@@ -96,3 +97,188 @@ def test_empty_data(mock_strategy):
     backtester = Backtester(empty_data, 1000, False, mock_strategy)
     results = backtester.run()
     assert results == {}
+
+# Random walk with noisy signals, long enough to hit both the profit target and the stop-loss
+@pytest.fixture
+def random_walk_data():
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 2000)))
+    signal = rng.choice([-1, 0, 1], size=2000, p=[0.05, 0.9, 0.05])
+    return pd.DataFrame({'Close': close, 'Signal': signal}, index=pd.date_range('2015-01-01', periods=2000))
+
+def assert_same_stats(left, right):
+    assert left.keys() == right.keys()
+    for key in left:
+        if isinstance(left[key], float) and np.isnan(left[key]):
+            assert np.isnan(right[key]), key
+        else:
+            assert left[key] == right[key], key
+
+# Test the vectorized engine against the loop
+def test_vectorized_engine_matches_loop(random_walk_data, mock_strategy):
+    loop = Backtester(random_walk_data.copy(), 1000, False, mock_strategy)
+    vectorized = Backtester(random_walk_data.copy(), 1000, False, mock_strategy, engine="vectorized")
+    loop_stats = loop.run()
+    vectorized_stats = vectorized.run()
+
+    assert len(loop.trades) > 10
+    assert vectorized.trades == loop.trades
+    assert vectorized.get_buy_signals() == loop.get_buy_signals()
+    assert vectorized.get_sell_signals() == loop.get_sell_signals()
+    assert_same_stats(vectorized_stats, loop_stats)
+
+def test_vectorized_engine_sample_data(sample_data, mock_strategy):
+    loop = Backtester(sample_data, 1000, False, mock_strategy)
+    vectorized = Backtester(sample_data, 1000, False, mock_strategy, engine="vectorized")
+    assert_same_stats(vectorized.run(), loop.run())
+    assert vectorized.trades == loop.trades
+
+def test_vectorized_engine_empty_data(mock_strategy):
+    empty_data = pd.DataFrame(columns=['Close', 'Signal'])
+    backtester = Backtester(empty_data, 1000, False, mock_strategy, engine="vectorized")
+    assert backtester.run() == {}
+
+def test_unknown_engine(sample_data, mock_strategy):
+    with pytest.raises(ValueError):
+        Backtester(sample_data, 1000, False, mock_strategy, engine="turbo")
+
+# Test batched AI predictions against the per-row path
+def test_predict_ai_signals_matches_per_row(random_walk_data, mock_strategy, monkeypatch):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+    import backtester as backtester_module
+    from features import FeatureBuilder
+
+    data = random_walk_data.iloc[:300].copy()
+    data['SMA_short'] = data['Close'].rolling(5).mean()
+    data['SMA_long'] = data['Close'].rolling(20).mean()
+    train = data.dropna()
+    X = train[['SMA_short', 'SMA_long']].to_numpy()
+    y = (train['Close'].shift(-1) > train['Close']).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=10, random_state=42).fit(scaler.transform(X), y)
+
+    # Small chunks so the chunking is exercised
+    monkeypatch.setattr(backtester_module, "AI_PREDICT_CHUNK_SIZE", 64)
+    # The model is fitted on the two strategy features alone, without lags or return features
+    backtester = Backtester(data, 1000, True, mock_strategy, model, scaler, feature_builder=FeatureBuilder((), (), ()))
+    batched = backtester.predict_ai_signals()
+    per_row = [backtester.determine_trade_signal(data.iloc[i]) for i in range(len(data))]
+    assert batched.tolist() == per_row
+
+def test_predict_ai_signals_missing_features(sample_data, mock_strategy, caplog):
+    mock_strategy.get_feature_column_names.return_value = ['RSI']
+    model = MagicMock()
+    backtester = Backtester(sample_data, 1000, True, mock_strategy, model, MagicMock())
+    assert backtester.predict_ai_signals().tolist() == [0] * len(sample_data)
+    model.predict.assert_not_called()
+    assert "Could not find feature columns" in caplog.text
+
+# Test precomputed signals override the model and the Signal column
+def test_precomputed_signals(sample_data, mock_strategy):
+    model = MagicMock()
+    signals = [1, 0, 0, 0, -1, 0]
+    backtester = Backtester(sample_data, 1000, True, mock_strategy, model, MagicMock(), signals=signals)
+    backtester.run()
+    model.predict.assert_not_called()
+    assert [trade[1] for trade in backtester.trades] == ["BUY", "SELL"]
+    assert backtester.trades[0][0] == sample_data.index[0]
+
+# The pandas statistics the ledger replaced, kept as the reference for the vectorized pass
+def reference_trade_statistics(backtester):
+    trades_df = pd.DataFrame(backtester.trades, columns=["Date", "Action", "Price", "Shares", "Profit %", "Days Held"])
+    initial_capital = backtester.initial_capital
+    trading_days = (backtester.trade_end_date - backtester.trade_start_date).days
+
+    wins = trades_df[trades_df["Profit %"] > 0]
+    losses = trades_df[trades_df["Profit %"] <= 0]
+    if trades_df["Days Held"].isnull().all():
+        avg_trade_duration = trading_days / max(1, len(trades_df))
+    else:
+        avg_trade_duration = trades_df["Days Held"].mean()
+
+    portfolio_values = initial_capital + (trades_df["Profit %"].cumsum() / 100 * initial_capital)
+    rolling_max = portfolio_values.cummax()
+    drawdown = (portfolio_values - rolling_max) / rolling_max
+
+    std = trades_df["Profit %"].std()
+    total_loss = abs(losses["Profit %"].sum())
+    max_trade_gain, max_trade_loss = trades_df["Profit %"].max(), trades_df["Profit %"].min()
+    trades_df["Win"] = trades_df["Profit %"] > 0
+    trades_df["Streak"] = trades_df["Win"].groupby((trades_df["Win"] != trades_df["Win"].shift()).cumsum()).cumcount() + 1
+
+    return {
+        "Total Trades": len(trades_df),
+        "Win Rate (%)": len(wins) / len(trades_df) * 100,
+        "Max Drawdown": float(drawdown.min()),
+        "Sharpe Ratio": trades_df["Profit %"].mean() / std if std > 0 else 0,
+        "Profit Factor": wins["Profit %"].sum() / total_loss if total_loss > 0 else float("inf"),
+        "Avg Profit per Trade (%)": trades_df["Profit %"].mean(),
+        "Avg Trade Duration (days)": avg_trade_duration,
+        "Max Trade Gain (%)": max_trade_gain,
+        "Max Trade Loss (%)": max_trade_loss,
+        "Risk-Reward Ratio": abs(max_trade_gain / max_trade_loss) if max_trade_loss != 0 else float("inf"),
+        "Volatility (Std Dev)": std,
+        "Longest Win Streak": trades_df[trades_df["Win"] == True]["Streak"].max(),
+        "Longest Loss Streak": trades_df[trades_df["Win"] == False]["Streak"].max(),
+    }
+
+@pytest.mark.parametrize("signals", [None, [1, 0, 0, 0, 0, 0], [1, 0, -1, 1, 0, 0]])
+def test_statistics_match_pandas_reference(sample_data, random_walk_data, mock_strategy, signals):
+    data = sample_data if signals else random_walk_data
+    backtester = Backtester(data, 1000, False, mock_strategy, signals=signals)
+    backtester.run()
+    trading_days = (backtester.trade_end_date - backtester.trade_start_date).days
+    stats = trade_statistics(
+        backtester.ledger.column("profit_pct"), backtester.ledger.column("days_held"), trading_days, 1000,
+        backtester.capital
+    )
+    reference = reference_trade_statistics(backtester)
+    assert_same_stats({key: stats[key] for key in reference}, reference)
+
+def test_statistics_have_no_stdout(random_walk_data, mock_strategy, capsys):
+    Backtester(random_walk_data, 1000, False, mock_strategy, engine="vectorized").run()
+    assert capsys.readouterr().out == ""
+
+def test_ledger_grows_and_records_bars(random_walk_data, mock_strategy):
+    backtester = Backtester(random_walk_data, 1000, False, mock_strategy, engine="vectorized")
+    backtester.run()
+    rows = backtester.ledger.rows
+    assert len(rows) > 64  # Past the initial capacity
+    assert (random_walk_data.index[rows["bar"]].asi8 == rows["date"]).all()
+    assert rows["price"].tolist() == random_walk_data["Close"].to_numpy()[rows["bar"]].tolist()
+
+# Test the equity curve against marking the portfolio to market bar by bar
+@pytest.mark.parametrize("engine", ["loop", "vectorized"])
+def test_equity_curve_matches_bar_by_bar(random_walk_data, mock_strategy, engine):
+    backtester = Backtester(random_walk_data, 1000, False, mock_strategy, engine=engine)
+    backtester.run()
+    curve = backtester.equity_curve()
+
+    orders = {bar: (action, shares) for bar, action, shares in zip(
+        backtester.ledger.column("bar"), backtester.ledger.column("action"), backtester.ledger.column("shares"))}
+    cash, shares, expected = 1000.0, 0.0, []
+    for bar, price in enumerate(random_walk_data["Close"]):
+        if bar in orders:
+            action, order_shares = orders[bar]
+            cash, shares = (0.0, order_shares) if action == 1 else (order_shares * price, 0.0)
+        expected.append(cash + shares * price)
+
+    assert curve.index.equals(random_walk_data.index)
+    assert curve["Equity"].tolist() == expected
+
+def test_equity_drawdown_inside_trade(mock_strategy):
+    # Bought at 100, dips to 97.5 inside the stop-loss and is sold at 104, the per-trade view sees no loss
+    data = pd.DataFrame({'Close': [100, 98, 97.5, 99, 104, 104], 'Signal': [1, 0, 0, 0, -1, 0]},
+                        index=pd.date_range('2025-01-01', periods=6))
+    backtester = Backtester(data, 1000, False, mock_strategy)
+    stats = backtester.run()
+    assert stats['Max Drawdown'] == pytest.approx(-0.025)
+    assert stats['CAGR (%)'] > 0
+
+def test_equity_curve_unavailable_for_manual_orders(sample_data, mock_strategy):
+    backtester = Backtester(sample_data, 1000, False, mock_strategy)
+    backtester.execute_trade(1, 100, pd.Timestamp('2025-01-01'))
+    backtester.execute_trade(-1, 105, pd.Timestamp('2025-01-02'))
+    assert backtester.equity_curve() is None
+    assert backtester.calculate_trade_statistics()['Max Drawdown'] == 0
@@ -0,0 +1,34 @@
+import pandas as pd
+from benchmarks.run_benchmarks import compare, make_stages
+from benchmarks.synthetic import gbm_prices
+from features import _feature_cache
+
+def report(*results):
+    return {"results": [{"stage": stage, "bars": bars, "best_s": best_s} for stage, bars, best_s in results]}
+
+# Test the regression gate passes small slowdowns, flags large ones and skips stages the baseline lacks
+def test_compare():
+    baseline = report(("sma_signals", 1000, 1.0), ("ai_train", 1000, 2.0), ("backtest_loop", 1000, 0.5))
+    current = report(("sma_signals", 1000, 1.1), ("ai_train", 1000, 3.0), ("rsi_signals", 1000, 9.0))
+    rows = compare(current, baseline, threshold=0.2)
+
+    assert [(row["stage"], row["regression"]) for row in rows] == [("sma_signals", False), ("ai_train", True)]
+    assert rows[1]["ratio"] == 1.5 and rows[1]["baseline_s"] == 2.0 and rows[1]["current_s"] == 3.0
+    assert not any(row["regression"] for row in compare(current, baseline, threshold=0.6))
+
+def test_gbm_prices_deterministic():
+    data = gbm_prices(500, seed=7)
+    pd.testing.assert_frame_equal(gbm_prices(500, seed=7), data)
+    assert not gbm_prices(500, seed=8)["Close"].equals(data["Close"])
+    assert len(data) == 500 and (data["High"] >= data["Low"]).all().all()
+    assert (data["Close"].to_numpy() > 0).all() and data.index.is_monotonic_increasing
+
+# Test repeated AI timings rebuild the features instead of reusing the previous repeat's matrix
+def test_ai_stages_start_with_empty_feature_cache():
+    stages = make_stages(300, seed=0)
+    for name in ("ai_train", "backtest_vectorized_ai"):
+        setup, run = stages[name]
+        run(setup())
+        argument = setup()
+        assert len(_feature_cache) == 0
+        run(argument)
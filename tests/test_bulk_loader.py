@@ -0,0 +1,123 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+from bulk_loader import BulkLoader, HTTPCSVTransport, NonRetryableError, TokenBucket
+
+def bars(start_date, end_date):
+    dates = pd.bdate_range(start_date, end_date, inclusive='left', name='Date')
+    return pd.DataFrame({'Close': np.linspace(100, 110, len(dates))}, index=dates)
+
+class FlakyTransport:
+    """Stub provider that fails each symbol a set number of times before answering."""
+
+    def __init__(self, failures):
+        self.failures = dict(failures)
+        self.calls = {}
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, symbol, start_date, end_date):
+        with self.lock:
+            self.calls[symbol] = self.calls.get(symbol, 0) + 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(0.01)
+            if symbol == "GONE":
+                raise NonRetryableError("unknown symbol")
+            if self.calls[symbol] <= self.failures.get(symbol, 0):
+                raise ConnectionError("503 Service Unavailable")
+            return bars(start_date, end_date)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+def loader(transport, tmp_path=None, **kwargs):
+    return BulkLoader(transport, rate=None, backoff_base=0.0, cache_dir=tmp_path, sleep=lambda seconds: None, **kwargs)
+
+# Test transient failures are retried, permanent ones reported per symbol without retrying
+def test_retries_and_errors():
+    transport = FlakyTransport({"A": 2, "B": 10})
+    result = loader(transport, max_retries=3).load(["A", "B", "C", "GONE"], "2024-01-01", "2024-03-01")
+
+    assert set(result.frames) == {"A", "C"}
+    assert len(result.frames["A"]) == len(bars("2024-01-01", "2024-03-01"))
+    assert result.attempts == {"A": 3, "B": 4, "C": 1, "GONE": 1}
+    assert "503" in result.errors["B"] and "NonRetryableError" in result.errors["GONE"]
+
+    summary = result.summary()
+    assert summary["Symbol"].tolist() == ["A", "B", "C", "GONE"]
+    assert summary.set_index("Symbol")["Error"].isna().to_dict() == {"A": True, "B": False, "C": True, "GONE": False}
+
+def test_bounded_concurrency():
+    transport = FlakyTransport({})
+    result = loader(transport, max_workers=3).load([f"S{i}" for i in range(20)], "2024-01-01", "2024-02-01")
+    assert len(result.frames) == 20
+    assert transport.peak <= 3
+
+# Test symbols already in the data cache are served from it without touching the transport
+def test_uses_data_cache(tmp_path):
+    transport = FlakyTransport({})
+    loader(transport, tmp_path).load(["A"], "2024-01-01", "2024-02-01")
+    result = loader(transport, tmp_path).load(["A"], "2024-01-01", "2024-02-01")
+    assert transport.calls["A"] == 1 and result.attempts["A"] == 0
+    assert len(result.frames["A"]) == len(bars("2024-01-01", "2024-02-01"))
+
+def test_empty_frame_is_an_error():
+    result = loader(lambda symbol, start, end: pd.DataFrame()).load(["A"], "2024-01-01", "2024-02-01")
+    assert result.frames == {} and "No data" in result.errors["A"]
+
+def test_token_bucket():
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2.0, capacity=3, clock=lambda: now[0], sleep=sleep)
+    waits = [bucket.acquire() for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0]  # The burst goes straight out
+    assert waits[3:] == pytest.approx([0.5, 0.5])  # Then one token every 1 / rate seconds
+    assert now[0] == pytest.approx(1.0)
+
+    now[0] += 10  # Idle time refills no more than the capacity
+    assert [bucket.acquire() for _ in range(4)][-1] == pytest.approx(0.5)
+
+# Test the HTTP transport against a local server that fails before it answers
+def test_http_transport_against_local_server():
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            symbol = self.path.split("?")[0].strip("/").removesuffix(".csv")
+            if symbol == "NOPE":
+                self.send_error(404)
+            elif requests.count(self.path) < 3:
+                self.send_error(503)
+            else:
+                body = bars("2024-01-01", "2024-02-01").to_csv().encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        transport = HTTPCSVTransport(f"http://127.0.0.1:{server.server_port}/{{symbol}}.csv?start={{start}}&end={{end}}")
+        result = loader(transport, max_retries=4).load(["SPY", "NOPE"], "2024-01-01", "2024-02-01")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert result.attempts == {"SPY": 3, "NOPE": 1}
+    assert "NonRetryableError" in result.errors["NOPE"]
+    pd.testing.assert_series_equal(result.frames["SPY"]["Close"], bars("2024-01-01", "2024-02-01")["Close"], check_freq=False)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtester import Backtester
+from chunked import ColumnarPrices, backtest_chunked, csv_to_columnar, write_columnar
+from ledger import EquityAccumulator, equity_statistics
+from strategies.macd import MACD
+from strategies.rsi import RSI
+from strategies.sma import SMA
+
+def random_walk(n, seed, tz=None, volatility=0.004):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    return pd.DataFrame({'Close': close}, index=pd.date_range('2020-01-02', periods=n, freq='min', tz=tz, name='Date'))
+
+# Test the store gives back the frame it was written from
+def test_columnar_round_trip(tmp_path):
+    data = random_walk(1000, seed=0, tz="America/New_York")
+    store = write_columnar(data, tmp_path / "store")
+
+    chunks = list(ColumnarPrices(tmp_path / "store").chunks(300))
+    assert [start for start, _, _ in chunks] == [0, 300, 600, 900]
+    for start, dates, _ in chunks:
+        assert dates.equals(data.index[start:start + 300])
+    assert str(store.dates().tz) == "America/New_York"
+    np.testing.assert_array_equal(np.concatenate([close for _, _, close in chunks]), data['Close'].to_numpy())
+
+def test_csv_to_columnar(tmp_path):
+    data = random_walk(500, seed=1)
+    data.reset_index().to_csv(tmp_path / "walk.csv", index=False)
+    store = csv_to_columnar(tmp_path / "walk.csv", tmp_path / "store", chunk_rows=128)
+    assert len(store) == 500 and store.dates().equals(pd.DatetimeIndex(data.index, name=None))
+    np.testing.assert_array_equal(store.columns["Close"], data['Close'].to_numpy())
+
+# Test the chunked signals carry the indicator state over block boundaries, a short volatile
+# daily-like history also checks the bars where the indicators are still seeding
+@pytest.mark.parametrize("strategy_class,indicators", [
+    (SMA, {'SMA_short': 'sma_short', 'SMA_long': 'sma_long'}),
+    (RSI, {'RSI': 'rsi'}),
+    (MACD, {'MACD': 'macd', 'MACD_signal': 'macd_signal'}),
+])
+@pytest.mark.parametrize("chunk_size", [1, 13, 64, 500])
+@pytest.mark.parametrize("n,volatility", [(2000, 0.004), (300, 0.02)])
+def test_update_chunk_matches_batch(strategy_class, indicators, chunk_size, n, volatility):
+    data = random_walk(n, seed=2, volatility=volatility)
+    expected = np.asarray(strategy_class(data.copy(), compact=True).generate_signals()).ravel()
+    batch_data = data.copy()
+    strategy_class(batch_data).generate_signals()
+
+    strategy = strategy_class(None)
+    close = data['Close'].to_numpy()
+    chunks = []
+    for i in range(0, len(close), chunk_size):
+        chunks.append(strategy.update_chunk(close[i:i + chunk_size]))
+        # The running indicators at the end of every block are the batch values of that bar
+        last = min(i + chunk_size, len(close)) - 1
+        for batch_column, attribute in indicators.items():
+            assert getattr(strategy, attribute) == pytest.approx(batch_data[batch_column].iloc[last], rel=1e-12, nan_ok=True)
+    np.testing.assert_array_equal(np.concatenate(chunks), expected)
+
+# Test the chunked backtest gives the same trades and statistics as a full in-memory one,
+# including block sizes that leave a single bar in the last block
+@pytest.mark.parametrize("strategy_class", [SMA, RSI, MACD])
+@pytest.mark.parametrize("chunk_size", [997, 4096, 9999, 20000])
+def test_chunked_backtest_matches_full_run(tmp_path, strategy_class, chunk_size):
+    data = random_walk(10000, seed=3, tz="UTC")
+    strategy = strategy_class(data.copy(), compact=True)
+    backtester = Backtester(data, 1000, False, strategy, signals=strategy.generate_signals())
+    expected = backtester.run()
+
+    store = write_columnar(data, tmp_path / "store")
+    chunked, stats = backtest_chunked(store, strategy_class(None), 1000, chunk_size)
+    assert len(backtester.trades) > 50
+    assert chunked.trades == backtester.trades
+    assert stats == expected
+
+@pytest.mark.parametrize("strategy_class", [SMA, RSI, MACD])
+@pytest.mark.parametrize("seed", [0, 18, 19])
+def test_chunked_backtest_matches_short_volatile_run(tmp_path, strategy_class, seed):
+    data = random_walk(300, seed=seed, tz="UTC", volatility=0.02)
+    strategy = strategy_class(data.copy(), compact=True)
+    backtester = Backtester(data, 1000, False, strategy, signals=strategy.generate_signals())
+    expected = backtester.run()
+
+    store = write_columnar(data, tmp_path / "store")
+    chunked, stats = backtest_chunked(store, strategy_class(None), 1000, 64)
+    assert len(backtester.trades) > 0
+    assert chunked.trades == backtester.trades
+    assert stats == expected
+
+# Test the equity statistics don't depend on how the curve is split
+def test_equity_statistics_independent_of_split():
+    equity = 1000 * np.exp(np.cumsum(np.random.default_rng(4).normal(0, 0.01, 20000)))
+    accumulator = EquityAccumulator()
+    for piece in np.array_split(equity, [1, 5000, 5001, 12345]):
+        accumulator.push(piece)
+    assert accumulator.statistics(2.0) == equity_statistics(equity, 2.0)
+
+    returns = np.diff(equity) / equity[:-1]
+    expected = returns.std(ddof=1) * np.sqrt(len(returns) / 2.0) * 100
+    assert equity_statistics(equity, 2.0)["Volatility (Std Dev)"] == pytest.approx(expected, rel=1e-13)
+
+# Test the block moments give exactly the two-pass std of a curve within one block, and stay
+# accurate when the returns barely vary around a large mean
+@pytest.mark.parametrize("n,drift,noise", [(3000, 0.0, 0.01), (3000, 1e-3, 1e-9), (20000, 1e-3, 1e-9)])
+def test_equity_volatility_matches_two_pass_std(n, drift, noise):
+    rng = np.random.default_rng(5)
+    equity = 1000 * np.cumprod(1 + drift + rng.normal(0, noise, n))
+    returns = np.diff(equity) / equity[:-1]
+    expected = returns.std(ddof=1) * np.sqrt(len(returns) / 3.0) * 100
+    volatility = equity_statistics(equity, 3.0)["Volatility (Std Dev)"]
+    if n <= EquityAccumulator.RETURN_BLOCK:
+        assert volatility == expected
+    else:
+        assert volatility == pytest.approx(expected, rel=1e-9)
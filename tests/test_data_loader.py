@@ -0,0 +1,117 @@
+import pytest
+import pandas as pd
+import numpy as np
+import data_loader
+from data_loader import fetch_stock_data, missing_ranges
+from utils import extract_column_values, normalize_price_frame
+
+# Fake yf.download: one bar per business day, MultiIndex columns like yfinance
+def fake_download(stock_symbol, start_date, end_date):
+    index = pd.bdate_range(start_date, end_date, inclusive='left', name='Date')
+    close = np.arange(len(index), dtype=float) + index.dayofyear.to_numpy()
+    columns = pd.MultiIndex.from_product([['Close', 'High', 'Low', 'Open', 'Volume'], [stock_symbol]], names=['Price', 'Ticker'])
+    values = np.column_stack([close, close + 1, close - 1, close, np.full(len(index), 1000.0)])
+    frame = pd.DataFrame(values, index=index, columns=columns)
+    frame[('Volume', stock_symbol)] = frame[('Volume', stock_symbol)].astype(np.int64)
+    return frame
+
+@pytest.fixture
+def downloads(monkeypatch):
+    calls = []
+    def download(stock_symbol, start_date, end_date):
+        calls.append((start_date, end_date))
+        return fake_download(stock_symbol, start_date, end_date)
+    monkeypatch.setattr(data_loader, "download_stock_data", download)
+    return calls
+
+def test_repeat_request_served_from_cache(tmp_path, downloads):
+    first = fetch_stock_data("WMT", "2024-01-01", "2024-03-01", cache_dir=tmp_path)
+    second = fetch_stock_data("WMT", "2024-01-01", "2024-03-01", cache_dir=tmp_path)
+    assert downloads == [("2024-01-01", "2024-03-01")]
+    pd.testing.assert_frame_equal(first, second, check_freq=False)
+    pd.testing.assert_frame_equal(second, normalize_price_frame(fake_download("WMT", "2024-01-01", "2024-03-01")), check_freq=False)
+
+def test_only_missing_ranges_downloaded(tmp_path, downloads):
+    fetch_stock_data("WMT", "2024-02-01", "2024-03-01", cache_dir=tmp_path)
+    data = fetch_stock_data("WMT", "2024-01-01", "2024-04-01", cache_dir=tmp_path)
+    assert downloads[1:] == [("2024-01-01", "2024-02-01"), ("2024-03-01", "2024-04-01")]
+    assert data.index[0] == pd.Timestamp("2024-01-01")
+    assert data.index[-1] == pd.Timestamp("2024-03-29")
+    assert data.index.is_unique and data.index.is_monotonic_increasing
+
+def test_offline_mode_never_downloads(tmp_path, downloads):
+    assert fetch_stock_data("WMT", "2024-01-01", "2024-03-01", cache_dir=tmp_path, offline=True).empty
+    fetch_stock_data("WMT", "2024-01-01", "2024-03-01", cache_dir=tmp_path)
+    data = fetch_stock_data("WMT", "2024-01-15", "2024-06-01", cache_dir=tmp_path, offline=True)
+    assert len(downloads) == 1
+    assert data.index[0] == pd.Timestamp("2024-01-15")
+    assert data.index[-1] == pd.Timestamp("2024-02-29")
+
+def test_failed_download_not_cached(tmp_path, monkeypatch):
+    def broken(*args):
+        raise ConnectionError("no network")
+    monkeypatch.setattr(data_loader, "download_stock_data", broken)
+    assert fetch_stock_data("WMT", "2024-01-01", "2024-03-01", cache_dir=tmp_path).empty
+    assert not list(tmp_path.iterdir())
+
+@pytest.fixture
+def fake_yfinance(monkeypatch):
+    """A stub yfinance module whose download serves fake_download and whose errors can be set."""
+    import sys
+    import types
+
+    yf = types.ModuleType("yfinance")
+    yf.calls = []
+    yf.shared = types.SimpleNamespace(_ERRORS={})
+    def download(symbol, start, end, **kwargs):
+        yf.calls.append((start, end))
+        return fake_download(symbol, start, end)
+    yf.download = download
+    monkeypatch.setitem(sys.modules, "yfinance", yf)
+    return yf
+
+# Test only a failure yfinance reports raises, an empty range is not one
+def test_download_raises_on_reported_errors(fake_yfinance):
+    assert data_loader.download_stock_data("WMT", "2023-12-30", "2024-01-01").empty
+
+    fake_yfinance.shared._ERRORS = {"WMT": "$WMT: possibly delisted; no price data found"}
+    assert data_loader.download_stock_data("WMT", "2023-12-30", "2024-01-01").empty
+
+    fake_yfinance.shared._ERRORS = {"WMT": "YFRateLimitError('Too Many Requests')"}
+    with pytest.raises(RuntimeError, match="Too Many Requests"):
+        data_loader.download_stock_data("WMT", "2024-01-01", "2024-03-01")
+
+    del fake_yfinance.shared  # Newer yfinance without the private dict
+    assert not data_loader.download_stock_data("WMT", "2024-01-01", "2024-03-01").empty
+
+# Test a missing range without trading days is cached as covered instead of failing every run
+@pytest.mark.parametrize("raise_errors", [False, True])
+def test_gap_without_trading_days_covered(tmp_path, fake_yfinance, caplog, raise_errors):
+    cached = fetch_stock_data("WMT", "2023-12-01", "2023-12-30", cache_dir=tmp_path, raise_errors=raise_errors)
+    for _ in range(2):
+        data = fetch_stock_data("WMT", "2023-12-01", "2024-01-01", cache_dir=tmp_path, raise_errors=raise_errors)
+        pd.testing.assert_frame_equal(data, cached, check_freq=False)
+    assert fake_yfinance.calls == [("2023-12-01", "2023-12-30"), ("2023-12-30", "2024-01-01")]
+    assert "Error fetching" not in caplog.text
+
+def test_missing_ranges():
+    ts = pd.Timestamp
+    assert missing_ranges(None, ts("2024-01-01"), ts("2024-02-01")) == [(ts("2024-01-01"), ts("2024-02-01"))]
+    assert missing_ranges((ts("2024-01-01"), ts("2024-02-01")), ts("2024-01-05"), ts("2024-01-20")) == []
+    # A request past the end is extended back to the cached interval so it stays contiguous
+    assert missing_ranges((ts("2024-01-01"), ts("2024-02-01")), ts("2024-03-01"), ts("2024-04-01")) == [(ts("2024-02-01"), ts("2024-04-01"))]
+
+# Test yfinance frames come out flat, OHLCV first, with Close readable as a view
+def test_normalize_price_frame():
+    raw = fake_download("WMT", "2024-01-01", "2024-02-01")
+    raw[('Extra', 'WMT')] = 1.0
+    raw = raw.iloc[::-1]
+    data = normalize_price_frame(raw)
+    assert data.columns.tolist() == ["Open", "High", "Low", "Close", "Volume", "Extra"]
+    assert data.index.name == "Date" and data.index.is_monotonic_increasing
+    assert (data.dtypes == np.float64).all()
+    np.testing.assert_array_equal(data["Close"], raw[('Close', 'WMT')].to_numpy()[::-1])
+
+    close = extract_column_values(data, "Close")
+    # Every read is a view of the same contiguous memory, not a fresh copy
+    assert close.flags.c_contiguous and np.shares_memory(close, extract_column_values(data, "Close"))
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from ai_model import AIModel
+from backtester import Backtester
+from features import FeatureBuilder, _feature_cache, clear_feature_cache
+from strategies.sma import SMA
+
+@pytest.fixture
+def sma_data():
+    rng = np.random.default_rng(3)
+    data = pd.DataFrame({'Close': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 500)))},
+                        index=pd.date_range('2022-01-03', periods=500, name='Date'))
+    strategy = SMA(data, 5, 20)
+    data['Signal'] = strategy.generate_signals()
+    return data, strategy
+
+# Test every column against the same feature built with pandas shifts and rolling windows
+def test_matches_pandas_reference(sma_data):
+    data, _ = sma_data
+    builder = FeatureBuilder(lags=(1, 3), return_windows=(1, 5), rolling_windows=(4,))
+    matrix, names = builder.build(data, ['SMA_short', 'SMA_long'])
+
+    log_close = np.log(data['Close'])
+    returns = log_close.diff()
+    expected = pd.DataFrame({
+        'SMA_short': data['SMA_short'], 'SMA_long': data['SMA_long'],
+        'SMA_short_lag1': data['SMA_short'].shift(1), 'SMA_short_lag3': data['SMA_short'].shift(3),
+        'SMA_long_lag1': data['SMA_long'].shift(1), 'SMA_long_lag3': data['SMA_long'].shift(3),
+        'return_1': log_close.diff(1), 'return_5': log_close.diff(5),
+        'return_mean_4': returns.rolling(4).mean(), 'return_std_4': returns.rolling(4).std(),
+    })
+    assert names == list(expected.columns)
+    np.testing.assert_allclose(matrix, expected.to_numpy(dtype=np.float32), rtol=1e-5, atol=1e-7)
+
+    assert matrix.dtype == np.float32 and matrix.flags.c_contiguous and not matrix.flags.writeable
+
+def test_no_look_ahead(sma_data):
+    data, _ = sma_data
+    builder = FeatureBuilder()
+    matrix, _ = builder.build(data, ['SMA_short', 'SMA_long'])
+    future = data.copy()
+    future.iloc[300:] = future.iloc[300:] * 2
+    changed, _ = builder.build(future, ['SMA_short', 'SMA_long'])
+    np.testing.assert_array_equal(changed[:300], matrix[:300])
+
+def test_cached_by_fingerprint(sma_data):
+    data, _ = sma_data
+    clear_feature_cache()
+    matrix, _ = FeatureBuilder().build(data, ['SMA_short', 'SMA_long'])
+    assert FeatureBuilder().build(data.copy(), ['SMA_short', 'SMA_long'])[0] is matrix
+    assert FeatureBuilder(lags=(1,)).build(data, ['SMA_short', 'SMA_long'])[0] is not matrix
+    assert FeatureBuilder().build(data.iloc[:-1], ['SMA_short', 'SMA_long'])[0] is not matrix
+    assert len(_feature_cache) == 3
+
+    with pytest.raises(ValueError):
+        FeatureBuilder(rolling_windows=(1,))
+
+# Test training and the batched backtest inference consume the one cached matrix
+def test_training_and_inference_share_the_matrix(sma_data):
+    data, strategy = sma_data
+    clear_feature_cache()
+    ai_model = AIModel(strategy)
+    ai_model.model = RandomForestClassifier(n_estimators=10, random_state=42)
+    model, scaler = ai_model.train(data)
+    assert model.n_features_in_ == len(ai_model.feature_builder.feature_names(['SMA_short', 'SMA_long']))
+
+    backtester = Backtester(data, 1000, True, strategy, model, scaler, feature_builder=ai_model.feature_builder)
+    signals = backtester.predict_ai_signals()
+    assert len(_feature_cache) == 1
+    assert signals.tolist() == [backtester.determine_trade_signal(data.iloc[i]) for i in range(len(data))]
+    backtester.run()
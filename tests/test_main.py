@@ -0,0 +1,58 @@
+import zlib
+import pandas as pd
+import numpy as np
+import main
+from main import load_universe, run_universe
+
+# Deterministic price history per symbol, "BAD" has no data
+def fake_fetch(stock_symbol, start_date, end_date, offline=False):
+    if stock_symbol == "BAD":
+        return pd.DataFrame()
+    rng = np.random.default_rng(zlib.crc32(stock_symbol.encode()))
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 200)))
+    return pd.DataFrame({'Close': close}, index=pd.date_range('2024-01-01', periods=200))
+
+def test_load_universe_from_list():
+    assert load_universe("wmt, AAPL,,WMT ,msft") == ["WMT", "AAPL", "MSFT"]
+
+def test_load_universe_from_file(tmp_path):
+    universe = tmp_path / "universe.txt"
+    universe.write_text("WMT\n# comment\nAAPL, MSFT  # inline comment\n\n")
+    assert load_universe(str(universe)) == ["WMT", "AAPL", "MSFT"]
+
+def test_run_universe_ranked_and_deterministic(monkeypatch):
+    monkeypatch.setattr(main, "fetch_stock_data", fake_fetch)
+    symbols = ["WMT", "BAD", "AAPL", "MSFT", "TSLA"]
+
+    results = run_universe(symbols, "SMA", use_ai=False, workers=2)
+    shuffled = run_universe(list(reversed(symbols)), "SMA", use_ai=False, workers=3)
+
+    assert results["Rank"].tolist() == [1, 2, 3, 4, 5]
+    assert results["Symbol"].iloc[-1] == "BAD"
+    assert results["Error"].iloc[-1] is not None
+    cagr = results["CAGR (%)"].iloc[:-1]
+    assert cagr.is_monotonic_decreasing
+    pd.testing.assert_frame_equal(results, shuffled)
+
+def test_import_main_skips_heavy_dependencies():
+    import subprocess, sys
+    heavy = ["sklearn", "matplotlib", "yfinance", "scipy", "joblib", "rich"]
+    code = f"import sys, main; print([m for m in {heavy!r} if m in sys.modules])"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+def grid_fetch(stock_symbol, start_date, end_date, offline=False):
+    # Prices on a 1/64 grid are exact in float32, so the compact run sees the same prices
+    close = np.round(fake_fetch(stock_symbol, start_date, end_date)['Close'] * 64) / 64
+    return close.to_frame()
+
+def test_compact_mode_matches_standard(monkeypatch):
+    monkeypatch.setattr(main, "fetch_stock_data", grid_fetch)
+    standard = main.QuantanamoBae("WMT", "SMA", use_ai=False)
+    standard.prepare_data()
+    compact = main.QuantanamoBae("WMT", "SMA", use_ai=False, compact=True)
+    compact.prepare_data()
+
+    assert compact.data.columns.tolist() == ["Close"]
+    assert compact.signals.dtype == np.int8
+    assert compact.train_and_backtest(display=False) == standard.train_and_backtest(display=False)
@@ -0,0 +1,84 @@
+import os
+import pytest
+import pandas as pd
+import numpy as np
+from unittest.mock import MagicMock
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from ai_model import AIModel
+from model_store import ModelStore
+from strategies.sma import SMA
+
+@pytest.fixture
+def sma_data():
+    rng = np.random.default_rng(9)
+    data = pd.DataFrame({'Close': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 200)))},
+                        index=pd.date_range('2023-01-01', periods=200))
+    strategy = SMA(data, 5, 20)
+    data['Signal'] = strategy.generate_signals()
+    return data, strategy
+
+def small_model(strategy):
+    ai_model = AIModel(strategy)
+    ai_model.model = RandomForestClassifier(n_estimators=5, random_state=42)
+    return ai_model
+
+def test_train_loads_from_store(tmp_path, sma_data):
+    data, strategy = sma_data
+    store = ModelStore(str(tmp_path))
+    model, scaler = small_model(strategy).train(data, store=store, symbol="WMT")
+    assert len(os.listdir(tmp_path)) == 1
+
+    # A second run with the same inputs must not fit again
+    cached_run = small_model(strategy)
+    cached_run.model.fit = MagicMock(side_effect=AssertionError("model was refitted"))
+    cached_model, cached_scaler = cached_run.train(data, store=store, symbol="WMT")
+    X, _ = cached_run.feature_builder.build(data, strategy.get_feature_column_names())
+    X = X[~np.isnan(X).any(axis=1)]
+    np.testing.assert_array_equal(cached_model.predict(cached_scaler.transform(X)), model.predict(scaler.transform(X)))
+
+def test_key_depends_on_inputs(sma_data):
+    data, strategy = sma_data
+    X, y = np.ones((10, 2)), np.zeros(10)
+    model = RandomForestClassifier(n_estimators=5)
+    key = ModelStore.make_key(X, y, strategy, model, "WMT")
+    assert key == ModelStore.make_key(X.copy(), y.copy(), strategy, model, "WMT")
+    assert key != ModelStore.make_key(X * 2, y, strategy, model, "WMT")
+    assert key != ModelStore.make_key(X, y, SMA(data, 5, 30), model, "WMT")
+    assert key != ModelStore.make_key(X, y, strategy, RandomForestClassifier(n_estimators=6), "WMT")
+    assert key != ModelStore.make_key(X, y, strategy, model, "AAPL")
+
+def test_evicts_least_recently_used(tmp_path):
+    store = ModelStore(str(tmp_path), max_entries=2)
+    for i, key in enumerate(["a", "b"]):
+        store.save(key, f"model-{key}", StandardScaler())
+        os.utime(store.path(key), ns=(i * 10**9, i * 10**9))
+    assert store.load("a")[0] == "model-a"  # refreshes "a", so "b" is now the oldest
+    store.save("c", "model-c", StandardScaler())
+    assert sorted(os.listdir(tmp_path)) == ["a.joblib", "c.joblib"]
+
+def test_evicts_by_size(tmp_path):
+    store = ModelStore(str(tmp_path), max_entries=None, max_bytes=1)
+    store.save("a", np.zeros(100), StandardScaler())
+    store.save("b", np.zeros(100), StandardScaler())
+    # The entry that was just written is always kept
+    assert os.listdir(tmp_path) == ["b.joblib"]
+    assert store.load("a") is None
+
+# Test entries another process deletes mid-eviction are skipped instead of failing the save
+@pytest.mark.parametrize("racing_call", ["stat", "remove"])
+def test_evict_tolerates_concurrent_eviction(tmp_path, monkeypatch, racing_call):
+    store = ModelStore(str(tmp_path), max_entries=1)
+    store.save("a", "model-a", StandardScaler())
+
+    real_call = getattr(os, racing_call)
+    raced = []
+    def racing(path, *args, **kwargs):
+        if str(path).endswith("a.joblib") and not raced:
+            raced.append(path)
+            os.unlink(path)  # The other process wins the race
+        return real_call(path, *args, **kwargs)
+    monkeypatch.setattr(os, racing_call, racing)
+
+    store.save("b", "model-b", StandardScaler())
+    assert os.listdir(tmp_path) == ["b.joblib"]
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from optimizer import SuccessiveHalving, halving_schedule
+from sweep import sweep
+
+def cyclic_prices(n, seed, period=120):
+    """Noisy cycles, which some parameter sets follow consistently better than others."""
+    rng = np.random.default_rng(seed)
+    log_price = 0.15 * np.sin(2 * np.pi * np.arange(n) / period) + np.cumsum(rng.normal(0.0002, 0.004, n))
+    return pd.DataFrame({'Close': 100 * np.exp(log_price)}, index=pd.bdate_range('2010-01-01', periods=n, name='Date'))
+
+def test_halving_schedule():
+    assert halving_schedule(2520, 54, eta=3, min_bars=252, top=5) == [(280, 54), (840, 18), (2520, 6)]
+    assert halving_schedule(10000, 1000, eta=2, min_bars=252, top=5)[-1] == (10000, 32)
+    # Too little history or too few candidates to halve
+    assert halving_schedule(200, 81, eta=3, min_bars=252, top=5) == [(200, 81)]
+    assert halving_schedule(2520, 3, eta=3, min_bars=252, top=5) == [(2520, 3)]
+    with pytest.raises(ValueError):
+        halving_schedule(2520, 54, eta=1)
+
+# Test the search reaches the exhaustive sweep's best configuration for a fraction of the bars
+@pytest.mark.parametrize("strategy_name,grid", [
+    ("SMA", {"short_window": [3, 5, 10, 15, 20, 30], "long_window": [20, 40, 60, 80, 100, 150, 200]}),
+    ("RSI", {"period": [5, 7, 14, 21, 28], "overbought": [60, 70, 80], "oversold": [20, 30, 40]}),
+    ("MACD", {"fast_period": [5, 8, 12, 16], "slow_period": [20, 26, 35, 50], "signal_period": [5, 9, 14]}),
+])
+def test_matches_exhaustive_search(strategy_name, grid):
+    data = cyclic_prices(2520, seed=0)
+    exhaustive = sweep(data, strategy_name, grid, initial_capital=1000, workers=1, sort_by="Sharpe Ratio")
+    search = SuccessiveHalving(data, strategy_name, grid, "Sharpe Ratio", initial_capital=1000)
+    results = search.run()
+
+    names = list(grid)
+    assert results[names].iloc[0].tolist() == exhaustive[names].iloc[0].tolist()
+    assert search.bars_backtested < 0.4 * len(exhaustive) * len(data)
+
+    # The full history survivors carry exactly the stats of the exhaustive sweep
+    final = results[results["Round"] == len(search.schedule)]
+    merged = final.merge(exhaustive, on=names, suffixes=("", "_sweep"))
+    assert len(merged) == len(final) == search.schedule[-1][1]
+    np.testing.assert_array_equal(merged["Sharpe Ratio"], merged["Sharpe Ratio_sweep"])
+    assert (results["Bars"] <= len(data)).all() and len(results) == len(exhaustive)
+
+def test_parallel_matches_serial():
+    data = cyclic_prices(1500, seed=1)
+    grid = {"short_window": [3, 5, 10, 20], "long_window": [40, 60, 100]}
+    serial = SuccessiveHalving(data, "SMA", grid, "CAGR (%)", min_bars=100, top=2, workers=1).run()
+    parallel = SuccessiveHalving(data, "SMA", grid, "CAGR (%)", min_bars=100, top=2, workers=2).run()
+    pd.testing.assert_frame_equal(parallel, serial)
+
+def test_invalid_objective():
+    data = cyclic_prices(600, seed=2)
+    with pytest.raises(ValueError):
+        SuccessiveHalving(data, "SMA", {"short_window": [3, 5, 10, 20]}, "Strategy", min_bars=100, top=1).run()
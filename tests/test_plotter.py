@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from plotter import lttb_indices, plot_trading_strategy, plot_trading_strategies
+
+@pytest.fixture
+def chart_data():
+    rng = np.random.default_rng(3)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 5000)))
+    return pd.DataFrame({'Close': close}, index=pd.date_range('2020-01-01', periods=5000, freq='h'))
+
+def signals_for(data, n_trades):
+    bars = np.linspace(0, len(data) - 2, 2 * n_trades).astype(int)
+    close = data['Close'].to_numpy()
+    buys = [(data.index[b], close[b], 1.0) for b in bars[::2]]
+    sells = [(data.index[s], close[s], 1.0, (close[s] / close[b] - 1) * 100) for b, s in zip(bars[::2], bars[1::2])]
+    return buys, sells
+
+# Test LTTB keeps the endpoints and the extremes of the line
+def test_lttb_indices():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 500)
+    y[4321] = 50  # Spike
+    kept = lttb_indices(x, y, 200)
+    assert len(kept) == 200
+    assert kept[0] == 0 and kept[-1] == 9_999
+    assert np.all(np.diff(kept) > 0)
+    assert 4321 in kept
+
+def test_lttb_indices_short_line():
+    assert lttb_indices([0, 1, 2], [1, 2, 3], 10).tolist() == [0, 1, 2]
+
+# Test many trades render to a file
+def test_plot_trading_strategy(chart_data, tmp_path):
+    buys, sells = signals_for(chart_data, 1000)
+    path = plot_trading_strategy(chart_data, "TEST", buys, sells, output_dir=tmp_path, max_points=500, dpi=50)
+    assert path == str(tmp_path / "TEST_strategy.png")
+    with open(path, 'rb') as fh:
+        assert fh.read(8) == b'\x89PNG\r\n\x1a\n'
+
+def test_plot_no_trades(chart_data, tmp_path):
+    path = plot_trading_strategy(chart_data, "FLAT", [], [], output_dir=tmp_path, dpi=50)
+    assert (tmp_path / "FLAT_strategy.png").exists() and path.endswith("FLAT_strategy.png")
+
+# Test batch mode renders every symbol in worker processes
+def test_plot_trading_strategies(chart_data, tmp_path):
+    buys, sells = signals_for(chart_data, 20)
+    charts = [(chart_data, symbol, buys, sells) for symbol in ("AAA", "BBB", "CCC")]
+    paths = plot_trading_strategies(charts, output_dir=str(tmp_path), workers=2)
+    assert paths == [str(tmp_path / f"{symbol}_strategy.png") for symbol in ("AAA", "BBB", "CCC")]
+    assert all((tmp_path / f"{symbol}_strategy.png").exists() for symbol in ("AAA", "BBB", "CCC"))
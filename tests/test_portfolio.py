@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtester import Backtester
+from portfolio import PortfolioBacktester, build_matrices
+from strategies.sma import SMA
+
+def random_walks(n, n_symbols, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, (n, n_symbols)), axis=0))
+    dates = pd.bdate_range('2015-01-01', periods=n, name='Date')
+    return {f"S{i}": pd.DataFrame({'Close': close[:, i]}, index=dates) for i in range(n_symbols)}
+
+# Test a one symbol, one position portfolio trades exactly like the single symbol backtester
+def test_single_symbol_matches_backtester():
+    data = random_walks(2520, 1, seed=0)["S0"]
+    strategy = SMA(data.copy(), short_window=5, long_window=20, compact=True)
+    signals = strategy.generate_signals()
+    backtester = Backtester(data, 1000, False, strategy, signals=signals)
+    expected = backtester.run()
+
+    portfolio = PortfolioBacktester(data.rename(columns={'Close': 'S0'}), signals[:, None], 1000, max_positions=1,
+                                    strategy_name="SMA")
+    stats = portfolio.run()
+
+    trades = portfolio.trades()
+    assert backtester.trades[-1][1] == "SELL"  # Ends in cash, so the final values agree too
+    assert trades["Date"].tolist() == [trade[0] for trade in backtester.trades]
+    assert trades["Action"].tolist() == [trade[1] for trade in backtester.trades]
+    assert trades["Shares"].tolist() == [trade[3] for trade in backtester.trades]
+    assert {key: stats[key] for key in expected} == expected
+
+@pytest.mark.parametrize("sizing", ["equal_weight", "fixed_fraction", "cash_split"])
+def test_positions_and_cash_limits(sizing):
+    close, signals = build_matrices(random_walks(600, 30, seed=1), "SMA", {"short_window": 5, "long_window": 20})
+    portfolio = PortfolioBacktester(close, signals, 10_000, sizing=sizing, max_positions=5, position_fraction=0.1)
+    portfolio.run()
+
+    trades = portfolio.trades()
+    held = trades.assign(Change=np.where(trades["Action"] == "BUY", 1, -1)).groupby("Date")["Change"].sum().cumsum()
+    assert held.max() == 5 and held.min() >= 0
+    assert (portfolio.cash >= 0).all()
+
+    # With nothing open the equity is all cash, and it starts at the initial capital
+    curve = portfolio.equity_curve()
+    assert curve["Equity"].iloc[0] == pytest.approx(10_000)
+    np.testing.assert_allclose(curve["Equity"], curve["Cash"] + curve["Positions"])
+
+def test_sizing_targets():
+    close, signals = build_matrices(random_walks(300, 10, seed=2), "SMA", {"short_window": 5, "long_window": 20})
+    equal = PortfolioBacktester(close, signals, 10_000, sizing="equal_weight", max_positions=4)
+    equal.run()
+    first_buys = equal.trades().query("Action == 'BUY'").groupby("Date").head(4).iloc[:1]
+    assert (first_buys["Price"] * first_buys["Shares"]).iloc[0] == pytest.approx(2_500)
+
+    split = PortfolioBacktester(close, signals, 10_000, sizing="cash_split", max_positions=10)
+    split.run()
+    trades = split.trades()
+    first = trades[trades["Date"] == trades["Date"].iloc[0]]
+    assert (first["Price"] * first["Shares"]).sum() == pytest.approx(10_000)
+
+# Test gaps in a symbol's history are neither traded nor break the marking of open positions
+def test_missing_bars():
+    frames = random_walks(400, 3, seed=3)
+    frames["S1"] = frames["S1"].iloc[100:]
+    close, signals = build_matrices(frames, "SMA", {"short_window": 5, "long_window": 20})
+    assert close["S1"].iloc[:100].isna().all() and (signals["S1"].iloc[:100] == 0).all()
+
+    portfolio = PortfolioBacktester(close, signals, 1000, max_positions=3)
+    portfolio.run()
+    trades = portfolio.trades()
+    assert (trades.loc[trades["Symbol"] == "S1", "Date"] >= close.index[100]).all()
+    assert np.isfinite(portfolio.equity).all()
+
+def test_invalid_arguments():
+    close = pd.DataFrame({'A': [1.0, 2.0]})
+    with pytest.raises(ValueError):
+        PortfolioBacktester(close, np.zeros((2, 1)), sizing="kelly")
+    with pytest.raises(ValueError):
+        PortfolioBacktester(close, np.zeros((3, 1)))
@@ -0,0 +1,25 @@
+import json
+from profiler import StageProfiler
+
+def test_records_stages_and_counters():
+    profiler = StageProfiler()
+    with profiler.stage("allocate", bars=1000):
+        block = bytearray(5 * 1024 ** 2)
+    profiler.count("model_predict_calls", 3)
+    profiler.count("model_predict_calls")
+
+    report = json.loads(profiler.to_json(symbol="WMT"))
+    assert report["symbol"] == "WMT"
+    assert report["counters"] == {"model_predict_calls": 4}
+    stage = report["stages"][0]
+    assert stage["stage"] == "allocate" and stage["bars"] == 1000
+    assert stage["peak_mem_mb"] >= 5
+    assert stage["wall_s"] >= 0 and stage["bars_per_s"] > 0
+    del block
+
+def test_disabled_profiler_records_nothing():
+    profiler = StageProfiler(enabled=False)
+    with profiler.stage("noop"):
+        pass
+    profiler.count("model_predict_calls")
+    assert profiler.report()["stages"] == [] and profiler.report()["counters"] == {}
@@ -0,0 +1,86 @@
+import asyncio
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from backtester import Backtester
+from replay import CSVReplaySource, LatencyHistogram, ReplayEngine
+from strategies.macd import MACD
+from strategies.rsi import RSI
+from strategies.sma import SMA
+
+def random_walk(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({'Close': close}, index=pd.date_range('2020-01-01', periods=n, freq='h', name='Date'))
+
+def write_csv(path, data, symbol=None):
+    frame = data.reset_index()
+    if symbol:
+        frame.insert(1, 'Symbol', symbol)
+    frame.to_csv(path, index=False)
+    return str(path)
+
+# Test the streamed trades match a batch backtest of the same bars, short histories included so
+# the bars where the indicators are still seeding count
+@pytest.mark.parametrize("strategy_class,params", [
+    (SMA, {"short_window": 5, "long_window": 20}),
+    (RSI, {"period": 14}),
+    (MACD, {"fast_period": 12, "slow_period": 26, "signal_period": 9}),
+])
+@pytest.mark.parametrize("n", [120, 300, 3000])
+def test_replay_matches_backtester(tmp_path, strategy_class, params, n):
+    data = random_walk(n, seed=1)
+    strategy = strategy_class(data.copy(), **params)
+    batch = data.copy()
+    batch['Signal'] = strategy.generate_signals()
+    backtester = Backtester(batch, 1000, False, strategy)
+    backtester.run()
+
+    engine = ReplayEngine(strategy.get_name(), 1000, params)
+    engine.add_source(CSVReplaySource(write_csv(tmp_path / "walk.csv", data), symbol="WALK", batch_size=100))
+    results = asyncio.run(engine.run())
+
+    # The batch backtest never trades on the final bar
+    streamed = [trade for trade in engine.states["WALK"].backtester.trades if trade[0] < data.index[-1]]
+    assert len(backtester.trades) > n // 150
+    assert streamed == backtester.trades
+    assert results.loc[0, "Symbol"] == "WALK" and results.loc[0, "Bars"] == n
+
+# Test bars of many symbols are routed to their own state
+def test_replay_many_symbols(tmp_path):
+    engine = ReplayEngine("RSI", 1000)
+    for i, symbol in enumerate(["AAA", "BBB", "CCC"]):
+        engine.add_source(CSVReplaySource(write_csv(tmp_path / f"{symbol}.csv", random_walk(500 + i, seed=i), symbol)))
+    results = asyncio.run(engine.run())
+
+    assert results["Symbol"].tolist() == ["AAA", "BBB", "CCC"]
+    assert results["Bars"].tolist() == [500, 501, 502]
+    report = engine.latency_report()
+    assert report["bars"] == 1503 and report["symbols"] == 3
+    assert report["processing"]["count"] == 1503
+    assert 0 < report["processing"]["p50_us"] <= report["processing"]["p99_us"] <= report["processing"]["max_us"]
+
+def test_replay_speed(tmp_path):
+    data = random_walk(3, seed=0)  # Bars an hour apart
+    source = CSVReplaySource(write_csv(tmp_path / "slow.csv", data), symbol="SLOW", batch_size=1, speed=3600 * 5)
+    start = time.monotonic()
+    asyncio.run(ReplayEngine("SMA").add_source(source).run())
+    assert time.monotonic() - start >= 0.35  # 2 hours of bars at 5 hours per second
+
+def test_replay_source_error(tmp_path):
+    path = tmp_path / "bad.csv"
+    pd.DataFrame({'Date': ['2020-01-01'], 'Price': [1.0]}).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        asyncio.run(ReplayEngine("SMA").add_source(CSVReplaySource(str(path), symbol="BAD")).run())
+
+# Test histogram percentiles are within a bucket of the exact values
+def test_latency_histogram():
+    values = np.random.default_rng(0).integers(1, 10_000_000, 10_000)
+    histogram = LatencyHistogram()
+    for value in values.tolist():
+        histogram.record(value)
+    for q in (0.5, 0.9, 0.99):
+        exact = np.quantile(values, q)
+        assert exact <= histogram.percentile(q) <= exact * (1 + 1 / LatencyHistogram.SUB_BUCKETS) + 1
+    assert histogram.percentile(1.0) == values.max()
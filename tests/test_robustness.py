@@ -0,0 +1,87 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from backtester import Backtester
+from ledger import trade_statistics
+from robustness import _batches, block_bootstrap, percentile_bands, random_entry, robustness_report, round_trip_statistics, trade_bootstrap
+from strategies.sma import SMA
+
+def random_walk(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, n)))
+    return pd.DataFrame({'Close': close}, index=pd.bdate_range('2015-01-01', periods=n, name='Date'))
+
+@pytest.fixture
+def backtester():
+    data = random_walk(1500, seed=0)
+    strategy = SMA(data.copy(), short_window=5, long_window=20, compact=True)
+    backtester = Backtester(data, 1000, False, strategy, engine="vectorized", signals=strategy.generate_signals())
+    backtester.run()
+    return backtester
+
+# Test the round trip statistics agree with trade_statistics on the equivalent ledger,
+# BUY rows included
+@pytest.mark.parametrize("open_position", [False, True])
+def test_round_trip_statistics_match_ledger(open_position):
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        n_trips = int(rng.integers(1, 10))
+        profit = rng.choice([-1.0, 0.0, 0.5, 2.0], size=n_trips)
+        days = rng.integers(0, 9, size=n_trips).astype(float)
+
+        ledger_profit = np.full(2 * n_trips + open_position, np.nan)
+        ledger_days = ledger_profit.copy()
+        ledger_profit[1:2 * n_trips:2], ledger_days[1:2 * n_trips:2] = profit, days
+        final_capital = 0.0 if open_position else 1000 * np.prod(1 + profit / 100)
+
+        expected = trade_statistics(ledger_profit, ledger_days, 100, 1000, final_capital)
+        stats = round_trip_statistics(profit[None], days[None], 100, 1000, [final_capital], open_position)
+        for key, value in expected.items():
+            assert (math.isnan(value) and math.isnan(stats[key][0])) or stats[key][0] == pytest.approx(value), key
+
+def test_trade_bootstrap_reproducible_and_centered():
+    profit = np.random.default_rng(2).normal(0.2, 2, 200)
+    days = np.full(200, 3.0)
+    samples = trade_bootstrap(profit, days, 700, 1000, n_samples=5000, seed=7)
+    again = trade_bootstrap(profit, days, 700, 1000, n_samples=5000, seed=7)
+    np.testing.assert_array_equal(samples["CAGR (%)"], again["CAGR (%)"])
+    assert len(samples["Win Rate (%)"]) == 5000
+    assert np.median(samples["Avg Profit per Trade (%)"]) == pytest.approx(profit.mean(), abs=0.05)
+
+# Test the block bootstrap keeps the volatility of the curve
+def test_block_bootstrap(backtester):
+    equity = backtester.equity_curve()["Equity"]
+    samples = block_bootstrap(equity, n_samples=2000, block_size=10, seed=3)
+
+    returns = equity.pct_change().dropna()
+    volatility = returns.std() * np.sqrt(len(returns) / ((equity.index[-1] - equity.index[0]).days / 365)) * 100
+    assert np.median(samples["Volatility (Std Dev)"]) == pytest.approx(volatility, rel=0.05)
+    assert (samples["Max Drawdown"] <= 0).all()
+
+def test_batches_bound_the_sample_arrays():
+    assert _batches(10, 300, batch_elements=1000) == [3, 3, 3, 1]
+    assert _batches(5, 5000, batch_elements=1000) == [1] * 5
+
+def test_random_entry_uses_holding_periods():
+    close = np.linspace(100, 200, 500)  # Every long trade wins on a rising line
+    dates = pd.bdate_range('2020-01-01', periods=500)
+    samples = random_entry(close, dates, np.array([5, 10, 20]), 700, 1000, n_samples=1000, seed=4)
+    assert (samples["Max Trade Loss (%)"] > 0).all()
+    assert samples["Total Trades"][0] == 6
+    assert set(np.unique(samples["Avg Trade Duration (days)"] * 3)) <= set(range(3 * 7, 3 * 28 + 1))
+
+def test_robustness_report(backtester):
+    report = robustness_report(backtester, n_samples=500, percentiles=(5, 50, 95))
+    assert set(report) == {"trade_bootstrap", "block_bootstrap", "random_entry"}
+
+    stats = backtester.calculate_trade_statistics()
+    bands = report["trade_bootstrap"]
+    assert list(bands.columns) == ["Actual", "p5", "p50", "p95"]
+    assert bands.loc["Total Trades", "Actual"] == stats["Total Trades"]
+    assert (bands["p5"] <= bands["p95"]).all()
+    assert bands.loc["Win Rate (%)", "p5"] <= stats["Win Rate (%)"] <= bands.loc["Win Rate (%)", "p95"]
+
+def test_percentile_bands():
+    bands = percentile_bands({"a": np.arange(101.0)}, {"a": 3.0}, percentiles=(10, 90))
+    assert bands.loc["a"].tolist() == [3.0, 10.0, 90.0]
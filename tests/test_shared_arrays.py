@@ -0,0 +1,64 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+from shared_arrays import SharedArrays, attach, attach_frame, detach, share_frame
+from sweep import IndicatorCache, expand_grid
+from utils import normalize_price_frame
+
+def price_frame(n, tz=None):
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range('2021-01-04', periods=n, freq='min', tz=tz, name='Date')
+    return pd.DataFrame({'Close': close, 'Open': close * 0.999, 'Volume': rng.integers(1, 100, n)}, index=index)
+
+def close_sum(handle):
+    return float(attach_frame(handle)["Close"].sum())
+
+def test_arrays_round_trip_read_only():
+    arrays = {"a": np.arange(10.0), ("sma", 5): np.ones((3, 7), dtype=np.float32), "i": np.arange(3, dtype=np.int8)}
+    with SharedArrays(arrays, meta={"note": 1}) as shared:
+        views = attach(shared.handle)
+        for key, value in arrays.items():
+            np.testing.assert_array_equal(views[key], value)
+            assert views[key].dtype == value.dtype and not views[key].flags.writeable
+        with pytest.raises(ValueError):
+            views["a"][0] = 1.0
+        assert shared.handle.meta == {"note": 1}
+        del views
+        detach(shared.handle)
+
+    # Unlinked segments can no longer be attached
+    with pytest.raises(FileNotFoundError):
+        attach(shared.handle)
+
+@pytest.mark.parametrize("tz", [None, "America/New_York"])
+def test_frame_round_trip_without_copies(tz):
+    data = price_frame(1000, tz)
+    with share_frame(data) as shared:
+        frame = attach_frame(shared.handle)
+        pd.testing.assert_frame_equal(frame, normalize_price_frame(data), check_freq=False)
+        assert np.shares_memory(frame["Close"].to_numpy(), attach(shared.handle)["values"])
+        frame["Signal"] = 1  # New columns still work on a frame over read-only prices
+        del frame
+        detach(shared.handle)
+
+# Test workers see the shared prices through the handle alone
+def test_workers_attach_by_name():
+    data = price_frame(5000)
+    with share_frame(data) as shared, ProcessPoolExecutor(max_workers=2) as executor:
+        sums = list(executor.map(close_sum, [shared.handle] * 4))
+    assert sums == pytest.approx([data["Close"].sum()] * 4)
+
+def test_indicator_cache_from_arrays():
+    cache = IndicatorCache(price_frame(500)["Close"])
+    combos = expand_grid("MACD", {"fast_period": [8, 12], "signal_period": [5, 9]})
+    expected = [cache.signals("MACD", params) for params in combos]
+    with SharedArrays(cache.arrays()) as shared:
+        rebuilt = IndicatorCache.from_arrays(attach(shared.handle))
+        for params, signals in zip(combos, expected):
+            np.testing.assert_array_equal(rebuilt.signals("MACD", params), signals)
+        assert set(rebuilt._cache) == set(cache._cache)
+        del rebuilt
+        detach(shared.handle)
@@ -0,0 +1,146 @@
+import pytest
+import pandas as pd
+import numpy as np
+from strategies.sma import SMA, RollingMean
+from strategies.rsi import RSI
+from strategies.macd import MACD, RunningEMA
+
+@pytest.fixture
+def price_data():
+    rng = np.random.default_rng(3)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 1500)))
+    close[200:210] = close[199]  # a flat stretch exercises the repeated value handling
+    columns = pd.MultiIndex.from_product([['Close'], ['TEST']], names=['Price', 'Ticker'])
+    return pd.DataFrame(close.reshape(-1, 1), index=pd.date_range('2019-01-01', periods=1500), columns=columns)
+
+def column(data, name):
+    return data[name].to_numpy(dtype=float).ravel()
+
+def test_rolling_mean_matches_pandas(price_data):
+    values = column(price_data, 'Close')
+    for window in (1, 2, 20, 50):
+        rolling = RollingMean(window)
+        incremental = np.array([rolling.update(value) for value in values])
+        expected = pd.Series(values).rolling(window=window).mean().to_numpy()
+        np.testing.assert_array_equal(incremental, expected)
+
+def test_running_ema_matches_pandas(price_data):
+    values = column(price_data, 'Close')
+    for period in (9, 12, 26):
+        ema = RunningEMA(period)
+        incremental = np.array([ema.update(value) for value in values])
+        np.testing.assert_array_equal(incremental, pd.Series(values).ewm(span=period, adjust=False).mean().to_numpy())
+
+@pytest.mark.parametrize("strategy_class,indicators", [
+    (SMA, {'SMA_short': 'sma_short', 'SMA_long': 'sma_long'}),
+    (RSI, {'RSI': 'rsi'}),
+    (MACD, {'MACD': 'macd', 'MACD_signal': 'macd_signal'}),
+])
+def test_update_matches_batch(price_data, strategy_class, indicators):
+    batch_data = price_data.copy()
+    batch = strategy_class(batch_data)
+    expected_signals = np.asarray(batch.generate_signals()).ravel()
+
+    # Warm up on the first half, then stream the rest one bar at a time
+    split = 700
+    incremental = strategy_class(price_data.iloc[:split].copy())
+    assert incremental.warmup() == expected_signals[split - 1]
+
+    closes = column(price_data, 'Close')
+    for i in range(split, len(price_data)):
+        assert incremental.update(closes[i]) == expected_signals[i]
+        for batch_column, attribute in indicators.items():
+            assert getattr(incremental, attribute) == column(batch_data, batch_column)[i]
+
+# Test streaming from the very first bar, the Wilder seed must average all period moves
+@pytest.mark.parametrize("period", [2, 14])
+def test_rsi_streams_from_first_bar(price_data, period):
+    from strategies.rsi import wilder_rsi
+
+    closes = column(price_data, 'Close')[:300]
+    expected_rsi = wilder_rsi(closes, period)
+    expected_signals = np.asarray(RSI(price_data.iloc[:300].copy(), period=period).generate_signals()).ravel()
+
+    streaming = RSI(price_data.iloc[:0].copy(), period=period)
+    for i, close in enumerate(closes):
+        assert streaming.update(close) == expected_signals[i]
+        assert streaming.rsi == pytest.approx(expected_rsi[i], rel=1e-12, abs=1e-12)
+
+def test_update_accepts_rows(price_data):
+    strategy = SMA(price_data.copy())
+    strategy.warmup()
+    row = price_data.iloc[-1]
+    assert strategy.update(row) == strategy.update(float(column(price_data, 'Close')[-1]))
+
+# The Wilder smoothing loop wilder_rsi used before it moved to lfilter, kept as the reference
+def reference_wilder_rsi(close_prices, period):
+    delta = np.diff(close_prices)
+    gain = np.maximum(delta, 0)
+    loss = np.abs(np.minimum(delta, 0))
+    avg_gain = np.zeros(len(close_prices))
+    avg_loss = np.zeros(len(close_prices))
+    avg_gain[period] = np.mean(gain[:period])
+    avg_loss[period] = np.mean(loss[:period])
+    for i in range(period + 1, len(close_prices)):
+        avg_gain[i] = (avg_gain[i - 1] * (period - 1) + gain[i - 1]) / period
+        avg_loss[i] = (avg_loss[i - 1] * (period - 1) + loss[i - 1]) / period
+    rs = avg_gain / (avg_loss + 1e-10)
+    return 100 - (100 / (1 + rs))
+
+@pytest.mark.parametrize("period", [2, 14, 30])
+def test_wilder_rsi_matches_reference_loop(price_data, period):
+    from strategies.rsi import wilder_rsi, rsi_signals
+    closes = column(price_data, 'Close')
+    expected = reference_wilder_rsi(closes, period)
+    np.testing.assert_allclose(wilder_rsi(closes, period), expected, rtol=1e-10, atol=1e-10)
+    np.testing.assert_array_equal(rsi_signals(wilder_rsi(closes, period), 70, 30), rsi_signals(expected, 70, 30))
+
+def test_wilder_rsi_short_history():
+    from strategies.rsi import wilder_rsi
+    closes = np.array([10.0, 11.0, 10.5])
+    np.testing.assert_allclose(wilder_rsi(closes, 2), reference_wilder_rsi(closes, 2))
+    with pytest.raises(ValueError):
+        wilder_rsi(closes, 3)
+
+# Prices on a 1/64 grid survive the float32 cast exactly, so both modes see the same values
+@pytest.fixture
+def grid_price_data(price_data):
+    data = price_data.copy()
+    data[('Close', 'TEST')] = np.round(column(price_data, 'Close') * 64) / 64
+    return data
+
+@pytest.mark.parametrize("strategy_class", [SMA, RSI, MACD])
+def test_compact_mode_matches_standard(grid_price_data, strategy_class):
+    from utils import compact_frame
+
+    standard_data = grid_price_data.copy()
+    standard = strategy_class(standard_data)
+    expected = np.asarray(standard.generate_signals()).ravel()
+
+    compact_data = compact_frame(grid_price_data)
+    compact = strategy_class(compact_data, compact=True)
+    signals = compact.generate_signals()
+
+    assert compact_data.columns.equals(grid_price_data.columns)  # Nothing added to the frame
+    assert compact_data.dtypes.eq(np.float32).all()
+    assert signals.dtype == np.int8
+    np.testing.assert_array_equal(signals, expected)
+    for name in compact.get_feature_column_names():
+        assert compact.indicators[name].dtype == np.float32
+        np.testing.assert_array_equal(compact.indicators[name], column(standard_data, name).astype(np.float32))
+
+    features = compact.feature_frame()
+    assert features.columns.tolist() == ["Close"] + compact.get_feature_column_names()
+    assert features.index.equals(grid_price_data.index)
+
+# Test the strategies give the same signals on a canonical flat frame as on yfinance columns,
+# MACD used to read the column 'C' of flat frames
+@pytest.mark.parametrize("strategy_class", [SMA, RSI, MACD])
+def test_flat_frame_matches_multiindex(price_data, strategy_class):
+    from utils import normalize_price_frame
+
+    flat = normalize_price_frame(price_data)
+    expected = np.asarray(strategy_class(price_data.copy()).generate_signals()).ravel()
+    np.testing.assert_array_equal(np.asarray(strategy_class(flat).generate_signals()), expected)
+    for name in strategy_class(flat).get_feature_column_names():
+        assert name in flat.columns
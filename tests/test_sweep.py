@@ -0,0 +1,60 @@
+import pytest
+import pandas as pd
+import numpy as np
+from backtester import Backtester
+from strategies.registry import STRATEGIES
+from sweep import IndicatorCache, expand_grid, parse_grid, sweep
+
+@pytest.fixture
+def price_data():
+    rng = np.random.default_rng(11)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, 600)))
+    # yfinance style columns, which every strategy (including MACD) reads
+    columns = pd.MultiIndex.from_product([['Close'], ['TEST']], names=['Price', 'Ticker'])
+    return pd.DataFrame(close.reshape(-1, 1), index=pd.date_range('2020-01-01', periods=600), columns=columns)
+
+def direct_stats(data, strategy_name, params):
+    data = data.copy()
+    strategy = STRATEGIES[strategy_name](data, **params)
+    data['Signal'] = strategy.generate_signals()
+    return Backtester(data, 1000, False, strategy).run()
+
+def test_expand_grid_keeps_defaults():
+    combos = expand_grid("RSI", {"period": [7, 14]})
+    assert combos == [
+        {"period": 7, "overbought": 70, "oversold": 30},
+        {"period": 14, "overbought": 70, "oversold": 30},
+    ]
+    with pytest.raises(ValueError):
+        expand_grid("RSI", {"window": [7]})
+
+def test_parse_grid():
+    assert parse_grid(["short_window=10,20", "oversold=25.5"]) == {"short_window": [10, 20], "oversold": [25.5]}
+
+@pytest.mark.parametrize("strategy_name,grid", [
+    ("SMA", {"short_window": [5, 10], "long_window": [20, 40]}),
+    ("RSI", {"period": [7, 14], "overbought": [65, 70], "oversold": [30, 35]}),
+    ("MACD", {"fast_period": [8, 12], "slow_period": [26], "signal_period": [5, 9]}),
+])
+def test_sweep_matches_strategy_backtests(price_data, strategy_name, grid):
+    results = sweep(price_data, strategy_name, grid, initial_capital=1000, workers=1, sort_by=None)
+    assert len(results) == len(expand_grid(strategy_name, grid))
+
+    for row in results.to_dict("records"):
+        params = {name: row[name] for name in grid}
+        stats = direct_stats(price_data, strategy_name, {**expand_grid(strategy_name, {})[0], **params})
+        for key, value in stats.items():
+            assert row[key] == value or (pd.isna(row[key]) and pd.isna(value)), key
+
+def test_indicators_computed_once(price_data):
+    cache = IndicatorCache(price_data[('Close', 'TEST')])
+    for params in expand_grid("SMA", {"short_window": [5, 10, 20], "long_window": [20, 40]}):
+        cache.signals("SMA", params)
+    assert sorted(key[1] for key in cache._cache) == [5, 10, 20, 40]
+
+def test_parallel_sweep_sorted(price_data):
+    grid = {"short_window": [5, 10, 15], "long_window": [20, 30, 40]}
+    parallel = sweep(price_data, "SMA", grid, initial_capital=1000, workers=2, sort_by="Sharpe Ratio")
+    serial = sweep(price_data, "SMA", grid, initial_capital=1000, workers=1, sort_by="Sharpe Ratio")
+    assert parallel["Sharpe Ratio"].is_monotonic_decreasing
+    pd.testing.assert_frame_equal(parallel, serial)
@@ -1,14 +1,57 @@
 import logging
+import numpy as np
+import pandas as pd
+
+# Leading columns of a canonical price frame, in this order, see normalize_price_frame
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+def normalize_price_frame(data):
+    """
+    Canonical layout of a price frame: flat column names (yf.download's MultiIndex is reduced
+    to its Price level) with the OHLCV columns first, every column float64 in one block whose
+    columns are C-contiguous, and a sorted DatetimeIndex named Date without duplicates.
+
+    Columns of a canonical frame are found with an exact, hashed lookup and read as NumPy views
+    without a copy, so nothing downstream has to search the column names.
+
+    :param data: Pandas DataFrame containing stock data.
+    :return: New DataFrame in the canonical layout.
+    """
+    names = data.columns.get_level_values(0) if isinstance(data.columns, pd.MultiIndex) else data.columns
+    names = [str(name) for name in names]
+    # First occurrence of each name, OHLCV leading
+    positions = {}
+    for i, name in enumerate(names):
+        positions.setdefault(name, i)
+    ordered = [name for name in PRICE_COLUMNS if name in positions] + [name for name in positions if name not in PRICE_COLUMNS]
+
+    index = pd.DatetimeIndex(data.index, name="Date")
+    order = np.argsort(index.asi8, kind="stable") if not index.is_monotonic_increasing else None
+    block = np.empty((len(ordered), len(data)), dtype=np.float64)
+    for row, name in enumerate(ordered):
+        block[row] = data.iloc[:, positions[name]].to_numpy(dtype=np.float64)
+    if order is not None:
+        index, block = index[order], np.ascontiguousarray(block[:, order])
+
+    # Passing the transpose makes pandas keep block itself, one contiguous row per column
+    frame = pd.DataFrame(block.T, index=index, columns=ordered)
+    return frame[~frame.index.duplicated(keep="last")] if not frame.index.is_unique else frame
 
 def extract_close_column(data, column_name="Close"):
     """
     Robustly selects the 'Close' column from a DataFrame.
 
+    Canonical (flat) frames resolve with an exact lookup. Other frames, such as raw yf.download
+    output with MultiIndex columns, fall back to the first column containing column_name.
+
     :param data: Pandas DataFrame containing stock data.
     :param column_name: The name or partial match string to identify the Close column.
     :return: The matching column name.
     :raises ValueError: If no column is found.
     """
+    if not isinstance(data.columns, pd.MultiIndex) and column_name in data.columns:
+        return column_name
+
     close_col = [col for col in data.columns if column_name in col]
     
     if not close_col:
@@ -29,10 +72,42 @@ def extract_feature_columns(data, feature_column_names):
     """
     feature_columns = []
     for feature in feature_column_names:
-        matched_cols = [col for col in data.columns if feature in col]
-        if not matched_cols:
-            logging.error(f"Could not find column containing '{feature}' in data.")
-            raise ValueError(f"Missing feature column: {feature}")
-        feature_columns.append(matched_cols[0])
+        try:
+            feature_columns.append(extract_close_column(data, feature))
+        except ValueError:
+            raise ValueError(f"Missing feature column: {feature}") from None
 
     return feature_columns
+
+def extract_column_values(data, column_name):
+    """
+    Returns a column as a flat float64 NumPy array, resolving the name like extract_close_column.
+
+    :param data: Pandas DataFrame containing stock data.
+    :param column_name: The name or partial match string to identify the column.
+    :return: 1-D NumPy array with the column values.
+    :raises ValueError: If no column is found.
+    """
+    column = extract_close_column(data, column_name)
+    return data[column].to_numpy(dtype=np.float64).ravel()  # A view of float64 columns, no copy
+
+def extract_feature_matrix(data, feature_column_names):
+    """
+    Resolves the feature columns once and returns them as a 2-D float64 array (bars x features).
+
+    :param data: Pandas DataFrame containing stock data.
+    :param feature_column_names: List of feature column names (partial match allowed).
+    :return: NumPy array with one column per feature.
+    :raises ValueError: If any feature column is not found.
+    """
+    feature_columns = extract_feature_columns(data, feature_column_names)
+    return np.column_stack([data[col].to_numpy(dtype=np.float64).ravel() for col in feature_columns])
+
+def compact_frame(data):
+    """
+    Copy of a price frame with its float64 columns stored as float32, half the memory.
+
+    :param data: Pandas DataFrame containing stock data.
+    :return: New DataFrame, integer columns such as Volume are left as they are.
+    """
+    return data.astype({column: np.float32 for column, dtype in data.dtypes.items() if dtype == np.float64})